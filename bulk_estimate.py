@@ -0,0 +1,280 @@
+"""
+Headless bulk estimate generation.
+
+Selects MRs from the MASTER SHEET by division, date range and completion status,
+computes their estimates in a process pool and writes them either to local
+XLSX files (the default) or, with --output sheets, to the spreadsheet (one
+"ESTIMATE <MR NO>" worksheet per MR, all values in batched requests). Every such
+worksheet is a full copy of the ESTIMATE template, so a run creates at most
+--max-new-sheets of them.
+
+Examples:
+    python bulk_estimate.py --division NORTH --from 01/03/2024 --to 31/03/2024
+    python bulk_estimate.py --status complete --out-dir estimates
+    python bulk_estimate.py --division TALOD --output sheets --max-new-sheets 5
+"""
+import argparse
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import xlsxwriter
+from config.sheets_setup import find_worksheet, get_spreadsheet, worksheet_titles
+from utils.estimate_engine import COLS_PER_TRANSFORMER, compute_estimate
+from utils.estimate_memo import estimate_key, estimate_memo
+from utils.estimate_sheets import ESTIMATE_SHEET, FIRST_COL_INDEX, bold_cells, page_sheet, page_title, split_pages
+from utils.rate_card import TEMPLATE_COLS, get_rate_card
+from utils.sheet_cache import snapshot_cache
+from utils.sheet_index import MrIndex, get_mr_rows
+from utils.sheet_writer import BOLD, plan_grid, repeat_cell_request, send_ranges
+from utils.date_index import DateIndex, parse_date
+from utils.stage_status import INTERNAL, PHYSICAL, has, row_status
+
+MASTER_SHEET = "MASTER SHEET"
+
+# MASTER SHEET columns (0-based)
+DIVISION_COL = 0
+
+# Stages an MR needs for each --status choice
+STATUS_STAGES = {
+    "any": 0,
+    "physical": PHYSICAL,
+    "internal": INTERNAL,
+    "complete": PHYSICAL | INTERNAL,
+}
+STATUS_CHOICES = list(STATUS_STAGES)
+
+# Worksheets --output sheets may add in one run unless --max-new-sheets says otherwise
+MAX_NEW_SHEETS = 20
+
+
+def matches_status(rows, status):
+    """True if every TC of the MR has the stages of status entered"""
+    stages = STATUS_STAGES[status]
+    return all(has(row_status(row), stages) for row in rows)
+
+
+def select_mrs(master_sheet, division=None, date_from=None, date_to=None, status="any"):
+    """
+    Return [(mr_no, rows)] of the MRs matching every given filter, in sheet order
+    The MASTER SHEET is read once; rows of each MR come from the cached snapshot.
+    """
+    snapshot = snapshot_cache.get_snapshot(master_sheet)
+    index = snapshot.derived("mr_index", MrIndex)
+    dated = None
+    if date_from or date_to:
+        # Rows with a readable intake date in range; an MR goes by its first row
+        _, row_numbers = snapshot.derived("date_index", DateIndex).between("INTAKE", date_from, date_to)
+        dated = set(row_numbers)
+    selected = []
+    for mr_no, spans in index.spans_by_mr.items():
+        if dated is not None and spans[0][0] not in dated:
+            continue
+        rows = get_mr_rows(master_sheet, mr_no)
+        if not rows:
+            continue
+        first = rows[0]
+        if division and str(first[DIVISION_COL]).strip().upper() != division.strip().upper():
+            continue
+        if not matches_status(rows, status):
+            continue
+        selected.append((mr_no, rows))
+    return selected
+
+
+# Rate card of a worker process, set once by the pool initializer
+_worker_rate_card = None
+
+
+def _init_worker(rate_card):
+    global _worker_rate_card
+    _worker_rate_card = rate_card
+
+
+def _estimate_worker(rows):
+    return compute_estimate(rows, _worker_rate_card)
+
+
+def compute_estimates(mrs, rate_card, workers=None):
+    """
+    Return {mr_no: EstimateResult} for [(mr_no, rows)]
+    Estimates already in the memo are reused; the rest are computed in a process pool
+    (in this process when workers is 1) and added to the memo in one save.
+    """
+    results = {}
+    pending = []
+    for mr_no, rows in mrs:
+        key = estimate_key(rows, rate_card)
+        result = estimate_memo.get(key)
+        if result is not None:
+            results[mr_no] = result
+        else:
+            pending.append((mr_no, rows, key))
+    print(f"Debug - {len(results)} estimates from the memo, {len(pending)} to compute")
+
+    if pending:
+        all_rows = [rows for _, rows, _ in pending]
+        if workers == 1 or len(pending) == 1:
+            computed = [compute_estimate(rows, rate_card) for rows in all_rows]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(rate_card,)) as pool:
+                chunksize = max(1, len(all_rows) // ((workers or os.cpu_count() or 1) * 4))
+                computed = list(pool.map(_estimate_worker, all_rows, chunksize=chunksize))
+        for (mr_no, _, _), result in zip(pending, computed):
+            results[mr_no] = result
+        estimate_memo.put_many([(key, result) for (_, _, key), result in zip(pending, computed)])
+    return results
+
+
+def new_sheet_titles(results):
+    """Titles of the "ESTIMATE <MR NO>" worksheets write_to_sheets would have to create"""
+    existing = set(worksheet_titles())
+    titles = []
+    for mr_no, result in results.items():
+        base = f"{ESTIMATE_SHEET} {mr_no}"
+        for page in range(len(split_pages(result.grid, len(result.totals)))):
+            title = page_title(page, base)
+            if title not in existing:
+                titles.append(title)
+    return titles
+
+
+def write_to_sheets(template_sheet, results, max_new_sheets=MAX_NEW_SHEETS):
+    """
+    Write every estimate to its own "ESTIMATE <MR NO>" worksheet(s)
+    Missing worksheets are copied from the ESTIMATE template; the values of all MRs go
+    out together in values:batchUpdate calls and the L16/L29 bolding in one batchUpdate.
+    Returns the number of ranges written.
+    Raises:
+        Exception: If more than max_new_sheets worksheets would be created
+    """
+    new_titles = new_sheet_titles(results)
+    if len(new_titles) > max_new_sheets:
+        raise Exception(
+            f"{len(new_titles)} new worksheets needed, more than --max-new-sheets {max_new_sheets}; "
+            f"use --output xlsx or raise the limit"
+        )
+
+    data = []
+    formats = []
+    written = []
+    for mr_no, result in results.items():
+        base = f"{ESTIMATE_SHEET} {mr_no}"
+        for page, (grid, transformers) in enumerate(split_pages(result.grid, len(result.totals))):
+            worksheet = page_sheet(page, template_sheet, base)
+            ranges = plan_grid(worksheet, 1, FIRST_COL_INDEX, grid)
+            if not ranges:
+                continue
+            data.extend(ranges)
+            formats.extend(repeat_cell_request(worksheet, cell, BOLD) for cell in bold_cells(transformers))
+            written.append((worksheet, grid))
+
+    if not data:
+        print("Debug - All estimate worksheets already up to date")
+        return 0
+    spreadsheet = get_spreadsheet()
+    revision = snapshot_cache.revision_before_write(written[0][0])
+    requests = send_ranges(spreadsheet, data)
+    print(f"Debug - Wrote {len(data)} ranges to {len(written)} worksheets in {requests} request(s)")
+    spreadsheet.batch_update({"requests": formats})
+    # The requests are counted once, for the whole spreadsheet, after every patch
+    for worksheet, grid in written:
+        snapshot_cache.record_update(worksheet, 1, FIRST_COL_INDEX, grid, revision, requests=0)
+    snapshot_cache.record_format(written[0][0], revision, requests + 1)
+    return len(data)
+
+
+def xlsx_file_name(mr_no):
+    return re.sub(r"[^\w.-]+", "_", f"{ESTIMATE_SHEET} {mr_no}") + ".xlsx"
+
+
+def write_to_xlsx(rate_card, results, out_dir):
+    """
+    Write one XLSX file per MR into out_dir, laid out like the ESTIMATE sheet:
+    the template in A1:I50 and the estimate from J1, all transformers on one sheet.
+    Returns the list of files written.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for mr_no, result in results.items():
+        path = os.path.join(out_dir, xlsx_file_name(mr_no))
+        workbook = xlsxwriter.Workbook(path, {"strings_to_numbers": True})
+        try:
+            worksheet = workbook.add_worksheet(ESTIMATE_SHEET)
+            bold = workbook.add_format({"bold": True})
+            for row_index, row in enumerate(rate_card.cells):
+                for col_index, value in enumerate(row[:TEMPLATE_COLS]):
+                    if value != '':
+                        worksheet.write(row_index, col_index, value)
+            bold_positions = set()
+            for index in range(len(result.totals)):
+                col = FIRST_COL_INDEX + index * COLS_PER_TRANSFORMER + 2
+                bold_positions.update({(15, col), (28, col)})
+            for row_index, row in enumerate(result.grid):
+                for col_index, value in enumerate(row):
+                    col = FIRST_COL_INDEX + col_index
+                    if (row_index, col) in bold_positions:
+                        worksheet.write(row_index, col, value, bold)
+                    elif value != '':
+                        worksheet.write(row_index, col, value)
+        finally:
+            workbook.close()
+        paths.append(path)
+    return paths
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate estimates for many MRs without the GUI")
+    parser.add_argument("--division", help="only MRs of this division")
+    parser.add_argument("--from", dest="date_from", type=parse_date_arg, help="first MR date, dd/mm/yyyy")
+    parser.add_argument("--to", dest="date_to", type=parse_date_arg, help="last MR date, dd/mm/yyyy")
+    parser.add_argument(
+        "--status", choices=STATUS_CHOICES, default="any",
+        help="only MRs with physical / internal / both inspections entered for every TC",
+    )
+    parser.add_argument(
+        "--output", choices=["xlsx", "sheets"], default="xlsx",
+        help="local XLSX files, or one ESTIMATE <MR NO> worksheet per MR in the spreadsheet",
+    )
+    parser.add_argument("--out-dir", default="estimates", help="folder for --output xlsx")
+    parser.add_argument(
+        "--max-new-sheets", type=int, default=MAX_NEW_SHEETS,
+        help=f"most worksheets --output sheets may add (default: {MAX_NEW_SHEETS})",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    return parser.parse_args(argv)
+
+
+def parse_date_arg(text):
+    date = parse_date(text)
+    if date is None:
+        raise argparse.ArgumentTypeError(f"invalid date {text!r}, expected dd/mm/yyyy")
+    return date
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        master_sheet = find_worksheet(MASTER_SHEET)
+        template_sheet = find_worksheet(ESTIMATE_SHEET)
+        rate_card = get_rate_card(template_sheet)
+        mrs = select_mrs(master_sheet, args.division, args.date_from, args.date_to, args.status)
+        print(f"Selected {len(mrs)} MRs")
+        if not mrs:
+            return 0
+
+        results = compute_estimates(mrs, rate_card, args.workers)
+        if args.output == "xlsx":
+            paths = write_to_xlsx(rate_card, results, args.out_dir)
+            print(f"Wrote {len(paths)} estimate files to {args.out_dir}")
+        else:
+            ranges = write_to_sheets(template_sheet, results, args.max_new_sheets)
+            print(f"Wrote {ranges} ranges for {len(results)} MRs")
+        return 0
+    except Exception as e:
+        print(f"Error: Bulk estimate failed: {str(e)}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
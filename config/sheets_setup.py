@@ -1,9 +1,19 @@
+import os
+import threading
 import gspread
 from tkinter import messagebox
 from oauth2client.service_account import ServiceAccountCredentials
+from utils.sheet_cache import appended_row_number, snapshot_cache
 
 # Define sheet names and their configurations
 SPREADSHEET_NAME = "MASTER SHEET"
+CREDENTIALS_FILE = "credentials.json"
+SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+
+# Local files kept between sessions (spreadsheet key, caches)
+CACHE_DIR = ".sheets_cache"
+SPREADSHEET_KEY_FILE = os.path.join(CACHE_DIR, "spreadsheet_key.txt")
+
 SHEET_CONFIGS = {
     "MASTER": {
         "name": "MASTER SHEET",
@@ -15,14 +25,139 @@ SHEET_CONFIGS = {
 def get_worksheet(sheet_name):
     """Get a specific worksheet"""
     try:
-        spreadsheet = setup_google_sheets()
-        if spreadsheet:
-            return spreadsheet.worksheet(sheet_name)
-        return None
+        return find_worksheet(sheet_name)
     except Exception as e:
         messagebox.showerror("Error", f"Failed to get worksheet: {e}")
         return None
 
+# Process-wide client and spreadsheet handle, created on first use
+_client = None
+_spreadsheet = None
+_client_lock = threading.RLock()
+
+def _read_spreadsheet_key():
+    try:
+        with open(SPREADSHEET_KEY_FILE) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def _write_spreadsheet_key(key):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(SPREADSHEET_KEY_FILE, "w") as f:
+            f.write(key)
+    except OSError as e:
+        print(f"Debug - Could not cache spreadsheet key: {str(e)}")
+
+def get_client():
+    """
+    Return the authorized gspread client shared by the whole process
+    The credentials file is read once; the access token is refreshed when it has expired.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            credentials = ServiceAccountCredentials.from_json_keyfile_name(CREDENTIALS_FILE, SCOPE)
+            _client = gspread.authorize(credentials)
+
+        auth = getattr(_client.http_client, "auth", None)
+        if auth is not None and not auth.valid:
+            _client.http_client.login()
+        return _client
+
+def get_spreadsheet():
+    """
+    Return the shared spreadsheet handle
+    Opens by the cached spreadsheet key so the Drive search by name only runs the first time.
+    """
+    global _spreadsheet
+    with _client_lock:
+        client = get_client()
+        if _spreadsheet is not None:
+            return _spreadsheet
+
+        key = _read_spreadsheet_key()
+        if key:
+            try:
+                _spreadsheet = client.open_by_key(key)
+            except (gspread.SpreadsheetNotFound, PermissionError):
+                print(f"Debug - Cached spreadsheet key {key} is no longer valid")
+
+        if _spreadsheet is None:
+            _spreadsheet = client.open(SPREADSHEET_NAME)
+            _write_spreadsheet_key(_spreadsheet.id)
+        return _spreadsheet
+
+# Worksheet handles resolved from one metadata fetch, keyed by title and by sheet id
+_worksheets_by_title = {}
+_worksheets_by_id = {}
+
+def _load_worksheets():
+    spreadsheet = get_spreadsheet()
+    worksheets = spreadsheet.worksheets()
+    _worksheets_by_title.clear()
+    _worksheets_by_id.clear()
+    for worksheet in worksheets:
+        _worksheets_by_title[worksheet.title] = worksheet
+        _worksheets_by_id[worksheet.id] = worksheet
+
+def find_worksheet(title=None, sheet_id=None):
+    """
+    Return a worksheet handle by title or sheet id without refetching spreadsheet metadata
+    The metadata is fetched again only when the worksheet is not known yet (e.g. it was
+    added from another workstation).
+    Raises:
+        gspread.WorksheetNotFound: If no worksheet matches
+    """
+    with _client_lock:
+        for attempt in range(2):
+            if attempt or not _worksheets_by_title:
+                _load_worksheets()
+            if title is not None and title in _worksheets_by_title:
+                return _worksheets_by_title[title]
+            if sheet_id is not None and sheet_id in _worksheets_by_id:
+                return _worksheets_by_id[sheet_id]
+        raise gspread.WorksheetNotFound(title if title is not None else sheet_id)
+
+def add_worksheet(title, rows, cols):
+    """Add a worksheet and register it in the worksheet cache"""
+    with _client_lock:
+        worksheet = get_spreadsheet().add_worksheet(title=title, rows=rows, cols=cols)
+        _worksheets_by_title[worksheet.title] = worksheet
+        _worksheets_by_id[worksheet.id] = worksheet
+        return worksheet
+
+def duplicate_worksheet(source, new_title):
+    """Copy a worksheet (values and formatting) under a new title and register the copy"""
+    with _client_lock:
+        worksheet = get_spreadsheet().duplicate_sheet(source.id, new_sheet_name=new_title)
+        _worksheets_by_title[worksheet.title] = worksheet
+        _worksheets_by_id[worksheet.id] = worksheet
+        return worksheet
+
+def worksheet_titles():
+    """Titles of the known worksheets, from the cached metadata"""
+    with _client_lock:
+        if not _worksheets_by_title:
+            _load_worksheets()
+        return list(_worksheets_by_title)
+
+def rename_worksheet(worksheet, new_title):
+    """Rename a worksheet and keep the worksheet cache in step"""
+    with _client_lock:
+        _worksheets_by_title.pop(worksheet.title, None)
+        worksheet.update_title(new_title)
+        _worksheets_by_title[worksheet.title] = worksheet
+        _worksheets_by_id[worksheet.id] = worksheet
+        return worksheet
+
+def invalidate_worksheets():
+    """Forget all worksheet handles; the next lookup fetches the metadata again"""
+    with _client_lock:
+        _worksheets_by_title.clear()
+        _worksheets_by_id.clear()
+
 def setup_google_sheets():
     """
     Connect to Google Sheets and return the spreadsheet
@@ -30,15 +165,36 @@ def setup_google_sheets():
         gspread.Spreadsheet: The main spreadsheet object
     """
     try:
-        scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-        credentials = ServiceAccountCredentials.from_json_keyfile_name("credentials.json", scope)
-        client = gspread.authorize(credentials)
-        return client.open(SPREADSHEET_NAME)
+        return get_spreadsheet()
         
     except Exception as e:
         messagebox.showerror("Error", f"Failed to connect to Google Sheets: {e}")
         return None
 
+def write_form_rows(data, form_name, additional_data=None):
+    """
+    Write form rows to the sheets configured for form_name; raises on failure
+    Safe to call from a background thread (no dialogs), see utils.background.
+    Returns:
+        int: Row number the rows were appended at (None for second_form updates)
+    """
+    first_row_number = None
+    for config in SHEET_CONFIGS.values():
+        if form_name in config["forms"]:
+            worksheet = find_worksheet(config["name"])
+            revision = snapshot_cache.revision_before_write(worksheet)
+            # If it's second_form data, we need to update existing rows
+            if form_name == "second_form" and additional_data:
+                start_row = additional_data["start_row"]
+                worksheet.update(f"F{start_row}:I{start_row + len(data) - 1}", data)
+                snapshot_cache.record_update(worksheet, start_row, 5, data, revision)
+            else:
+                response = worksheet.append_rows(data)
+                first_row_number = snapshot_cache.record_append(
+                    worksheet, data, appended_row_number(response), revision
+                )
+    return first_row_number
+
 def save_to_sheets(data, form_name, additional_data=None):
     """
     Save data to appropriate sheets based on form type
@@ -48,20 +204,9 @@ def save_to_sheets(data, form_name, additional_data=None):
         additional_data: Any additional data needed for saving
     """
     try:
-        # Determine which sheets need this data
-        for config in SHEET_CONFIGS.values():
-            if form_name in config["forms"]:
-                worksheet = get_worksheet(config["name"])
-                if worksheet:
-                    # If it's second_form data, we need to update existing rows
-                    if form_name == "second_form" and additional_data:
-                        start_row = additional_data["start_row"]
-                        worksheet.update(f"F{start_row}:I{start_row + len(data) - 1}", data)
-                    else:
-                        worksheet.append_rows(data)
-
+        write_form_rows(data, form_name, additional_data)
         return True
         
     except Exception as e:
         messagebox.showerror("Error", f"Failed to save data: {e}")
-        return False 
\ No newline at end of file
+        return False
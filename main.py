@@ -1,6 +1,6 @@
 import tkinter as tk
 from tkinter import ttk
-from config.sheets_setup import setup_google_sheets, SHEET_CONFIGS
+from config.sheets_setup import get_worksheet, SHEET_CONFIGS
 from ui.add_form import create_add_form
 from ui.search_form import create_search_form
 from ui.physical_form import create_physical_form, PhysicalVerificationForm
@@ -11,10 +11,11 @@ from ui.final_bill import create_final_bill
 from ui.oil_account_form import create_oil_account_form
 from ui.certificates_form import create_certificates_form
 from ui.estimate_form import create_estimate_form
+from utils.sheet_cache import snapshot_cache
 
 def main():
     # Get the master worksheet specifically for the lot number functionality
-    master_sheet = setup_google_sheets().worksheet("MASTER SHEET")
+    master_sheet = get_worksheet("MASTER SHEET")
     if not master_sheet:
         return
 
@@ -107,6 +108,8 @@ def main():
 
     root.mainloop()
 
+    print(f"Snapshot cache stats: {snapshot_cache.stats()}")
+
 def handle_button_click(button_type, sheet):
     if button_type == "PHYSICAL":
         PhysicalVerificationForm(sheet)
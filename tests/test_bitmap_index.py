@@ -0,0 +1,70 @@
+"""
+Bitmap filters over a snapshot: value and stage masks, the helpers that combine
+them with other indexes, and the patch and append hooks.
+"""
+import unittest
+from utils.bitmap_index import BitmapIndex
+from utils.sheet_cache import SheetSnapshot
+from utils.stage_status import PHYSICAL, TESTING
+
+
+def master_row(division, capacity, physical='', testing=''):
+    row = [''] * 62
+    row[0], row[7], row[9], row[47] = division, capacity, physical, testing
+    return row
+
+
+HEADER = master_row("DIVISION", "TC CAPACITY", "DATE", "DATE")
+
+
+class BitmapIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.snapshot = SheetSnapshot([HEADER, HEADER,
+                                       master_row("TALOD", "100 KVA", "01/03/2024"),
+                                       master_row("talod ", "25 KVA", "01/03/2024", "05/03/2024"),
+                                       master_row("MEHSANA", "100 KVA"),
+                                       master_row("TALOD", "100 KVA")], 1)
+        self.index = self.snapshot.derived("bitmap_index", BitmapIndex)
+
+    def rows(self, *args, **kwargs):
+        return self.index.row_numbers(self.index.select(*args, **kwargs))
+
+    def test_values_are_matched_upper_cased_and_stripped(self):
+        self.assertEqual(self.rows({"DIVISION": ["Talod"]}), [3, 4, 6])
+
+    def test_filters_and_across_columns_or_within_one(self):
+        self.assertEqual(self.rows({"DIVISION": ["TALOD"], "TC CAPACITY": ["100 KVA"]}), [3, 6])
+        self.assertEqual(self.rows({"DIVISION": ["TALOD", "MEHSANA"], "TC CAPACITY": ["100 KVA"]}), [3, 5, 6])
+        self.assertEqual(self.rows({"DIVISION": ["NORTH"]}), [])
+
+    def test_stage_filters(self):
+        self.assertEqual(self.rows({}, required=PHYSICAL, missing=TESTING), [3])
+        self.assertEqual(self.rows({"DIVISION": ["TALOD"]}, missing=PHYSICAL), [6])
+
+    def test_choices(self):
+        self.assertEqual(self.index.choices("DIVISION"), ["MEHSANA", "TALOD"])
+
+    def test_combined_with_row_numbers_from_another_index(self):
+        mask = self.index.select({"TC CAPACITY": ["100 KVA"]})
+        self.assertEqual(self.index.filter_rows(mask, [6, 4, 3, 99]), [6, 3])
+        self.assertEqual(self.index.row_numbers(mask & self.index.mask_of([5, 6, 99])), [5, 6])
+
+    def test_patch_moves_the_row_between_values(self):
+        self.snapshot.patch_range(5, 0, [["TALOD"]])
+        self.assertEqual(self.rows({"DIVISION": ["TALOD"]}), [3, 4, 5, 6])
+        self.assertEqual(self.index.choices("DIVISION"), ["TALOD"])
+
+    def test_patched_stage_dates(self):
+        self.snapshot.patch_range(6, 9, [["02/03/2024"]])
+        self.assertEqual(self.rows({"DIVISION": ["TALOD"]}, missing=PHYSICAL), [])
+
+    def test_appends_past_the_capacity(self):
+        self.snapshot.append_rows([master_row("NORTH", "5 KVA")] * 5)
+        self.assertEqual(self.rows({"DIVISION": ["NORTH"]}), [7, 8, 9, 10, 11])
+        self.assertEqual(len(self.index.select({})), 11)
+        self.assertEqual(self.rows({"DIVISION": ["NORTH"]}, missing=PHYSICAL), [7, 8, 9, 10, 11])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+"""
+MR selection of bulk_estimate by inspection status.
+"""
+import unittest
+from bulk_estimate import matches_status
+
+
+def tc_row(physical=False, internal=False):
+    row = [''] * 62
+    if physical:
+        row[9] = "01/03/2024"   # J, physical date
+    if internal:
+        row[30] = "05/03/2024"  # AE, internal date
+    return row
+
+
+class MatchesStatusTest(unittest.TestCase):
+
+    def test_every_tc_inspected(self):
+        rows = [tc_row(True, True), tc_row(True, True)]
+        for status in ("any", "physical", "internal", "complete"):
+            self.assertTrue(matches_status(rows, status), status)
+
+    def test_partly_inspected_mr_is_not_selected(self):
+        rows = [tc_row(True, True), tc_row(), tc_row(physical=True)]
+        self.assertTrue(matches_status(rows, "any"))
+        self.assertFalse(matches_status(rows, "physical"))
+        self.assertFalse(matches_status(rows, "internal"))
+        self.assertFalse(matches_status(rows, "complete"))
+
+    def test_one_stage_on_every_tc(self):
+        rows = [tc_row(physical=True), tc_row(physical=True, internal=True)]
+        self.assertTrue(matches_status(rows, "physical"))
+        self.assertFalse(matches_status(rows, "internal"))
+        self.assertFalse(matches_status(rows, "complete"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,249 @@
+"""
+Differential checks of utils.estimate_engine against the step-by-step calculation
+the estimate form used before it: the totals alone (every section sum added left
+to right from 0, each total rounded and stored as str() before the next one reads
+it), and whole estimate grids of random MRs against the form's old loops.
+"""
+import random
+import unittest
+import numpy as np
+from utils.estimate_engine import GRID_ROWS, _apply_totals, compute_estimate
+from utils.rate_card import CAPACITY_COLUMNS, RateCard
+
+
+def _reference_totals(column):
+    """L16, L29, L44, L45, L47, L48, L49 of one value column, as the form computed them"""
+    def section(first, end, plain_only=False):
+        total = 0
+        for value in column[first:end]:
+            value = value or '0'
+            if plain_only and not value.replace('.', '', 1).isdigit():
+                continue
+            try:
+                total += float(value)
+            except ValueError:
+                total += 0
+        return str(round(total, 2))
+
+    l16 = section(8, 15)
+    l29 = section(16, 28)
+    l44 = section(32, 43, plain_only=True)
+    l45 = str(round(float(l29) + float(l44), 2))
+    l47 = str(round(float(l45) + float(l16) - float("0.00"), 2))
+    l48 = str(round(float(l47) * 0.04, 2))
+    l49 = str(round(float(l47) + float(l48), 2))
+    return [l16, l29, l44, l45, l47, l48, l49]
+
+
+def _random_values(rng, count):
+    """
+    Value columns of count transformers: Reqd rows carry the 3-decimal template rate
+    as is, the other rows rate times quantity rounded to cents
+    """
+    val = np.full((count, GRID_ROWS), '', dtype=object)
+    for i in range(count):
+        for row in list(range(8, 15)) + list(range(16, 28)) + list(range(32, 43)):
+            roll = rng.random()
+            if roll < 0.1:
+                val[i, row] = ''
+            elif roll < 0.15:
+                val[i, row] = '0'
+            elif roll < 0.5:
+                val[i, row] = str(rng.randint(1, 2000000) / 1000)
+            else:
+                rate = rng.randint(1, 2000000) / 1000
+                val[i, row] = str(round(rate * rng.randint(1, 12), 2))
+    return val
+
+
+def _baseline_grid(rows, template):
+    """
+    Estimate block as the form built it before utils.estimate_engine, transcribed from
+    its save loops without the sheet I/O and prints; template is the ESTIMATE A1:I50 block
+    """
+    capacities = {"200 KVA": 7, "100 KVA": 6, "75 KVA": 5, "63 KVA": 5, "50 KVA": 5,
+                  "25 KVA": 4, "16 KVA": 3, "10 KVA": 3, "5 KVA": 2}
+    physical = [(20, 11), (21, 12), (22, 13), (23, 14), (24, 15), (25, 16), (18, 17), (19, 20),
+                (17, 21), (11, 22), (10, 23), (27, 24), (26, 25)]
+    internal = [(30, 38), (31, 40), (36, 41), (41, 43), (42, 42), (8, 45), (12, 44)]
+    data = [['' for _ in range(len(rows) * 5)] for _ in range(50)]
+    for index, row in enumerate(rows):
+        rate_col, qty_col, val_col = index * 5, index * 5 + 1, index * 5 + 2
+        data[7][val_col] = "Amount"
+        header = [row[8], row[6], row[5], row[7], "BOLTED" if row[26] == "B" else "SEALED",
+                  "CU" if row[35] == "CU" else "AL", row[45]]
+        for grid_row, value in enumerate(header):
+            data[grid_row][qty_col] = value
+        for grid_row, col in physical + internal:
+            if row[col - 1]:
+                data[grid_row][qty_col] = row[col - 1]
+        for grid_row, value in ((7, "Qty"), (9, "Reqd"), (13, "Reqd"), (14, "Reqd")):
+            data[grid_row][qty_col] = value
+        data[16][qty_col] = "Reqd" if row[26] == "S" else "NR"
+        data[7][rate_col], data[16][rate_col], data[26][rate_col], data[27][rate_col] = "Rate", "1452", "309", "143"
+
+        al = row[38].strip().upper() == "AL"
+        al_dpc = al and row[45].strip().upper() == "DPC"
+        data[32][rate_col] = template[32][2] if al_dpc else template[30][2]
+        data[33][rate_col] = template[33][2] if al else template[33][5]
+        data[37][rate_col] = template[37][2] if al_dpc else template[35][3]
+        data[38][rate_col] = template[38][2] if al_dpc else template[35][3]
+        data[39][rate_col] = template[39][2] if al_dpc else "0"
+        data[40][rate_col] = template[40][2] if al_dpc else "0"
+        for grid_row in list(range(8, 15)) + list(range(17, 26)) + [41, 42]:
+            total = 0
+            for capacity, col in capacities.items():
+                if row[7] == capacity:
+                    total = template[grid_row][col] or '0'
+            data[grid_row][rate_col] = total
+
+        for grid_row, columns in ((29, None), (30, (32, 33, 34)), (34, None), (35, (35, 36, 37))):
+            if columns is None:
+                data[grid_row][val_col:val_col + 3] = ["A", "B", "C"]
+                continue
+            coil_col = val_col
+            for col in columns:
+                if row[col - 1]:
+                    data[grid_row][coil_col] = row[col - 1]
+                    coil_col += 1
+
+    for index in range(len(rows)):
+        rate_col, qty_col, val_col = index * 5, index * 5 + 1, index * 5 + 2
+        for grid_row in (8, 9, 12, 13, 14, 16, 17, 18, 19, 26, 27, 41):
+            k_value = data[grid_row][qty_col]
+            data[grid_row][val_col] = data[grid_row][rate_col] if k_value and k_value.strip().upper() == "REQD" else "0"
+
+        # The nested try chain: a failure zeroes the cells after it
+        def zero(cells):
+            for grid_row, col in cells:
+                data[grid_row][col] = "0"
+        k38_41 = [(grid_row, qty_col) for grid_row in range(37, 41)]
+        l38_41 = [(grid_row, val_col) for grid_row in range(37, 41)]
+        try:
+            k33 = round(sum(float(data[30][val_col + i] or '0') for i in range(3)) * float(data[31][qty_col] or '0'), 2)
+            data[32][qty_col] = str(k33)
+        except ValueError:
+            zero([(32, qty_col), (32, val_col), (33, val_col)] + k38_41)
+            continue
+        try:
+            data[32][val_col] = str(round(k33 * float(data[32][rate_col] or '0'), 2))
+        except ValueError:
+            zero([(32, val_col), (33, val_col)] + k38_41)
+            continue
+        try:
+            data[33][val_col] = str(round(k33 * float(data[33][rate_col] or '0'), 2))
+        except ValueError:
+            zero([(33, val_col)] + k38_41)
+            continue
+        states = [str(data[35][val_col + i] or '').strip().upper() for i in range(3)]
+        for grid_row, state in ((37, "R"), (38, "D"), (39, "R"), (40, "D")):
+            data[grid_row][qty_col] = str(states.count(state))
+        try:
+            k37 = float(data[36][qty_col] or '0')
+            for grid_row in range(37, 41):
+                data[grid_row][val_col] = str(round(
+                    float(data[grid_row][rate_col] or '0') * float(data[grid_row][qty_col] or '0') * k37, 2))
+        except ValueError:
+            zero(l38_41)
+
+    for index in range(len(rows)):
+        rate_col, qty_col, val_col = index * 5, index * 5 + 1, index * 5 + 2
+        for grid_row in (10, 11, 20, 21, 22, 23, 24, 25, 42):
+            j_value, k_value = data[grid_row][rate_col], data[grid_row][qty_col]
+            try:
+                data[grid_row][val_col] = str(round((float(j_value) if j_value else 0) * (float(k_value) if k_value else 0), 2))
+            except ValueError:
+                data[grid_row][val_col] = "0"
+
+    def number(value):
+        try:
+            return float(value or '0')
+        except ValueError:
+            return 0
+
+    for index in range(len(rows)):
+        val_col = index * 5 + 2
+        data[15][val_col] = str(round(sum(number(data[r][val_col]) for r in range(8, 15)), 2))
+        data[28][val_col] = str(round(sum(number(data[r][val_col]) for r in range(16, 28)), 2))
+        try:
+            total = 0
+            for grid_row in range(32, 43):
+                value = data[grid_row][val_col]
+                total += float(value) if value.replace('.', '', 1).isdigit() else 0
+            data[43][val_col] = str(round(total, 2))
+        except Exception:
+            # A rate copied as the integer 0 (unknown capacity) has no replace()
+            data[43][val_col] = "0"
+        data[44][val_col] = str(round(number(data[28][val_col]) + number(data[43][val_col]), 2))
+        data[45][val_col] = "0.00"
+        data[46][val_col] = str(round(number(data[44][val_col]) + number(data[15][val_col]) - 0.0, 2))
+        data[47][val_col] = str(round(number(data[46][val_col]) * 0.04, 2))
+        data[48][val_col] = str(round(number(data[46][val_col]) + number(data[47][val_col]), 2))
+    return data
+
+
+# Cell texts for the random MASTER rows and templates: numbers, blanks, Reqd/NR,
+# coil states and text that float() rejects
+_CELL_TEXTS = ['', '', '0', '1', '2', '3.5', '12.345', '-1', 'Reqd', ' reqd ', 'NR', 'R', 'D', 'x', 'AL', 'DPC']
+_RATE_TEXTS = ['', '0', '7', '12.5', '309.125', '1452', 'n/a']
+
+
+def _random_mr(rng, count):
+    rows = []
+    for i in range(count):
+        row = [rng.choice(_CELL_TEXTS) for _ in range(62)]
+        row[5], row[8] = f"TC{i}", f"JOB{i}"
+        row[7] = rng.choice(list(CAPACITY_COLUMNS) + ["300 KVA", ""])
+        row[26] = rng.choice(["B", "S", ""])
+        row[35] = rng.choice(["CU", "AL", "R", "D"])
+        row[38] = rng.choice(["AL", "al ", "CU", ""])
+        row[45] = rng.choice(["DPC", " dpc", "SE", ""])
+        rows.append(row)
+    return rows
+
+
+def _random_template(rng):
+    return [[rng.choice(_RATE_TEXTS) for _ in range(9)] for _ in range(50)]
+
+
+class ApplyTotalsTest(unittest.TestCase):
+
+    def test_matches_step_by_step_totals(self):
+        for seed in range(300):
+            rng = random.Random(seed)
+            val = _random_values(rng, rng.randint(1, 8))
+            expected = [_reference_totals(list(column)) for column in val]
+            _apply_totals(val)
+            for i, column in enumerate(val):
+                got = [column[row] for row in (15, 28, 43, 44, 46, 47, 48)]
+                self.assertEqual(got, expected[i], f"seed {seed}, transformer {i + 1}")
+
+
+
+class ComputeEstimateTest(unittest.TestCase):
+
+    def assertSameGrid(self, rows, template, message):
+        got = compute_estimate(rows, RateCard.from_rows(template)).grid
+        expected = _baseline_grid(rows, template)
+        for grid_row in range(GRID_ROWS):
+            self.assertEqual(got[grid_row], expected[grid_row], f"{message}, row {grid_row + 1}")
+
+    def test_matches_the_old_loops(self):
+        for seed in range(200):
+            rng = random.Random(seed)
+            self.assertSameGrid(_random_mr(rng, rng.randint(1, 6)), _random_template(rng), f"seed {seed}")
+
+    def test_unknown_capacity_with_inside_paint_reqd(self):
+        rng = random.Random(1)
+        rows = _random_mr(rng, 2)
+        template = [[str(rng.randint(1, 500)) for _ in range(9)] for _ in range(50)]
+        rows[0][7] = "300 KVA"  # no rate column, so L42 takes the integer rate 0
+        rows[0][42] = "Reqd"
+        self.assertSameGrid(rows, template, "unknown capacity")
+        result = compute_estimate(rows, RateCard.from_rows(template))
+        self.assertEqual(result.grid[43][2], "0")
+        self.assertEqual(result.totals[0].l44, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+estimate_key and EstimateMemo: what a memoized estimate is keyed on, and the
+round trip through the JSON file.
+"""
+import os
+import tempfile
+import unittest
+from unittest import mock
+from utils import estimate_memo
+from utils.estimate_engine import EstimateResult, TransformerTotals
+from utils.estimate_memo import KEY_COLUMNS, EstimateMemo, estimate_key
+
+
+class FakeRateCard:
+
+    def __init__(self, version):
+        self.version = version
+
+
+ROWS = [[f"r{row}c{col}" for col in range(60)] for row in range(2)]
+
+
+class EstimateKeyTest(unittest.TestCase):
+
+    def test_same_input_same_key(self):
+        self.assertEqual(estimate_key(ROWS, FakeRateCard("a")), estimate_key([list(r) for r in ROWS], FakeRateCard("a")))
+
+    def test_columns_past_au_are_ignored(self):
+        rows = [list(row) for row in ROWS]
+        rows[0][KEY_COLUMNS] = "TESTING DATE"
+        self.assertEqual(estimate_key(rows, FakeRateCard("a")), estimate_key(ROWS, FakeRateCard("a")))
+
+    def test_rows_rate_card_and_engine_change_the_key(self):
+        key = estimate_key(ROWS, FakeRateCard("a"))
+        rows = [list(row) for row in ROWS]
+        rows[1][KEY_COLUMNS - 1] = "changed"
+        self.assertNotEqual(estimate_key(rows, FakeRateCard("a")), key)
+        self.assertNotEqual(estimate_key(ROWS, FakeRateCard("b")), key)
+        with mock.patch.object(estimate_memo, "ENGINE_VERSION", estimate_memo.ENGINE_VERSION + 1):
+            self.assertNotEqual(estimate_key(ROWS, FakeRateCard("a")), key)
+
+
+class EstimateMemoTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, "estimates.json")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def result(self, value):
+        grid = [[''] * 5 for _ in range(50)]
+        grid[15][2] = value
+        return EstimateResult(grid, [TransformerTotals(value, "0", "0", "0", "0", "0", "0", "0")])
+
+    def test_round_trip_through_the_file(self):
+        EstimateMemo(path=self.path).put("k", self.result("12.5"))
+        result = EstimateMemo(path=self.path).get("k")
+        self.assertEqual(result.grid[15][2], "12.5")
+        self.assertEqual(result.totals[0].l16, "12.5")
+
+    def test_least_recently_used_entry_goes_first(self):
+        memo = EstimateMemo(maxsize=2, path=self.path)
+        memo.put("a", self.result("1"))
+        memo.put("b", self.result("2"))
+        memo.get("a")
+        memo.put("c", self.result("3"))
+        self.assertIsNone(memo.get("b"))
+        self.assertIsNotNone(memo.get("a"))
+        self.assertIsNotNone(memo.get("c"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+"""
+Lot numbering: the MASTER counters, the reservation log, and the preview when
+no LOT COUNTERS worksheet exists yet.
+"""
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from utils import lot_allocator
+from utils.lot_allocator import LotCounters, ReservationLog, format_lot, preview_lot
+
+
+def master_row(division, lot):
+    row = [''] * 9
+    row[0], row[3] = division, lot
+    return row
+
+
+HEADER = [''] * 9
+
+
+class LotCountersTest(unittest.TestCase):
+
+    def test_highest_number_per_division(self):
+        snapshot = SimpleNamespace(rows=[HEADER, HEADER,
+                                         master_row("MEHSANA", "M3"), master_row("MEHSANA", "M12"),
+                                         master_row("TALOD", "T4"), master_row("MEHSANA", "X99"),
+                                         master_row("", "M50")])
+        counters = LotCounters(snapshot)
+        self.assertEqual(counters.last("MEHSANA"), 12)
+        self.assertEqual(counters.last("TALOD"), 4)
+        self.assertEqual(counters.last("NORTH"), 0)
+
+    def test_hooks_count_new_rows(self):
+        snapshot = SimpleNamespace(rows=[HEADER, HEADER, master_row("MEHSANA", "M3")])
+        counters = LotCounters(snapshot)
+        snapshot.rows.append(master_row("MEHSANA", "M7"))
+        counters.on_rows_appended(snapshot, 4, 1)
+        self.assertEqual(counters.last("MEHSANA"), 7)
+        snapshot.rows[2] = master_row("MEHSANA", "M9")
+        counters.on_rows_patched(snapshot, 3, 1)
+        self.assertEqual(counters.last("MEHSANA"), 9)
+
+
+class ReservationLogTest(unittest.TestCase):
+
+    def test_highest_reservation_per_division(self):
+        snapshot = SimpleNamespace(rows=[
+            ["DIVISION", "LOT NUMBER", "WORKSTATION", "TOKEN", "RESERVED AT"],
+            ["MEHSANA", "13", "pc1", "a", ""],
+            ["MEHSANA", "bad", "pc1", "b", ""],
+            ["TALOD", "5", "pc2", "c", ""],
+        ])
+        log = ReservationLog(snapshot)
+        self.assertEqual((log.last("MEHSANA"), log.last("TALOD")), (13, 5))
+        snapshot.rows.append(["MEHSANA", "14", "pc2", "d", ""])
+        log.on_rows_appended(snapshot, 5, 1)
+        self.assertEqual(log.last("MEHSANA"), 14)
+
+
+class PreviewLotTest(unittest.TestCase):
+
+    def test_missing_log_worksheet_is_an_empty_log_and_is_not_created(self):
+        snapshot = SimpleNamespace(rows=[HEADER, HEADER, master_row("MEHSANA", "M3")])
+        cache = mock.Mock()
+        cache.get_derived.side_effect = lambda worksheet, name, factory, revalidate=True: factory(snapshot)
+        with mock.patch.object(lot_allocator, "find_lot_sheet", return_value=None), \
+                mock.patch.object(lot_allocator, "add_worksheet") as add_worksheet, \
+                mock.patch.object(lot_allocator, "snapshot_cache", cache):
+            self.assertEqual(preview_lot(object(), "MEHSANA"), format_lot("MEHSANA", 4))
+        add_worksheet.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+MrSummary: per-MR counts and completion, built from a snapshot and kept current
+by the patch and append hooks.
+"""
+import unittest
+from types import SimpleNamespace
+from utils.mr_summary import MrSummary
+from utils.stage_status import INTERNAL, PHYSICAL, TESTING
+
+
+def master_row(mr_no, lot="M1", physical='', internal=''):
+    row = [''] * 62
+    row[0], row[2], row[3], row[4] = "MEHSANA", mr_no, lot, "01/03/2024"
+    row[9], row[30] = physical, internal
+    return row
+
+
+class SnapshotStub:
+    """Just enough of SheetSnapshot for derived structures and their hooks"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self._derived = {}
+
+    def derived(self, name, factory):
+        if name not in self._derived:
+            self._derived[name] = factory(self)
+        return self._derived[name]
+
+    def patch(self, row_number, row):
+        self.rows[row_number - 1] = row
+        for structure in list(self._derived.values()):
+            structure.on_rows_patched(self, row_number, 1)
+
+    def append(self, row):
+        self.rows.append(row)
+        for structure in list(self._derived.values()):
+            structure.on_rows_appended(self, len(self.rows), 1)
+
+
+class MrSummaryTest(unittest.TestCase):
+
+    def setUp(self):
+        header = [''] * 62
+        self.snapshot = SnapshotStub([header, header,
+                                      master_row("MR1", physical="01/03/2024"),
+                                      master_row("MR1"),
+                                      master_row("MR2", lot="M2", physical="02/03/2024", internal="03/03/2024")])
+        self.summary = self.snapshot.derived("mr_summary", MrSummary)
+
+    def entry(self, mr_no):
+        return {entry.mr_no: entry for entry in self.summary.entries()}[mr_no]
+
+    def test_stage_complete_only_when_every_tc_is(self):
+        mr1 = self.entry("MR1")
+        self.assertEqual(mr1.tc_count, 2)
+        self.assertEqual(mr1.completed(PHYSICAL), "NO")
+        mr2 = self.entry("MR2")
+        self.assertEqual((mr2.completed(PHYSICAL), mr2.completed(INTERNAL), mr2.completed(TESTING)), ("YES", "YES", "NO"))
+
+    def test_patch_completes_the_mr(self):
+        self.snapshot.patch(4, master_row("MR1", physical="04/03/2024"))
+        self.assertEqual(self.entry("MR1").completed(PHYSICAL), "YES")
+
+    def test_appended_tc_reopens_the_mr(self):
+        self.snapshot.append(master_row("MR2", lot="M2"))
+        mr2 = self.entry("MR2")
+        self.assertEqual(mr2.tc_count, 2)
+        self.assertEqual(mr2.completed(PHYSICAL), "NO")
+
+    def test_row_moved_to_another_mr(self):
+        self.snapshot.patch(3, master_row("MR3", lot="M3", physical="01/03/2024"))
+        self.assertEqual({entry.mr_no for entry in self.summary.entries()}, {"MR1", "MR2", "MR3"})
+        mr1 = self.entry("MR1")
+        self.assertEqual((mr1.tc_count, mr1.first_row), (1, 4))
+        self.assertEqual(self.entry("MR3").completed(PHYSICAL), "YES")
+
+    def test_entries_are_copies(self):
+        self.entry("MR1").done[PHYSICAL] = 99
+        self.assertEqual(self.entry("MR1").done[PHYSICAL], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
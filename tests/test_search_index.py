@@ -0,0 +1,86 @@
+"""
+Prefix search and date ranges over a snapshot, and how both follow its patch and
+append hooks.
+"""
+import unittest
+from datetime import date
+from utils.date_index import DateIndex, parse_date
+from utils.search_index import SearchIndex
+from utils.sheet_cache import SheetSnapshot
+
+
+def master_row(mr_no, tc_no, intake='', testing=''):
+    row = [''] * 62
+    row[2], row[4], row[5], row[47] = mr_no, intake, tc_no, testing
+    return row
+
+
+HEADER = master_row("MR NO", "TC NO", "DATE")
+
+
+class SearchIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.snapshot = SheetSnapshot([HEADER, HEADER,
+                                       master_row("MR10", "tc-100"),
+                                       master_row("MR11", " TC-200 "),
+                                       master_row("MR2", "TC-101"),
+                                       master_row("", "")], 1)
+        self.index = self.snapshot.derived("search_index", SearchIndex)
+
+    def test_prefix_is_case_blind_and_in_key_order(self):
+        self.assertEqual(self.index.search("TC NO", "tc-1"), (2, [3, 5]))
+        self.assertEqual(self.index.search("MR NO", "MR1"), (2, [3, 4]))
+        self.assertEqual(self.index.search("TC NO", "TC-9"), (0, []))
+
+    def test_limit_keeps_the_count(self):
+        self.assertEqual(self.index.search("TC NO", "TC", limit=1), (3, [3]))
+
+    def test_blank_text_matches_every_filled_row(self):
+        self.assertEqual(self.index.search("MR NO", "")[0], 3)
+
+    def test_headers_are_not_searched(self):
+        self.assertEqual(self.index.search("MR NO", "MR NO"), (0, []))
+
+    def test_patch_moves_only_the_changed_key(self):
+        self.snapshot.patch_range(3, 5, [["TC-300"]])
+        self.assertEqual(self.index.search("TC NO", "TC-1"), (1, [5]))
+        self.assertEqual(self.index.search("TC NO", "TC-3"), (1, [3]))
+        self.assertEqual(self.index.search("MR NO", "MR10"), (1, [3]))
+
+    def test_appended_rows_are_found(self):
+        self.snapshot.append_rows([master_row("MR12", "TC-102")])
+        self.assertEqual(self.index.search("TC NO", "TC-10"), (3, [3, 5, 7]))
+
+
+class DateIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.snapshot = SheetSnapshot([HEADER, HEADER,
+                                       master_row("MR1", "TC1", "05/03/2024", "20/03/2024"),
+                                       master_row("MR1", "TC2", "01/03/2024"),
+                                       master_row("MR2", "TC3", "15/03/2024"),
+                                       master_row("MR3", "TC4", "not a date")], 1)
+        self.index = self.snapshot.derived("date_index", DateIndex)
+
+    def test_parse_date(self):
+        self.assertEqual(parse_date(" 05/03/2024 "), date(2024, 3, 5))
+        self.assertIsNone(parse_date("2024-03-05"))
+
+    def test_between_includes_both_ends_in_date_order(self):
+        self.assertEqual(self.index.between("INTAKE", date(2024, 3, 1), date(2024, 3, 5)), (2, [4, 3]))
+
+    def test_open_ends(self):
+        self.assertEqual(self.index.between("INTAKE", date_from=date(2024, 3, 2)), (2, [3, 5]))
+        self.assertEqual(self.index.between("INTAKE", date_to=date(2024, 3, 4)), (1, [4]))
+        self.assertEqual(self.index.between("INTAKE")[0], 3)
+
+    def test_patch_and_append(self):
+        self.snapshot.patch_range(4, 47, [["21/03/2024"]])
+        self.snapshot.append_rows([master_row("MR4", "TC5", "02/03/2024", "19/03/2024")])
+        self.assertEqual(self.index.between("TESTING", date(2024, 3, 19)), (3, [7, 3, 4]))
+        self.assertEqual(self.index.between("INTAKE", date_to=date(2024, 3, 2)), (2, [4, 7]))
+
+
+if __name__ == "__main__":
+    unittest.main()
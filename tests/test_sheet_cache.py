@@ -0,0 +1,151 @@
+"""
+SheetSnapshotCache against a stand-in spreadsheet whose Drive version goes up by
+one per write request, as the real one does.
+"""
+import threading
+import time
+import unittest
+from utils.sheet_cache import SheetSnapshot, SheetSnapshotCache, appended_row_number
+
+
+class FakeResponse:
+
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+class FakeSpreadsheet:
+
+    def __init__(self):
+        self.version = 1
+        self.client = self
+        self.revision_reads = 0
+
+    def request(self, method, url, params=None):
+        self.revision_reads += 1
+        return FakeResponse({"version": str(self.version)})
+
+
+class FakeWorksheet:
+
+    def __init__(self, spreadsheet, sheet_id, rows):
+        self.spreadsheet = spreadsheet
+        self.spreadsheet_id = "spreadsheet"
+        self.id = sheet_id
+        self.title = f"SHEET {sheet_id}"
+        self.rows = rows
+        self.downloads = 0
+
+    def get_all_values(self):
+        self.downloads += 1
+        return [list(row) for row in self.rows]
+
+    def write(self, row_number, values):
+        # One write request, from this process or another
+        self.rows[row_number - 1] = list(values)
+        self.spreadsheet.version += 1
+
+
+class RevisionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.spreadsheet = FakeSpreadsheet()
+        self.master = FakeWorksheet(self.spreadsheet, 1, [["H"], ["H"], ["a"], ["b"]])
+        self.estimate = FakeWorksheet(self.spreadsheet, 2, [["x"]])
+        # Every read after the first checks the revision
+        self.cache = SheetSnapshotCache(revision_check_interval=0)
+        self.snapshot = self.cache.get_snapshot(self.master)
+
+    def own_write(self, worksheet, row_number, values):
+        revision = self.cache.revision_before_write(worksheet)
+        worksheet.write(row_number, values)
+        self.cache.record_update(worksheet, row_number, 0, [values], revision)
+
+    def test_own_write_is_not_downloaded_again(self):
+        self.own_write(self.master, 3, ["A"])
+        self.own_write(self.master, 4, ["B"])
+        snapshot = self.cache.get_snapshot(self.master)
+        self.assertIs(snapshot, self.snapshot)
+        self.assertEqual(snapshot.rows[2:], [["A"], ["B"]])
+        self.assertEqual(self.master.downloads, 1)
+
+    def test_own_write_needs_no_revision_read(self):
+        reads = self.spreadsheet.revision_reads
+        self.own_write(self.master, 3, ["A"])
+        self.assertEqual(self.spreadsheet.revision_reads, reads)
+
+    def test_write_from_elsewhere_after_ours_is_downloaded(self):
+        self.own_write(self.master, 3, ["A"])
+        self.master.write(4, ["other"])
+        snapshot = self.cache.get_snapshot(self.master)
+        self.assertIsNot(snapshot, self.snapshot)
+        self.assertEqual(snapshot.rows[3], ["other"])
+
+    def test_write_from_elsewhere_before_ours_is_downloaded(self):
+        self.master.write(4, ["other"])
+        self.own_write(self.master, 3, ["A"])
+        self.assertEqual(self.cache.get_snapshot(self.master).rows[2:], [["A"], ["other"]])
+
+    def test_write_to_another_worksheet_keeps_snapshots_current(self):
+        estimate = self.cache.get_snapshot(self.estimate)
+        self.own_write(self.estimate, 1, ["y"])
+        self.assertIs(self.cache.get_snapshot(self.master), self.snapshot)
+        self.assertIs(self.cache.get_snapshot(self.estimate), estimate)
+
+    def test_uncounted_request_drops_the_snapshot(self):
+        revision = self.cache.revision_before_write(self.master)
+        self.master.write(3, ["A"])
+        self.spreadsheet.version += 1  # a second request record_update was not told about
+        self.cache.record_update(self.master, 3, 0, [["A"]], revision)
+        self.assertIsNot(self.cache.get_snapshot(self.master), self.snapshot)
+
+    def test_append(self):
+        revision = self.cache.revision_before_write(self.master)
+        self.master.rows.append(["c"])
+        self.spreadsheet.version += 1
+        self.assertEqual(self.cache.record_append(self.master, [["c"]], 5, revision), 5)
+        self.assertIs(self.cache.get_snapshot(self.master), self.snapshot)
+
+    def test_append_at_another_row_drops_the_snapshot(self):
+        revision = self.cache.revision_before_write(self.master)
+        self.cache.record_append(self.master, [["c"]], 7, revision)
+        self.assertIsNone(self.cache.peek(self.master))
+
+    def test_appended_row_number(self):
+        response = {"updates": {"updatedRange": "'MASTER SHEET'!A120:E125"}}
+        self.assertEqual(appended_row_number(response), 120)
+
+
+class SnapshotLockTest(unittest.TestCase):
+
+    def test_derived_is_built_once_across_threads(self):
+        snapshot = SheetSnapshot([["a"]], 1)
+        builds = []
+
+        def factory(snapshot):
+            builds.append(1)
+            time.sleep(0.05)
+            return object()
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(snapshot.derived("x", factory))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(builds), 1)
+        self.assertEqual(len({id(result) for result in results}), 1)
+
+    def test_copy_rows_is_not_patched(self):
+        snapshot = SheetSnapshot([["a", "b"]], 1)
+        rows = snapshot.copy_rows()
+        snapshot.patch_range(1, 1, [["c"]])
+        self.assertEqual(rows, [["a", "b"]])
+        self.assertEqual(snapshot.rows, [["a", "c"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+"""
+TC and MR indexes of the MASTER SHEET, their hooks, and get_mr_rows on the MR NO
+column cache.
+"""
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from utils import sheet_index
+from utils.sheet_cache import SheetSnapshot, SheetSnapshotCache
+from utils.sheet_index import ColumnSnapshotCache, DuplicateTcError, MrIndex, TcIndex, get_mr_rows, get_tc_row
+
+
+def master_row(mr_no, tc_no):
+    row = [''] * 62
+    row[2], row[5] = mr_no, tc_no
+    return row
+
+
+HEADER = [''] * 62
+
+
+class TcIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.snapshot = SheetSnapshot([HEADER, HEADER, master_row("MR1", "TC1"), master_row("MR1", " TC2 ")], 1)
+        self.index = self.snapshot.derived("tc_index", TcIndex)
+
+    def test_row_for(self):
+        self.assertEqual(self.index.row_for("TC2"), 4)
+        self.assertIsNone(self.index.row_for("TC9"))
+
+    def test_duplicate_tc(self):
+        self.snapshot.append_rows([master_row("MR2", "TC1")])
+        with self.assertRaises(DuplicateTcError) as raised:
+            self.index.row_for("TC1")
+        self.assertEqual(raised.exception.row_numbers, [3, 5])
+        self.assertEqual(self.index.duplicates(), {"TC1": [3, 5]})
+
+    def test_patch_moves_the_tc(self):
+        self.snapshot.patch_range(3, 5, [["TC3"]])
+        self.assertIsNone(self.index.row_for("TC1"))
+        self.assertEqual(self.index.row_for("TC3"), 3)
+
+
+class GetTcRowTest(unittest.TestCase):
+
+    def setUp(self):
+        self.snapshot = SheetSnapshot([HEADER, HEADER, master_row("MR1", "TC1"), master_row("MR1", "TC2")], 1)
+        cache = mock.Mock()
+        cache.get_snapshot.return_value = self.snapshot
+        patch = mock.patch.object(sheet_index, "snapshot_cache", cache)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_row_is_a_copy(self):
+        row = get_tc_row(object(), "TC2")
+        self.assertEqual(row[5], "TC2")
+        row[5] = "changed"
+        self.assertEqual(self.snapshot.rows[3][5], "TC2")
+        self.assertIsNone(get_tc_row(object(), "TC9"))
+
+    def test_duplicate_tc_is_not_resolved_to_the_first_row(self):
+        self.snapshot.append_rows([master_row("MR2", "TC1")])
+        with self.assertRaises(DuplicateTcError):
+            get_tc_row(object(), "TC1")
+
+
+class MrIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.snapshot = SheetSnapshot([HEADER, HEADER, master_row("MR1", "TC1"), master_row("MR1", "TC2"),
+                                       master_row("MR2", "TC3")], 1)
+        self.index = self.snapshot.derived("mr_index", MrIndex)
+
+    def test_spans(self):
+        self.assertEqual(self.index.spans_for("MR1"), [(3, 4)])
+        self.snapshot.append_rows([master_row("MR1", "TC4"), master_row("MR1", "TC5")])
+        self.assertEqual(self.index.spans_for("MR1"), [(3, 4), (6, 7)])
+
+    def test_patch_changing_the_mr_rebuilds(self):
+        self.snapshot.patch_range(4, 2, [["MR2"]])
+        self.assertEqual(self.index.spans_for("MR1"), [(3, 3)])
+        self.assertEqual(self.index.spans_for("MR2"), [(4, 5)])
+
+
+class FakeResponse:
+
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+class FakeWorksheet:
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.version = 1
+        self.spreadsheet = SimpleNamespace(client=self)
+        self.spreadsheet_id = "spreadsheet"
+        self.id = 1
+        self.title = "MASTER SHEET"
+        self.batch_gets = 0
+
+    def request(self, method, url, params=None):
+        return FakeResponse({"version": str(self.version)})
+
+    def col_values(self, col):
+        return [row[col - 1] for row in self.rows]
+
+    def batch_get(self, ranges):
+        self.batch_gets += 1
+        result = []
+        for a1 in ranges:
+            first, last = (int(part.lstrip("ABCDEFGHIJKLMNOPQRSTUVWXYZ")) for part in a1.split(":"))
+            result.append([list(row) for row in self.rows[first - 1:last]])
+        return result
+
+
+class GetMrRowsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.worksheet = FakeWorksheet([HEADER, HEADER, master_row("MR1", "TC1"), master_row("MR1", "TC2"),
+                                        master_row("MR2", "TC3")])
+        self.main = SheetSnapshotCache()
+        self.column = ColumnSnapshotCache(sheet_index.MR_NO_COL)
+        self.main.follow(self.column)
+        patches = [
+            mock.patch.object(sheet_index, "snapshot_cache", self.main),
+            mock.patch.object(sheet_index, "mr_column_cache", self.column),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tcs(self, rows):
+        return [row[5] for row in rows]
+
+    def test_rows_of_the_mr(self):
+        self.assertEqual(self.tcs(get_mr_rows(self.worksheet, "MR1")), ["TC1", "TC2"])
+        self.assertIsNone(self.main.peek(self.worksheet))
+
+    def test_own_append_is_seen_without_a_new_column_read(self):
+        get_mr_rows(self.worksheet, "MR1")
+        revision = self.main.revision_before_write(self.worksheet)
+        new_row = master_row("MR2", "TC4")
+        self.worksheet.rows.append(new_row)
+        self.worksheet.version += 1
+        self.main.record_append(self.worksheet, [new_row], 6, revision)
+        with mock.patch.object(self.worksheet, "col_values", side_effect=AssertionError("column read again")):
+            self.assertEqual(self.tcs(get_mr_rows(self.worksheet, "MR2")), ["TC3", "TC4"])
+
+    def test_own_update_of_the_mr_column_is_followed(self):
+        get_mr_rows(self.worksheet, "MR1")
+        revision = self.main.revision_before_write(self.worksheet)
+        self.worksheet.rows[3][2] = "MR2"
+        self.worksheet.version += 1
+        self.main.record_update(self.worksheet, 4, 0, [self.worksheet.rows[3][:9]], revision)
+        self.assertEqual(self.tcs(get_mr_rows(self.worksheet, "MR2")), ["TC2", "TC3"])
+
+    def test_rows_moved_elsewhere_are_left_out(self):
+        get_mr_rows(self.worksheet, "MR1")
+        # Another workstation inserts a row above; the cached column still says rows 3-4
+        self.worksheet.rows.insert(2, master_row("MR0", "TC0"))
+        self.assertEqual(self.tcs(get_mr_rows(self.worksheet, "MR1")), ["TC1"])
+        self.assertIsNone(self.column.peek(self.worksheet))
+        self.assertEqual(self.tcs(get_mr_rows(self.worksheet, "MR1")), ["TC1", "TC2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+"""
+Differential writes: the rectangles of changed cells and the value ranges planned
+from them against the cached snapshot.
+"""
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from utils import sheet_writer
+from utils.sheet_cache import SheetSnapshot
+from utils.sheet_writer import _chunk_ranges, diff_rectangles, plan_grid
+
+
+class DiffRectanglesTest(unittest.TestCase):
+
+    def test_unchanged_grid(self):
+        grid = [["a", "b"], ["c", 1]]
+        self.assertEqual(diff_rectangles([["a", "b"], ["c", "1"]], grid), [])
+
+    def test_single_cell(self):
+        self.assertEqual(diff_rectangles([["a", "b", "c"]], [["a", "x", "c"]]), [(0, 0, 1, 2)])
+
+    def test_short_gap_is_written_through(self):
+        old = [["a"] * 8]
+        new = [["x", "a", "a", "x", "a", "a", "a", "x"]]
+        # Two unchanged cells are bridged, three split the run
+        self.assertEqual(diff_rectangles(old, new), [(0, 0, 0, 4), (0, 0, 7, 8)])
+
+    def test_same_run_on_consecutive_rows_is_merged(self):
+        old = [["a", "a"], ["a", "a"], ["a", "a"], ["a", "a"]]
+        new = [["a", "x"], ["a", "x"], ["x", "a"], ["a", "x"]]
+        self.assertEqual(diff_rectangles(old, new), [(0, 1, 1, 2), (2, 2, 0, 1), (3, 3, 1, 2)])
+
+    def test_rows_past_the_old_grid_are_changed_where_not_blank(self):
+        self.assertEqual(diff_rectangles([["a"]], [["a"], ["", "b"]]), [(1, 1, 1, 2)])
+
+
+class PlanGridTest(unittest.TestCase):
+
+    def setUp(self):
+        self.worksheet = SimpleNamespace(title="ESTIMATE")
+        self.cache = mock.Mock()
+        patch = mock.patch.object(sheet_writer, "snapshot_cache", self.cache)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_whole_grid_without_a_snapshot(self):
+        self.cache.peek.return_value = None
+        data = plan_grid(self.worksheet, 1, 9, [["a", "b"], ["c"]])
+        self.assertEqual([value_range["range"] for value_range in data], ["'ESTIMATE'!J1:K2"])
+
+    def test_only_changed_cells_against_the_snapshot(self):
+        rows = [[''] * 9 + ["a", "b"], [''] * 9 + ["c", "d"]]
+        self.cache.peek.return_value = SheetSnapshot(rows, 1)
+        data = plan_grid(self.worksheet, 1, 9, [["a", "b"], ["c", "x"]])
+        self.assertEqual(data, [{"range": "'ESTIMATE'!K2:K2", "values": [["x"]]}])
+
+    def test_tall_rectangles_are_split_into_bands(self):
+        self.cache.peek.return_value = None
+        grid = [["a", "b"] for _ in range(5)]
+        with mock.patch.object(sheet_writer, "MAX_CELLS_PER_REQUEST", 4):
+            data = plan_grid(self.worksheet, 3, 0, grid)
+        self.assertEqual([value_range["range"] for value_range in data],
+                         ["'ESTIMATE'!A3:B4", "'ESTIMATE'!A5:B6", "'ESTIMATE'!A7:B7"])
+
+    def test_ranges_are_chunked_by_cell_count(self):
+        data = [{"range": str(i), "values": [["a", "b"]]} for i in range(5)]
+        with mock.patch.object(sheet_writer, "MAX_CELLS_PER_REQUEST", 4):
+            chunks = _chunk_ranges(data)
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
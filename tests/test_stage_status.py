@@ -0,0 +1,73 @@
+"""
+Stage bitmask of MASTER rows, on full and on projected snapshots.
+"""
+import unittest
+from types import SimpleNamespace
+from utils.sheet_projection import Projection
+from utils.stage_status import ESTIMATE, INTERNAL, PHYSICAL, TESTING, StageStatus, has, row_status
+
+
+def master_row(**cells):
+    row = [''] * 62
+    for col, value in cells.items():
+        row[int(col[1:])] = value
+    return row
+
+
+class RowStatusTest(unittest.TestCase):
+
+    def test_dates_set_the_stages(self):
+        self.assertEqual(row_status(master_row()), 0)
+        self.assertEqual(row_status(master_row(c9="01/03/2024")), PHYSICAL)
+        self.assertEqual(row_status(master_row(c9="01/03/2024", c30="02/03/2024")), PHYSICAL | INTERNAL | ESTIMATE)
+        self.assertEqual(row_status(master_row(c47="03/03/2024")), TESTING)
+
+    def test_only_the_date_decides(self):
+        # Inspection cells without the date, as a full snapshot holds them
+        self.assertEqual(row_status(master_row(c10="OK", c31="A", c50="1.2")), 0)
+
+    def test_short_row(self):
+        self.assertEqual(row_status(["MR1"] * 10), PHYSICAL)
+
+    def test_has_needs_every_stage(self):
+        self.assertTrue(has(PHYSICAL | INTERNAL, PHYSICAL))
+        self.assertFalse(has(PHYSICAL, PHYSICAL | INTERNAL))
+        self.assertTrue(has(0, 0))
+
+
+class ProjectedStatusTest(unittest.TestCase):
+
+    def test_projected_and_full_snapshot_agree(self):
+        header = [''] * 62
+        rows = [
+            master_row(c9="01/03/2024", c10="OK"),
+            master_row(c10="OK", c11="OK"),
+            master_row(c30="02/03/2024", c47="03/03/2024"),
+            master_row(c50="1.2"),
+        ]
+        full = SimpleNamespace(rows=[header, header] + rows)
+        projection = Projection("test", ["A:I", "J", "AE", "AV"])
+        ranges = [
+            [row[first:last + 1] for row in rows]
+            for first, last in projection.spans
+        ]
+        projected = SimpleNamespace(rows=projection.stitch(ranges))
+        self.assertEqual(
+            list(StageStatus(full).status),
+            list(StageStatus(projected).status),
+        )
+
+    def test_patch_hook_follows_the_row(self):
+        snapshot = SimpleNamespace(rows=[[''] * 62, [''] * 62, master_row()])
+        stages = StageStatus(snapshot)
+        snapshot.rows[2][30] = "02/03/2024"
+        stages.on_rows_patched(snapshot, 3, 1)
+        self.assertEqual(stages.of(3), INTERNAL)
+        snapshot.rows.append(master_row(c9="01/03/2024"))
+        stages.on_rows_appended(snapshot, 4, 1)
+        self.assertEqual(stages.of(4), PHYSICAL)
+        self.assertEqual(stages.of(1), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+TableModel.sync against a stand-in Treeview that enforces the ttk item id rules:
+'' is the root item and every id is unique.
+"""
+import unittest
+from utils.table_model import TableModel
+
+
+class FakeTree:
+
+    def __init__(self):
+        self.items = {}
+        self.children = []
+
+    def insert(self, parent, index, iid=None, values=()):
+        if iid == '' or iid in self.items:
+            raise ValueError(f"Item {iid} already exists")
+        self.items[iid] = tuple(values)
+        self.children.insert(index, iid)
+
+    def delete(self, *items):
+        for item in items:
+            del self.items[item]
+            self.children.remove(item)
+
+    def move(self, item, parent, index):
+        self.children.remove(item)
+        self.children.insert(index, item)
+
+    def item(self, item, values=None):
+        self.items[item] = tuple(values)
+
+    def shown(self):
+        return [self.items[item] for item in self.children]
+
+
+class TableModelTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tree = FakeTree()
+        self.table = TableModel(self.tree)
+
+    def test_blank_and_duplicate_keys(self):
+        rows = [("", ["MR1", ""]), ("TC1", ["MR1", "TC1"]), ("", ["MR1", ""]), ("TC1", ["MR1", "TC1 again"])]
+        self.assertEqual(self.table.sync(rows), (4, 0, 0))
+        self.assertEqual(self.tree.shown(), [tuple(values) for _, values in rows])
+        self.assertEqual(self.table.rows(), [(key, tuple(values)) for key, values in rows])
+
+    def test_occurrence_suffix_does_not_collide_with_a_key(self):
+        rows = [("A", [1]), ("A", [2]), ("A#2", [3]), ("2:A", [4])]
+        self.assertEqual(self.table.sync(rows), (4, 0, 0))
+        self.assertEqual(self.tree.shown(), [(1,), (2,), (3,), (4,)])
+
+    def test_sync_applies_only_the_difference(self):
+        self.table.sync([(1, ["a"]), (2, ["b"]), (3, ["c"])])
+        self.assertEqual(self.table.sync([(3, ["c"]), (1, ["a2"]), (4, ["d"])]), (1, 1, 1))
+        self.assertEqual(self.tree.shown(), [("c",), ("a2",), ("d",)])
+        self.assertEqual(self.table.sync([(3, ["c"]), (1, ["a2"]), (4, ["d"])]), (0, 0, 0))
+
+    def test_clear(self):
+        self.table.sync([("", ["x"]), ("", ["y"])])
+        self.table.clear()
+        self.assertEqual(self.tree.shown(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
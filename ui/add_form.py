@@ -1,8 +1,9 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from tkcalendar import DateEntry
-from utils.helpers import on_division_select
-from config.sheets_setup import save_to_sheets, setup_google_sheets
+from utils.helpers import LOT_LOADING, on_division_select, set_lot_entry
+from utils.lot_allocator import reserve_lot
+from utils.async_sheets import run_coroutine, sheets
 
 def create_add_form(sheet):
     add_window = tk.Toplevel()
@@ -92,7 +93,7 @@ def create_add_form(sheet):
     submit_button = ttk.Button(
         button_frame,
         text="Submit",
-        command=lambda: on_add_submit(sheet, entries, selected_division),
+        command=lambda: on_add_submit(sheet, entries, selected_division, submit_button),
         width=15
     )
     submit_button.pack(side=tk.LEFT, padx=10)
@@ -114,7 +115,7 @@ def create_add_form(sheet):
     y = (add_window.winfo_screenheight() // 2) - (height // 2)
     add_window.geometry(f'{width}x{height}+{x}+{y}')
 
-def on_add_submit(sheet, entries, selected_division):
+def on_add_submit(sheet, entries, selected_division, submit_button):
     division = selected_division.get()
     if not division:
         messagebox.showerror("Error", "Please select a division!")
@@ -126,6 +127,9 @@ def on_add_submit(sheet, entries, selected_division):
         return
 
     truck_no, mr_no, lot_no, date, total_tc = data
+    if lot_no == LOT_LOADING:
+        messagebox.showerror("Error", "Lot number is still loading, please wait")
+        return
 
     try:
         total_tc = int(total_tc)
@@ -133,22 +137,35 @@ def on_add_submit(sheet, entries, selected_division):
         messagebox.showerror("Error", "Total TC must be a number!")
         return
 
-    first_page_data = [division, truck_no, mr_no, lot_no, date]
-    
-    # Save to both Master Sheet and Testing Sheet
-    try:
-        # Save to Master Sheet
+    lot_entry = entries[2]
+
+    async def add_intake():
+        # The shown lot number is a preview; reserve the real one so no other
+        # workstation can hand it out too
+        reserved_lot = await sheets.run_write(reserve_lot, sheet, division)
+        if reserved_lot != lot_no:
+            print(f"Debug - Lot {lot_no} was taken meanwhile, using {reserved_lot}")
+            set_lot_entry(lot_entry, reserved_lot)
+        first_page_data = [division, truck_no, mr_no, reserved_lot, date]
+
+        # Save to Master Sheet; the second form fills F:I of the rows the sheet appended
         rows_to_add = [first_page_data for _ in range(total_tc)]
-        if save_to_sheets(rows_to_add, "add_form"):
-            # # Save to Testing Sheet
-            # testing_sheet = setup_google_sheets().worksheet("TESTING")
-            # for _ in range(total_tc):
-            #     testing_sheet.append_row(first_page_data)
-            
-            # Create second form
-            from .second_form import create_second_form
-            create_second_form(sheet, total_tc, first_page_data)
-        else:
-            messagebox.showerror("Error", "Failed to save data to Master Sheet")
-    except Exception as e:
-        messagebox.showerror("Error", f"Failed to save data: {str(e)}") 
\ No newline at end of file
+        start_row = await sheets.write_form_rows(rows_to_add, "add_form")
+        # # Save to Testing Sheet
+        # testing_sheet = setup_google_sheets().worksheet("TESTING")
+        # for _ in range(total_tc):
+        #     testing_sheet.append_row(first_page_data)
+        testing_values = await sheets.sheet_values("TESTING")
+
+        # Create second form
+        from .second_form import create_second_form
+        create_second_form(sheet, total_tc, first_page_data, start_row, testing_values)
+
+    run_coroutine(
+        submit_button,
+        add_intake(),
+        on_error=lambda e: messagebox.showerror("Error", f"Failed to save data: {str(e)}"),
+        busy_message="Saving to Master Sheet...",
+        disable=[submit_button],
+        cancellable=False,  # a resubmit after Cancel would add the rows twice
+    )
@@ -1,6 +1,9 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from config.sheets_setup import get_worksheet
+from utils.mr_summary import get_mr_summary
+from utils.stage_status import PHYSICAL
+from utils.background import run_in_background
 from ui.physical_form import PhysicalVerificationForm
 
 class PhysicalVerificationForm1:
@@ -71,33 +74,20 @@ class PhysicalVerificationForm1:
         self.load_data()
 
     def load_data(self):
-        """Load MR NO data from the master sheet."""
+        """Load MR NO data from the master sheet, fetched in the background."""
+        run_in_background(
+            self.tree,
+            get_mr_summary, self.master_sheet,
+            on_success=self.fill_table,
+            on_error=lambda e: messagebox.showerror("Error", f"Error loading data: {str(e)}"),
+            busy_message="Loading MRs...",
+        )
+
+    def fill_table(self, entries):
+        """Show one row per MR NO from the MR summary."""
         try:
-            data = self.master_sheet.get_all_values()
-            mr_data = {}
-
-            # Group data by MR NO and count TCs
-            for row in data[2:]:  # Skip header rows
-                if row:
-                    mr_no = row[2]  # Assuming MR NO is at index 2
-                    if mr_no not in mr_data:
-                        mr_data[mr_no] = {
-                            "DIVISION": row[0],
-                            "LOT NO": row[3],
-                            "DATE": row[4],
-                            "Physical Completed": "NO",  # Default to NO
-                            "TC Count": 0  # Initialize TC count
-                        }
-                    mr_data[mr_no]["TC Count"] += 1  # Increment TC count
-
-                    # Check if columns J to AD (indices 9 to 29) are filled
-                    physical_data = row[9:30]  # Get data from columns J to AD
-                    if any(cell.strip() for cell in physical_data):  # Check if all cells are filled
-                        mr_data[mr_no]["Physical Completed"] = "YES"  # Set to YES if all are filled
-
-            # Insert grouped data into the tree
-            for mr_no, details in mr_data.items():
-                self.tree.insert('', tk.END, values=(mr_no, details["DIVISION"], details["LOT NO"], details["DATE"], details["Physical Completed"], details["TC Count"], "View"))
+            for entry in entries:
+                self.tree.insert('', tk.END, values=(entry.mr_no, entry.division, entry.lot_no, entry.date, entry.completed(PHYSICAL), entry.tc_count, "View"))
 
             # Bind the view button
             self.tree.bind('<Double-1>', self.on_view)
@@ -1,7 +1,14 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from tkcalendar import DateEntry
-from config.sheets_setup import setup_google_sheets, get_worksheet
+from config.sheets_setup import get_worksheet
+from utils.sheet_cache import get_sheet_values
+from utils.sheet_index import get_mr_rows
+from utils.mr_summary import MR_LIST_COLUMNS, get_mr_summary
+from utils.stage_status import TESTING, data_rows, get_status_snapshot, yes_no
+from utils.action_column import ActionColumn
+from utils.background import run_in_background
+from utils.table_model import TableModel
 from ui.enrollment_form import EnrollmentForm  # Ensure this import is correct
 from ui.physical_form import PhysicalVerificationForm  # Ensure this import is correct
 
@@ -11,9 +18,6 @@ class TestingVerificationForm:
         self.window.title("TESTING FORM")
         self.window.geometry("1200x800")
         
-        # Initialize buttons list
-        self.buttons = []
-        
         # Store the master sheet reference
         self.master_sheet = get_worksheet(sheet)  # Ensure this returns the correct worksheet object
         
@@ -98,161 +102,86 @@ class TestingVerificationForm:
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
-        # Bind events
+        # Enrol buttons for the visible rows: MR NO is at index 1, Testing Completed second to last
+        self.actions = ActionColumn(self.tree, scrollbar, 1, -2, self.start_enrollment)
+        self.table = TableModel(self.tree)
         self.tree.bind('<Map>', lambda e: self.load_table_data())
-        self.tree.bind('<Destroy>', lambda e: self.cleanup_buttons())
         self.tree.bind('<<TreeviewSelect>>', self.show_details)
-        self.tree.bind('<Configure>', self.update_button_positions)
 
     def load_table_data(self):
-        try:
-            # Check if the master_sheet is valid
-            if not self.master_sheet:
-                print("Master sheet is not valid.")
-                return
+        # Check if the master_sheet is valid
+        if not self.master_sheet:
+            print("Master sheet is not valid.")
+            return
 
-            # Get data from master sheet
-            data = self.master_sheet.get_all_values()  # This should be called on the worksheet object
-            
+        # Get data from master sheet in the background
+        run_in_background(
+            self.tree,
+            get_mr_summary, self.master_sheet,
+            on_success=self.fill_table,
+            on_error=lambda e: messagebox.showerror("Error", f"Error loading table data: {str(e)}"),
+            busy_message="Loading MRs...",
+        )
+
+    def fill_table(self, entries):
+        """Show the MR summary entries in the table"""
+        try:
             # Check if the treeview exists
             if not self.tree.winfo_exists():
                 print("Treeview does not exist.")
                 return  # Exit the function if the treeview is not valid
 
-            # Clear existing items and buttons
-            for button in self.buttons:
-                button.destroy()
-            self.buttons = []
-            
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            
-            # Find required column indices
-            required_cols = {
-                "DIVISION": 0, "MR NO": 2, "LOT NO": 3, "DATE": 4,
-            }
-            
-            grouped_data = {}
-            for row in data[2:]:
-                mr_no = row[required_cols["MR NO"]]
-                if mr_no not in grouped_data:
-                    grouped_data[mr_no] = [row[required_cols[col]] for col in required_cols]
-                    # Check if testing is completed (columns AT to BH)
-                    has_testing_data = any(row[45:60])  # Columns AT to BH
-                    testing_status = "YES" if has_testing_data else "NO"
-                    grouped_data[mr_no].append(testing_status)
-                    grouped_data[mr_no].append("")  # Empty string for EXECUTE column
-            
-            # Insert grouped data into the tree
-            for mr_no, row_data in grouped_data.items():
-                item = self.tree.insert('', tk.END, values=row_data)
-                # Create button
-                self.create_button_for_row(item, mr_no, row_data[-2])  # MR NO and Testing status
+            table_rows = []
+            for entry in entries:
+                testing_status = entry.completed(TESTING)
+                row_data = [entry.division, entry.mr_no, entry.lot_no, entry.date, testing_status, ""]  # "" for EXECUTE column
+                table_rows.append((entry.mr_no, row_data))
+            self.table.sync(table_rows)
+            self.actions.refresh()
                 
         except Exception as e:
             messagebox.showerror("Error", f"Error loading table data: {str(e)}")
             print(f"Debug - Error details: {str(e)}")
 
-    def create_button_for_row(self, item, mr_no, status):
-        try:
-            bbox = self.tree.bbox(item, "EXECUTE")
-            if not bbox:
-                return
-            
-            if status == "NO":
-                button = tk.Button(
-                    self.tree,
-                    text="Enrol",
-                    bg='#FF0000',
-                    fg='white',
-                    command=lambda mr=mr_no: self.start_enrollment(mr),
-                    width=8,
-                    font=('Arial', 9, 'bold'),
-                    relief="raised",
-                    borderwidth=2
-                )
-            else:
-                button = tk.Button(
-                    self.tree,
-                    text="Enrolled",
-                    bg='#00FF00',
-                    fg='white',
-                    state='disabled',
-                    width=8,
-                    font=('Arial', 9, 'bold'),
-                    relief="raised",
-                    borderwidth=2
-                )
-            
-            x = bbox[0] + 10
-            y = bbox[1] + 2
-            button.place(x=x, y=y)
-            self.buttons.append(button)
-            
-        except Exception as e:
-            print(f"Error creating button: {str(e)}")
-
-    def cleanup_buttons(self):
-        """Clean up buttons when table is destroyed"""
-        for button in self.buttons:
-            button.destroy()
-        self.buttons = []
-
-    def update_button_positions(self, event=None):
-        """Update positions of all buttons when tree view changes"""
-        try:
-            for button in self.buttons:
-                button.place_forget()
-            
-            for item in self.tree.get_children():
-                bbox = self.tree.bbox(item, "EXECUTE")
-                if bbox:
-                    values = self.tree.item(item)['values']
-                    if values:
-                        mr_no = values[1]  # MR NO is at index 1
-                        status = values[-2]  # Testing Completed is second to last
-                        self.create_button_for_row(item, mr_no, status)
-        except Exception as e:
-            print(f"Error updating button positions: {str(e)}")
-
     def search_and_update_table(self):
+        mr_no = self.mr_search.get().strip()
+        
+        if not mr_no:
+            self.load_table_data()
+            return
+        
+        # Get data in the background, then search it
+        run_in_background(
+            self.tree,
+            get_status_snapshot, self.master_sheet, MR_LIST_COLUMNS,
+            on_success=lambda snapshot: self.show_search_results(mr_no, snapshot),
+            on_error=lambda e: messagebox.showerror("Error", f"Error searching data: {str(e)}"),
+            busy_message="Searching...",
+        )
+
+    def show_search_results(self, mr_no, snapshot):
         try:
-            mr_no = self.mr_search.get().strip()
-            
-            if not mr_no:
-                self.load_table_data()
-                return
-            
-            # Clear existing items
-            for button in self.buttons:
-                button.destroy()
-            self.buttons = []
-            
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            
-            # Get data and search
-            print(type(self.master_sheet))  # Add this line before calling get_all_values()
-            data = self.master_sheet.get_all_values()
             required_cols = {
                 "DIVISION": 0, "MR NO": 2, "LOT NO": 3, "DATE": 4,
             }
             
-            for row in data[2:]:
+            table_rows = []
+            for row_number, row, status in data_rows(snapshot):
                 row_mr_no = row[required_cols["MR NO"]]
                 
                 if mr_no.lower() in row_mr_no.lower():
                     row_data = [row[required_cols[col]] for col in required_cols]
                     
-                    has_testing_data = any(row[45:60])  # Columns AT to BH
-                    testing_status = "YES" if has_testing_data else "NO"
+                    testing_status = yes_no(status, TESTING)
                     row_data.append(testing_status)
                     row_data.append("")
                     
-                    item = self.tree.insert('', tk.END, values=row_data)
-                    self.create_button_for_row(item, row[required_cols["MR NO"]], testing_status)
+                    table_rows.append((row_number, row_data))
             
-            if not self.tree.get_children():
+            if table_rows:
+                self.table.sync(table_rows)
+                self.actions.refresh()
+            else:
                 messagebox.showinfo("No Results", "No matching records found.")
                 self.load_table_data()
                 
@@ -261,29 +190,30 @@ class TestingVerificationForm:
             print(f"Debug - Search error details: {str(e)}")
 
     def start_enrollment(self, mr_no):
-        """Start the enrollment process for a MR NO"""
-        try:
-            # Get row data from master sheet
-            print(type(self.master_sheet))  # Add this line before calling get_all_values()
-            data = self.master_sheet.get_all_values()
-            row_data = None
-            
-            # Skip header rows and find the matching MR NO
-            for row in data[2:]:  # Skip first two rows
-                if str(row[2]).strip() == str(mr_no).strip():  # MR NO is in column C (index 2)
-                    row_data = row
-                    break
-            
-            if row_data is None:
-                messagebox.showerror("Error", f"MR No. {mr_no} not found in master sheet")
-                return
-            
-            # Create a new physical verification form with the designated MR NO
-            PhysicalVerificationForm(row_data)  # Pass the row data to the physical form
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Error starting enrollment: {str(e)}")
-            print(f"Debug - Start enrollment error: {str(e)}")
+        """Start the enrollment process for a MR NO: look it up in the background, then open the form"""
+        run_in_background(
+            self.tree,
+            self.find_master_row, mr_no,
+            on_success=lambda row_data: self.open_enrollment(mr_no, row_data),
+            on_error=lambda e: messagebox.showerror("Error", f"Error starting enrollment: {str(e)}"),
+            busy_message="Loading MR...",
+        )
+
+    def find_master_row(self, mr_no):
+        """First Master Sheet row of mr_no, None if missing; runs on the sheet I/O thread"""
+        data = get_sheet_values(self.master_sheet)
+        # Skip header rows and find the matching MR NO
+        for row in data[2:]:  # Skip first two rows
+            if str(row[2]).strip() == str(mr_no).strip():  # MR NO is in column C (index 2)
+                return row
+        return None
+
+    def open_enrollment(self, mr_no, row_data):
+        if row_data is None:
+            messagebox.showerror("Error", f"MR No. {mr_no} not found in master sheet")
+            return
+        # Create a new physical verification form with the designated MR NO
+        PhysicalVerificationForm(row_data)  # Pass the row data to the physical form
 
     def create_bill_window(self, row_data):
         """Create a new window to display a physical bill for the selected MR NO"""
@@ -349,18 +279,21 @@ class TestingVerificationForm:
         description_label = ttk.Label(details_window, text="Here are the details for the selected MR No:", font=("Arial", 12))
         description_label.pack(pady=(0, 10))  # Add some padding
 
-        # Fetch data for the selected MR NO
-        print(type(self.master_sheet))  # Add this line before calling get_all_values()
-        data = self.master_sheet.get_all_values()
-        details = [row for row in data[2:] if row[2] == mr_no]  # Assuming MR NO is at index 2
-
         # Create a text widget to display details
         details_text = tk.Text(details_window, wrap=tk.WORD)
         details_text.pack(expand=True, fill=tk.BOTH)
 
-        # Insert details into the text widget
-        for row in details:
-            details_text.insert(tk.END, f"{row}\n")
+        # Fetch data for the selected MR NO in the background, then insert it
+        def insert_details(details):
+            for row in details:
+                details_text.insert(tk.END, f"{row}\n")
+
+        run_in_background(
+            details_text,
+            get_mr_rows, self.master_sheet, mr_no,
+            on_success=insert_details,
+            on_error=lambda e: messagebox.showerror("Error", f"Error loading MR details: {str(e)}"),
+        )
 
         # Create a new table frame for additional details
         table_frame = ttk.Frame(details_window)
@@ -396,11 +329,11 @@ class TestingVerificationForm:
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
-        # Bind events
+        # Enrol buttons for the visible rows: MR NO is at index 1, Testing Completed second to last
+        self.actions = ActionColumn(self.tree, scrollbar, 1, -2, self.start_enrollment)
+        self.table = TableModel(self.tree)
         self.tree.bind('<Map>', lambda e: self.load_table_data())
-        self.tree.bind('<Destroy>', lambda e: self.cleanup_buttons())
         self.tree.bind('<<TreeviewSelect>>', self.show_details)
-        self.tree.bind('<Configure>', self.update_button_positions)
 
         # Add a back button
         back_button = ttk.Button(details_window, text="Back", command=details_window.destroy)
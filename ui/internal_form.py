@@ -6,7 +6,12 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-from config.sheets_setup import save_to_sheets, get_worksheet, setup_google_sheets
+from utils.sheet_cache import snapshot_cache
+from utils.sheet_index import find_tc_row, get_mr_rows, get_tc_row
+from utils.background import run_in_background
+from utils.action_column import ActionColumn
+from utils.table_model import TableModel
+from utils.stage_status import INTERNAL, data_rows, get_status_snapshot, row_status, yes_no
 from tkcalendar import DateEntry
 
 class InternalVerificationForm:
@@ -16,9 +21,6 @@ class InternalVerificationForm:
         self.window.title("INTERNAL FORM")
         self.window.geometry("1200x800")
         
-        # Initialize buttons list
-        self.buttons = []
-        
         # Store the master sheet reference
         self.master_sheet = master_sheet
         
@@ -111,86 +113,44 @@ class InternalVerificationForm:
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
-        # Bind events
+        # Enrol buttons for the visible rows: TC NO is at index 4, Internal Completed second to last
+        self.actions = ActionColumn(self.tree, scrollbar, 4, -2, self.start_enrollment)
+        self.table = TableModel(self.tree)
         self.tree.bind('<Map>', lambda e: self.load_table_data(mr_no))
-        self.tree.bind('<Destroy>', lambda e: self.cleanup_buttons())
-        self.tree.bind('<<TreeviewSelect>>', self.update_button_positions)
-        self.tree.bind('<Configure>', self.update_button_positions)
-        self.tree.bind('<MouseWheel>', self.update_button_positions)
 
     def load_table_data(self, mr_no):
-        """Load table data for given MR NO"""
+        """Load table data for given MR NO, fetched in the background"""
+        run_in_background(
+            self.tree,
+            get_mr_rows, self.master_sheet, mr_no,
+            on_success=self.fill_table,
+            on_error=lambda e: messagebox.showerror("Error", f"Error loading table data: {str(e)}"),
+            busy_message="Loading transformers...",
+        )
+
+    def fill_table(self, rows):
+        """Show the rows of one MR NO in the table"""
         try:
-            for button in self.buttons:
-                button.destroy()
-            self.buttons = []
-            
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            
-            data = self.master_sheet.get_all_values()
-            
             required_cols = {
                 "DIVISION": 0, "MR NO": 2, "LOT NO": 3, "DATE": 4,
                 "TC NO": 5, "MAKE": 6, "TC CAPACITY": 7, "JOB NO": 8
             }
             
-            for row in data[2:]:
-                if str(mr_no) == row[2]:
-                    row_data = [row[required_cols[col]] for col in required_cols]
-                    
-                    # Check internal inspection completion (columns AE to AU / 31:47)
-                    has_internal_data = any(row[31:47])
-                    internal_status = "YES" if has_internal_data else "NO"
-                    row_data.append(internal_status)
-                    row_data.append("")
-                    
-                    item = self.tree.insert('', tk.END, values=row_data)
-                    self.create_button_for_row(item, row[5], internal_status)
+            table_rows = []
+            for row in rows:
+                row_data = [row[required_cols[col]] for col in required_cols]
+                
+                internal_status = yes_no(row_status(row), INTERNAL)
+                row_data.append(internal_status)
+                row_data.append("")
+                
+                table_rows.append((row[5], row_data))  # keyed by TC NO
+            self.table.sync(table_rows)
+            self.actions.refresh()
                 
         except Exception as e:
             messagebox.showerror("Error", f"Error loading table data: {str(e)}")
 
-    def create_button_for_row(self, item, tc_no, status):
-        """Create action button for table row"""
-        try:
-            bbox = self.tree.bbox(item, "EXECUTE")
-            if not bbox:
-                return
-            
-            if status == "NO":
-                button = tk.Button(
-                    self.tree,
-                    text="Enrol",
-                    bg='#FF0000',
-                    fg='white',
-                    command=lambda tc=tc_no: self.start_enrollment(tc),
-                    width=8,
-                    font=('Arial', 9, 'bold'),
-                    relief="raised",
-                    borderwidth=2
-                )
-            else:
-                button = tk.Button(
-                    self.tree,
-                    text="Enrolled",
-                    bg='#00FF00',
-                    fg='white',
-                    state='disabled',
-                    width=8,
-                    font=('Arial', 9, 'bold'),
-                    relief="raised",
-                    borderwidth=2
-                )
-            
-            x = bbox[0] + 10
-            y = bbox[1] + 2
-            button.place(x=x, y=y)
-            self.buttons.append(button)
-            
-        except Exception as e:
-            print(f"Error creating button: {str(e)}")
-
     def create_inspection_window(self, row_data):
         """Create inspection form window"""
         inspection_window = tk.Toplevel(self.window)
@@ -432,6 +392,7 @@ class InternalVerificationForm:
             width=15
         )
         submit_btn.pack(side=tk.LEFT, padx=10)
+        self.inspection_submit_btn = submit_btn
         
         cancel_btn = ttk.Button(
             button_frame,
@@ -471,99 +432,86 @@ class InternalVerificationForm:
                 entries["REMARKS"].get()
             ]
             
-            # Update sheets
-            self.update_sheets(row_data, inspection_data)
-            
-            messagebox.showinfo("Success", "Internal inspection data saved successfully!")
-            
-            # Refresh table
-            self.load_table_data(self.mr_no)
-            
-            # Close inspection window
-            for widget in self.window.winfo_children():
-                if isinstance(widget, tk.Toplevel):
-                    widget.destroy()
-                    break
+            # Update sheets in the background
+            run_in_background(
+                internal_date,
+                self.update_sheets, row_data, inspection_data,
+                on_success=lambda result: self.on_inspection_saved(),
+                on_error=lambda e: messagebox.showerror("Error", f"Error submitting inspection: {str(e)}"),
+                busy_message="Saving inspection...",
+                disable=[self.inspection_submit_btn],
+            )
                     
         except Exception as e:
             messagebox.showerror("Error", f"Error submitting inspection: {str(e)}")
 
+    def on_inspection_saved(self):
+        messagebox.showinfo("Success", "Internal inspection data saved successfully!")
+        
+        # Refresh table
+        self.load_table_data(self.mr_no)
+        
+        # Close inspection window
+        for widget in self.window.winfo_children():
+            if isinstance(widget, tk.Toplevel):
+                widget.destroy()
+                break
+
     def update_sheets(self, row_data, inspection_data):
-        """Update master sheet with inspection data"""
+        """Update master sheet with inspection data; runs on the sheet I/O thread"""
         try:
-            master_row = None
-            master_data = self.master_sheet.get_all_values()
-            
-            for idx, row in enumerate(master_data):
-                if row[5] == row_data[5]:  # Match TC NO
-                    master_row = idx + 1
-                    break
+            # Row number comes from the TC index, no sheet read needed
+            master_row = find_tc_row(self.master_sheet, row_data[5])
             
             if master_row:
                 # Update columns AE to AU (31 to 47)
                 range_name = f'AE{master_row}:AU{master_row}'
+                revision = snapshot_cache.revision_before_write(self.master_sheet)
                 self.master_sheet.update(range_name, [inspection_data])
+                snapshot_cache.record_update(self.master_sheet, master_row, 30, [inspection_data], revision)
             else:
                 raise Exception("TC not found in master sheet")
                 
         except Exception as e:
             raise Exception(f"Error updating sheets: {str(e)}")
 
-    def cleanup_buttons(self):
-        for button in self.buttons:
-            button.destroy()
-        self.buttons = []
-
-    def update_button_positions(self, event=None):
-        try:
-            for button in self.buttons:
-                button.place_forget()
-            
-            for item in self.tree.get_children():
-                bbox = self.tree.bbox(item, "EXECUTE")
-                if bbox:
-                    values = self.tree.item(item)['values']
-                    if values:
-                        tc_no = values[4]  # TC NO is at index 4
-                        status = values[-2]  # Internal Completed is second to last
-                        self.create_button_for_row(item, tc_no, status)
-        except Exception as e:
-            print(f"Error updating button positions: {str(e)}")
-
     def search_and_update_table(self):
+        tc_no = self.tc_search.get().strip()
+        
+        if not tc_no:
+            self.load_table_data(self.mr_no)
+            return
+        
+        run_in_background(
+            self.tree,
+            get_status_snapshot, self.master_sheet,
+            on_success=lambda snapshot: self.show_search_results(tc_no, snapshot),
+            on_error=lambda e: messagebox.showerror("Error", f"Error searching data: {str(e)}"),
+            busy_message="Searching...",
+        )
+
+    def show_search_results(self, tc_no, snapshot):
         try:
-            tc_no = self.tc_search.get().strip()
-            
-            if not tc_no:
-                self.load_table_data(self.mr_no)
-                return
-            
-            for button in self.buttons:
-                button.destroy()
-            self.buttons = []
-            
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            
-            data = self.master_sheet.get_all_values()
             required_cols = {
                 "DIVISION": 0, "MR NO": 2, "LOT NO": 3, "DATE": 4,
                 "TC NO": 5, "MAKE": 6, "TC CAPACITY": 7, "JOB NO": 8
             }
             
-            for row in data[2:]:
+            table_rows = []
+            for _, row, status in data_rows(snapshot):
                 if str(tc_no).lower() in str(row[5]).lower():  # TC NO is at index 5
                     row_data = [row[required_cols[col]] for col in required_cols]
                     
-                    has_internal_data = any(row[31:47])
-                    internal_status = "YES" if has_internal_data else "NO"
+                    internal_status = yes_no(status, INTERNAL)
                     row_data.append(internal_status)
                     row_data.append("")
                     
-                    item = self.tree.insert('', tk.END, values=row_data)
-                    self.create_button_for_row(item, row[5], internal_status)
+                    table_rows.append((row[5], row_data))
             
-            if not self.tree.get_children():
+            if table_rows:
+                self.table.sync(table_rows)
+                self.actions.refresh()
+            else:
                 messagebox.showinfo("No Results", "No matching records found.")
                 self.load_table_data(self.mr_no)
                 
@@ -571,23 +519,24 @@ class InternalVerificationForm:
             messagebox.showerror("Error", f"Error searching data: {str(e)}")
 
     def start_enrollment(self, tc_no):
-        try:
-            data = self.master_sheet.get_all_values()
-            row_data = None
-            
-            for row in data[2:]:
-                if str(row[5]).strip() == str(tc_no).strip():
-                    row_data = row
-                    break
-            
-            if row_data is None:
-                messagebox.showerror("Error", f"TC No. {tc_no} not found in master sheet")
-                return
-            
-            self.create_inspection_window(row_data)
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Error starting enrollment: {str(e)}")
+        """Look the TC up in the background, then open its inspection window"""
+        run_in_background(
+            self.tree,
+            self.find_master_row, tc_no,
+            on_success=lambda row_data: self.open_enrollment(tc_no, row_data),
+            on_error=lambda e: messagebox.showerror("Error", f"Error starting enrollment: {str(e)}"),
+            busy_message="Loading transformer...",
+        )
+
+    def find_master_row(self, tc_no):
+        """Master Sheet row of tc_no, None if missing; runs on the sheet I/O thread"""
+        return get_tc_row(self.master_sheet, tc_no)  # raises DuplicateTcError if ambiguous
+
+    def open_enrollment(self, tc_no, row_data):
+        if row_data is None:
+            messagebox.showerror("Error", f"TC No. {tc_no} not found in master sheet")
+            return
+        self.create_inspection_window(row_data)
 
 def create_internal_form(sheet):
     InternalVerificationForm(sheet) 
\ No newline at end of file
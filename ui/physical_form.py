@@ -1,6 +1,12 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from config.sheets_setup import save_to_sheets, get_worksheet, setup_google_sheets
+from config.sheets_setup import save_to_sheets, get_worksheet, find_worksheet
+from utils.sheet_cache import appended_row_number, get_sheet_values, snapshot_cache
+from utils.sheet_index import find_tc_row, get_mr_rows, get_tc_row
+from utils.background import run_in_background
+from utils.action_column import ActionColumn
+from utils.table_model import TableModel
+from utils.stage_status import PHYSICAL, row_status, yes_no
 from tkcalendar import DateEntry
 import pandas as pd
 
@@ -20,9 +26,6 @@ class PhysicalVerificationForm:
         self.window.title("PHYSICAL FORM")
         self.window.geometry("1200x800")
         
-        # Initialize buttons list
-        self.buttons = []
-        
         # Store the master sheet reference
         self.master_sheet = sheet
         
@@ -180,12 +183,13 @@ class PhysicalVerificationForm:
         submit_frame = ttk.Frame(self.scrollable_frame)
         submit_frame.pack(fill=tk.X, pady=20)
         
-        ttk.Button(
+        self.legacy_submit_btn = ttk.Button(
             submit_frame, 
             text="Submit Inspection", 
             command=self.submit_inspection,
             width=30
-        ).pack(anchor="center")
+        )
+        self.legacy_submit_btn.pack(anchor="center")
 
     def create_section(self, parent, section_title, fields):
         print(f"Creating section: {section_title}")
@@ -209,30 +213,34 @@ class PhysicalVerificationForm:
             messagebox.showerror("Error", "Please enter a Job No.")
             return
 
-        try:
-            # Search in Master Sheet
-            master_sheet = setup_google_sheets().worksheet("MASTER")
-            master_data = master_sheet.get_all_values()
-
-            found = False
-            for row in master_data:
-                if len(row) > 8 and row[8] == job_no:  # Assuming Job No is in column I (index 8)
-                    found = True
-                    # Update detail entries with the found data
-                    for idx, field in enumerate(self.detail_fields):
-                        entry = self.detail_entries[field]
-                        entry.configure(state='normal')
-                        entry.delete(0, tk.END)
-                        entry.insert(0, row[idx])
-                        entry.configure(state='readonly')
-                    break
-
-            if not found:
-                messagebox.showwarning("Not Found", "No transformer found with matching Job No.")
+        # Search the Master Sheet in the background
+        run_in_background(
+            self.job_search,
+            self.find_job_row, job_no,
+            on_success=self.show_tc_details,
+            on_error=lambda e: messagebox.showerror("Error", f"Error searching transformer: {str(e)}"),
+            busy_message="Searching...",
+        )
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Error searching transformer: {str(e)}")
-            print(f"Debug - Error details: {str(e)}")
+    def find_job_row(self, job_no):
+        """Master Sheet row with job_no, None if missing; runs on the sheet I/O thread"""
+        master_sheet = find_worksheet("MASTER")
+        for row in get_sheet_values(master_sheet):
+            if len(row) > 8 and row[8] == job_no:  # Assuming Job No is in column I (index 8)
+                return row
+        return None
+
+    def show_tc_details(self, row):
+        if row is None:
+            messagebox.showwarning("Not Found", "No transformer found with matching Job No.")
+            return
+        # Update detail entries with the found data
+        for idx, field in enumerate(self.detail_fields):
+            entry = self.detail_entries[field]
+            entry.configure(state='normal')
+            entry.delete(0, tk.END)
+            entry.insert(0, row[idx])
+            entry.configure(state='readonly')
 
     def submit_inspection(self):
         print("Submitting inspection")
@@ -257,110 +265,109 @@ class PhysicalVerificationForm:
             messagebox.showerror("Error", "Please search for a transformer first")
             return
         
-        try:
-            # Get both sheets
-            spreadsheet = setup_google_sheets()
-            master_sheet = self.master_sheet
-            physical_sheet = spreadsheet.worksheet("PHYSICAL")
-            
-            # Update Master Sheet
-            master_row = None
-            master_data = master_sheet.get_all_values()
-            
-            for idx, row in enumerate(master_data):
-                if len(row) > 5 and row[5] == tc_no:  # Column F (index 5)
-                    master_row = idx + 1  # 1-based row index for Google Sheets
-                    break
-            
-            if master_row is None:
-                messagebox.showerror("Error", "Could not find the transformer row to update in Master Sheet")
-                return
-            
-            # Check if TC NO exists in Physical Sheet
-            physical_data = physical_sheet.get_all_values()
-            physical_row = None
-            
-            for idx, row in enumerate(physical_data):
-                if len(row) > 5 and row[5] == tc_no:  # Column F (index 5) for TC NO
-                    physical_row = idx + 1  # 1-based row index
-                    break
-            
-            # Updated inspection fields order with physical date
-            inspection_fields = [
-                "HT_BUSHING", "HT_METAL_PART", "HT_CONNECTOR",
-                "LT_BUSHING", "LT_METAL_PART", "LT_CONNECTOR",
-                "GAUGE_GLASS", "OIL_AS_PER_NP", "OIL_POSITION", "OUTSIDE_PAINT",
-                "BOLT_NUTS", "ROD_GASKET", "TOP_GASKET", "NAME_PLATE",
-                "BREATHER", "LABOUR_CHARGE", "BS", "CONSERVATOR_TANK", "RADIATORS", "REMARKS", "PHYSICAL_DATE"
-            ]
-            
-            update_data = [inspection_data[field] for field in inspection_fields[:-1]] + [physical_date]
-            
-            # Update Master Sheet (columns J to AD)
-            master_range = f'J{master_row}:AD{master_row}'
-            master_sheet.update(master_range, [update_data])
-            
-            # Prepare complete data row for Physical sheet
-            physical_data = [
-                self.detail_entries["DIVISION"].get(),
-                self.detail_entries["TRUCK NO"].get(),
-                self.detail_entries["MR NO"].get(),
-                self.detail_entries["LOT NO"].get(),
-                self.detail_entries["DATE"].get(),
-                self.detail_entries["TC NO"].get(),
-                self.detail_entries["MAKE"].get(),
-                self.detail_entries["TC CAPACITY"].get(),
-                self.detail_entries["JOB NO"].get(),
-                *update_data  # Add all inspection data including date
-            ]
-            
-            if physical_row:
-                # Calculate column range for Physical sheet
-                num_columns = len(physical_data)
-                if num_columns <= 26:
-                    last_col = chr(ord('A') + num_columns - 1)
-                else:
-                    # For columns beyond Z
-                    q, r = divmod(num_columns - 1, 26)
-                    last_col = chr(ord('A') + q - 1) + chr(ord('A') + r)
-                
-                # Update existing row in Physical Sheet
-                physical_range = f'A{physical_row}:{last_col}{physical_row}'
-                try:
-                    physical_sheet.update(physical_range, [physical_data])
-                    message = "Physical inspection data updated successfully in both sheets!"
-                except Exception as e:
-                    print(f"Debug - Physical sheet update error: {str(e)}")
-                    print(f"Debug - Range: {physical_range}")
-                    print(f"Debug - Data length: {len(physical_data)}")
-                    raise
+        # Master Sheet columns J to AD: the physical date first (J, where Enrol
+        # writes it and the date index reads it), then the inspection fields
+        inspection_fields = [
+            "HT_BUSHING", "HT_METAL_PART", "HT_CONNECTOR",
+            "LT_BUSHING", "LT_METAL_PART", "LT_CONNECTOR",
+            "GAUGE_GLASS", "OIL_AS_PER_NP", "OIL_POSITION", "OUTSIDE_PAINT",
+            "BOLT_NUTS", "ROD_GASKET", "TOP_GASKET", "NAME_PLATE",
+            "BREATHER", "LABOUR_CHARGE", "BS", "CONSERVATOR_TANK", "RADIATORS", "REMARKS"
+        ]
+        
+        update_data = [physical_date] + [inspection_data[field] for field in inspection_fields]
+        details = [self.detail_entries[field].get() for field in self.detail_fields]
+        
+        # Write both sheets in the background
+        run_in_background(
+            self.physical_date,
+            self.save_inspection, tc_no, details, update_data,
+            on_success=self.on_legacy_inspection_saved,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to save inspection data: {str(e)}"),
+            busy_message="Saving inspection...",
+            disable=[self.legacy_submit_btn],
+        )
+
+    def save_inspection(self, tc_no, details, update_data):
+        """
+        Write one inspection to the Master and Physical sheets; runs on the sheet I/O thread
+        Returns:
+            The success message to show
+        """
+        # Get both sheets
+        master_sheet = self.master_sheet
+        physical_sheet = find_worksheet("PHYSICAL")
+        
+        # Update Master Sheet
+        master_row = find_tc_row(master_sheet, tc_no)  # Column F (index 5)
+        
+        if master_row is None:
+            raise Exception("Could not find the transformer row to update in Master Sheet")
+        
+        # Check if TC NO exists in Physical Sheet
+        physical_row = find_tc_row(physical_sheet, tc_no)  # Column F (index 5) for TC NO
+        
+        # Update Master Sheet (columns J to AD)
+        master_range = f'J{master_row}:AD{master_row}'
+        revision = snapshot_cache.revision_before_write(master_sheet)
+        master_sheet.update(master_range, [update_data])
+        snapshot_cache.record_update(master_sheet, master_row, 9, [update_data], revision)
+        
+        # Prepare complete data row for Physical sheet: the details in
+        # DIVISION .. JOB NO order, then the inspection fields and the date last,
+        # the layout of its existing rows
+        physical_data = details + update_data[1:] + update_data[:1]
+        
+        if physical_row:
+            # Calculate column range for Physical sheet
+            num_columns = len(physical_data)
+            if num_columns <= 26:
+                last_col = chr(ord('A') + num_columns - 1)
             else:
-                # Add new row if TC NO not found in Physical Sheet
-                physical_sheet.append_row(physical_data)
-                message = "Physical inspection data added successfully to both sheets!"
-            
-            messagebox.showinfo("Success", message)
-            
-            # Clear all entries
-            for entry in self.inspection_entries.values():
-                entry.delete(0, tk.END)
-            
-            self.tc_search.delete(0, tk.END)
-            self.job_search.delete(0, tk.END)
-            
-            for entry in self.detail_entries.values():
-                entry.configure(state='normal')
-                entry.delete(0, tk.END)
-                entry.configure(state='readonly')
-            
-            self.tc_search.focus()
-            
-            # After successful submission, reload the table
-            self.load_table_data(self.mr_no)
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to save inspection data: {str(e)}")
-            print(f"Debug - Save error details: {str(e)}")
+                # For columns beyond Z
+                q, r = divmod(num_columns - 1, 26)
+                last_col = chr(ord('A') + q - 1) + chr(ord('A') + r)
+            
+            # Update existing row in Physical Sheet
+            physical_range = f'A{physical_row}:{last_col}{physical_row}'
+            try:
+                revision = snapshot_cache.revision_before_write(physical_sheet)
+                physical_sheet.update(physical_range, [physical_data])
+                snapshot_cache.record_update(physical_sheet, physical_row, 0, [physical_data], revision)
+                return "Physical inspection data updated successfully in both sheets!"
+            except Exception as e:
+                print(f"Debug - Physical sheet update error: {str(e)}")
+                print(f"Debug - Range: {physical_range}")
+                print(f"Debug - Data length: {len(physical_data)}")
+                raise
+        
+        # Add new row if TC NO not found in Physical Sheet
+        revision = snapshot_cache.revision_before_write(physical_sheet)
+        response = physical_sheet.append_row(physical_data)
+        snapshot_cache.record_append(
+            physical_sheet, [physical_data], appended_row_number(response), revision
+        )
+        return "Physical inspection data added successfully to both sheets!"
+
+    def on_legacy_inspection_saved(self, message):
+        messagebox.showinfo("Success", message)
+        
+        # Clear all entries
+        for entry in self.inspection_entries.values():
+            entry.delete(0, tk.END)
+        
+        self.tc_search.delete(0, tk.END)
+        self.job_search.delete(0, tk.END)
+        
+        for entry in self.detail_entries.values():
+            entry.configure(state='normal')
+            entry.delete(0, tk.END)
+            entry.configure(state='readonly')
+        
+        self.tc_search.focus()
+        
+        # After successful submission, reload the table
+        self.load_table_data(self.mr_no)
 
     def create_data_table(self, mr_no=None):
         print("Creating data table")
@@ -414,143 +421,69 @@ class PhysicalVerificationForm:
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
-        # Bind events for button management
+        # Enrol buttons for the visible rows: TC NO is at index 4, Physical Completed second to last
+        self.actions = ActionColumn(self.tree, scrollbar, 4, -2, self.start_enrollment)
+        self.table = TableModel(self.tree)
         self.tree.bind('<Map>', lambda e: self.load_table_data(mr_no))
-        self.tree.bind('<Destroy>', lambda e: self.cleanup_buttons())
-        self.tree.bind('<<TreeviewSelect>>', self.update_button_positions)
-        self.tree.bind('<Configure>', self.update_button_positions)
-        
-        # Bind mouse wheel and scrollbar events
-        self.tree.bind('<MouseWheel>', self.update_button_positions)
-        self.tree.bind('<Button-4>', self.update_button_positions)  # Linux scroll up
-        self.tree.bind('<Button-5>', self.update_button_positions)  # Linux scroll down
-        self.tree.bind('<<TreeviewOpen>>', self.update_button_positions)
-        self.tree.bind('<<TreeviewClose>>', self.update_button_positions)
-
-    def cleanup_buttons(self):
-        print("Cleaning up buttons")
-        # Clean up buttons when table is destroyed
-        for button in self.buttons:
-            button.destroy()
-        self.buttons = []
 
     def load_table_data(self, mr_no):
         print(f"Loading table data for MR No: {mr_no}")
+        # Fetch the rows of this MR NO in the background, fill the table when they arrive
+        run_in_background(
+            self.tree,
+            get_mr_rows, self.master_sheet, mr_no,
+            on_success=self.fill_table,
+            on_error=lambda e: messagebox.showerror("Error", f"Error loading table data: {str(e)}"),
+            busy_message="Loading transformers...",
+        )
+
+    def fill_table(self, rows):
         try:
-            # Clear existing items and buttons
-            for button in self.buttons:
-                button.destroy()
-            self.buttons = []
-            
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            
-            # Get data from master sheet
-            data = self.master_sheet.get_all_values()
-            headers = data[0]  # Keep the header reference if needed
-            
             # Find required column indices
             required_cols = {
                 "DIVISION": 0, "MR NO": 2, "LOT NO": 3, "DATE": 4,
                 "TC NO": 5, "MAKE": 6, "TC CAPACITY": 7, "JOB NO": 8
             }
             
-            # Process each row, starting from row 3 (index 2) to skip first two rows
-            for row in data[2:]:
-                if str(mr_no) == row[2]:  # Assuming MR NO is in column C (index 2)
-                    row_data = [row[required_cols[col]] for col in required_cols]
-                    
-                    # Check if physical inspection is completed
-                    tc_no = row[required_cols["TC NO"]]
-                    has_physical_data = any(row[9:28])  # Columns J to AB
-                    physical_status = "YES" if has_physical_data else "NO"
-                    row_data.append(physical_status)
-                    row_data.append("")  # Empty string for EXECUTE column
-                    
-                    # Add row to tree
-                    item = self.tree.insert('', tk.END, values=row_data)
-                    # Create button immediately
-                    self.create_button_for_row(item, tc_no, physical_status)
+            # Process only the rows of this MR NO, keyed by TC NO
+            table_rows = []
+            for row in rows:
+                row_data = [row[required_cols[col]] for col in required_cols]
+                
+                # Check if physical inspection is completed
+                physical_status = yes_no(row_status(row), PHYSICAL)
+                row_data.append(physical_status)
+                row_data.append("")  # Empty string for EXECUTE column
+                
+                table_rows.append((row[required_cols["TC NO"]], row_data))
+            self.table.sync(table_rows)
+            self.actions.refresh()
                 
         except Exception as e:
             messagebox.showerror("Error", f"Error loading table data: {str(e)}")
             print(f"Debug - Error details: {str(e)}")
 
-    def create_button_for_row(self, item, tc_no, status):
-        # print(f"Creating button for row: TC No: {tc_no}, Status: {status}")
-        try:
-            # print('in create btn')
-            # Get button coordinates for the EXECUTE column
-            bbox = self.tree.bbox(item, "EXECUTE")
-            if not bbox:
-                return
-            
-            # Debug print
-            # print(f"Creating button for TC No: {tc_no}, Status: {status}")
-            
-            # Create button with appropriate style and state
-            if status == "NO":
-                button = tk.Button(
-                    self.tree,
-                    text="Enrol",
-                    bg='#FF0000',  # Red background
-                    fg='white',
-                    command=lambda tc=tc_no: self.start_enrollment(tc),  # Fixed command binding
-                    width=8,
-                    font=('Arial', 9, 'bold'),
-                    relief="raised",
-                    borderwidth=2
-                )
-            else:
-                button = tk.Button(
-                    self.tree,
-                    text="Enrolled",
-                    bg='#00FF00',  # Green background
-                    fg='white',
-                    state='disabled',
-                    width=8,
-                    font=('Arial', 9, 'bold'),
-                    relief="raised",
-                    borderwidth=2
-                )
-            
-            # Calculate button position - center in the EXECUTE column
-            x = bbox[0] + 10  # Slight offset from left edge of column
-            y = bbox[1] + 2   # Slight offset from top of row
-            
-            # Place button
-            button.place(x=x, y=y)
-            
-            # Store reference to prevent garbage collection
-            self.buttons.append(button)
-            
-        except Exception as e:
-            print(f"Error creating button: {str(e)}")
-
     def start_enrollment(self, tc_no):
+        """Start the enrollment process for a TC: look it up in the background, then open its window"""
         print(f"Starting enrollment for TC No: {tc_no}")
-        try:
-            # Get row data from master sheet
-            data = self.master_sheet.get_all_values()
-            row_data = None
-            
-            # Skip header rows and find the matching TC NO
-            for row in data[2:]:  # Skip first two rows
-                if str(row[5]).strip() == str(tc_no).strip():  # TC NO is in column F (index 5)
-                    row_data = row
-                    break
-            
-            if row_data is None:
-                messagebox.showerror("Error", f"TC No. {tc_no} not found in master sheet")
-                return
-            
-            # Create new inspection window
-            self.create_inspection_window(row_data)
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Error starting enrollment: {str(e)}")
-            print(f"Debug - Start enrollment error: {str(e)}")
-            print(f"Debug - TC No: {tc_no}")
+        run_in_background(
+            self.tree,
+            self.find_master_row, tc_no,
+            on_success=lambda row_data: self.open_enrollment(tc_no, row_data),
+            on_error=lambda e: messagebox.showerror("Error", f"Error starting enrollment: {str(e)}"),
+            busy_message="Loading transformer...",
+        )
+
+    def find_master_row(self, tc_no):
+        """Master Sheet row of tc_no, None if missing; runs on the sheet I/O thread"""
+        return get_tc_row(self.master_sheet, tc_no)  # raises DuplicateTcError if ambiguous
+
+    def open_enrollment(self, tc_no, row_data):
+        if row_data is None:
+            messagebox.showerror("Error", f"TC No. {tc_no} not found in master sheet")
+            return
+        # Create new inspection window
+        self.create_inspection_window(row_data)
 
     def create_inspection_window(self, row_data):
         print("Creating inspection window")
@@ -830,6 +763,7 @@ class PhysicalVerificationForm:
             width=15
         )
         submit_btn.pack(side=tk.LEFT, padx=10)
+        self.inspection_submit_btn = submit_btn
         
         cancel_btn = ttk.Button(
             button_frame,
@@ -847,21 +781,18 @@ class PhysicalVerificationForm:
         )
 
     def update_sheets(self, row_data, inspection_data):
+        """Write the physical inspection of one TC to the Master Sheet; runs on the sheet I/O thread"""
         print("Updating sheets")
         try:
-            # Update Master Sheet
-            master_row = None
-            master_data = self.master_sheet.get_all_values()
-            
-            for idx, row in enumerate(master_data):
-                if row[5] == row_data[5]:  # Match TC NO
-                    master_row = idx + 1
-                    break
+            # Update Master Sheet (row number comes from the TC index, no sheet read needed)
+            master_row = find_tc_row(self.master_sheet, row_data[5])
             
             if master_row:
                 # Update columns J to AD (10 to 30)
                 range_name = f'J{master_row}:AD{master_row}'
+                revision = snapshot_cache.revision_before_write(self.master_sheet)
                 self.master_sheet.update(range_name, [inspection_data])
+                snapshot_cache.record_update(self.master_sheet, master_row, 9, [inspection_data], revision)
                 
                 # Update Physical Sheet
                 # physical_sheet = setup_google_sheets().worksheet("PHYSICAL")
@@ -925,9 +856,6 @@ class PhysicalVerificationForm:
     def search_and_update_table(self):
         print("Searching and updating table")
         try:
-            # Get all existing row data from the tree
-            all_data = [self.tree.item(item)['values'] for item in self.tree.get_children()]
-            
             # Get the TC No. from user input
             tc_no = self.tc_search.get().strip()
             print("User input TC No:", tc_no)
@@ -938,32 +866,15 @@ class PhysicalVerificationForm:
                 self.load_table_data(self.mr_no)
                 return
             
-            # Clear existing items and buttons
-            for button in self.buttons:
-                button.destroy()
-            self.buttons = []
-            
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            
-            # Filter data based on the provided TC No
+            # Filter the rows shown now on the provided TC No
             filtered_data = [
-                row for row in all_data if str(row[4]).lower() == str(tc_no).lower()  # Assuming TC NO is at index 4
+                (key, values) for key, values in self.table.rows()
+                if str(values[4]).lower() == str(tc_no).lower()  # TC NO is at index 4
             ]
             
             if filtered_data:
-                for row_data in filtered_data:
-                    # Check if physical inspection is completed
-                    has_physical_data = any(row_data[9:28])  # Columns J to AB
-                    physical_status = "YES" if has_physical_data else "NO"
-                    row_data.append(physical_status)
-                    row_data.append("")  # Empty string for EXECUTE column
-                    
-                    # Add row to tree
-                    item = self.tree.insert('', tk.END, values=row_data)
-                    
-                    # Create button immediately
-                    self.create_button_for_row(item, row_data[4], physical_status)
+                self.table.sync(filtered_data)
+                self.actions.refresh()
             else:
                 messagebox.showinfo("No Results", "No matching records found.")
                 self.load_table_data(self.mr_no)  # Reload all data if no matches found
@@ -972,26 +883,6 @@ class PhysicalVerificationForm:
             messagebox.showerror("Error", f"Error searching data: {str(e)}")
             print(f"Debug - Search error details: {str(e)}")
 
-    def update_button_positions(self, event=None):
-        # print("Updating button positions")
-        """Update positions of all buttons when tree view changes"""
-        try:
-            # # Hide all buttons first
-            # for button in self.buttons:
-            #     button.place_forget()
-            print(self.tree.get_children())
-            # Update position for each visible item
-            for item in self.tree.get_children():
-                bbox = self.tree.bbox(item, "EXECUTE")
-                if bbox:  # Only place button if item is visible
-                    values = self.tree.item(item)['values']
-                    if values:
-                        tc_no = values[4]  # TC NO is at index 4
-                        status = values[-2]  # Physical Completed is second to last
-                        self.create_button_for_row(item, tc_no, status)
-        except Exception as e:
-            print(f"Error updating button positions: {str(e)}")
-
     def setup_button_styles(self):
         print("Setting up button styles")
         """Setup custom styles for buttons"""
@@ -1053,25 +944,33 @@ class PhysicalVerificationForm:
                 entries["REMARKS"].get()
             ]
             
-            # Update sheets
-            self.update_sheets(row_data, inspection_data)
-            
-            # Show success message and close window
-            messagebox.showinfo("Success", "Inspection data saved successfully!")
-            
-            # Refresh main table
-            self.load_table_data(self.mr_no)
-            
-            # Close the inspection window
-            for widget in self.window.winfo_children():
-                if isinstance(widget, tk.Toplevel):
-                    widget.destroy()
-                    break
+            # Update sheets in the background
+            run_in_background(
+                physical_date,
+                self.update_sheets, row_data, inspection_data,
+                on_success=lambda result: self.on_inspection_saved(),
+                on_error=lambda e: messagebox.showerror("Error", f"Error submitting inspection: {str(e)}"),
+                busy_message="Saving inspection...",
+                disable=[self.inspection_submit_btn],
+            )
                     
         except Exception as e:
             messagebox.showerror("Error", f"Error submitting inspection: {str(e)}")
             print(f"Debug - Submit error details: {str(e)}")
 
+    def on_inspection_saved(self):
+        # Show success message and close window
+        messagebox.showinfo("Success", "Inspection data saved successfully!")
+        
+        # Refresh main table
+        self.load_table_data(self.mr_no)
+        
+        # Close the inspection window
+        for widget in self.window.winfo_children():
+            if isinstance(widget, tk.Toplevel):
+                widget.destroy()
+                break
+
     def on_view(self, event):
         print("View event triggered")
         print("on_view")
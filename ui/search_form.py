@@ -1,5 +1,26 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
+from tkcalendar import DateEntry
+from utils.background import run_in_background
+from utils.bitmap_index import FILTER_COLUMNS, STAGE_FILTERS, get_bitmap_index
+from utils.date_index import DATE_COLUMNS, get_date_index
+from utils.search_index import SEARCH_FIELDS, get_search_index
+from utils.table_model import TableModel
+
+# Milliseconds typing must pause before the results are refreshed
+SEARCH_DELAY = 150
+
+# Most rows shown for one search
+SEARCH_LIMIT = 100
+
+NO_DATE_FILTER = "ANY DATE"
+NO_FILTER = "ALL"
+NO_STAGE_FILTER = "ANY STAGE"
+
+
+def load_indexes(sheet):
+    return get_search_index(sheet), get_date_index(sheet), get_bitmap_index(sheet)
+
 
 def create_search_form(sheet):
     search_window = tk.Toplevel()
@@ -19,7 +40,7 @@ def create_search_form(sheet):
 
     instruction_label = ttk.Label(
         main_container,
-        text="*SEARCH BY MR NO. OR DATE",
+        text="*SEARCH BY MR NO., TC NO., JOB NO. OR DATE, AND/OR A DATE RANGE AND FILTERS (results update as you type)",
         anchor="w"
     )
     instruction_label.pack(fill=tk.X, pady=(0, 10))
@@ -27,16 +48,57 @@ def create_search_form(sheet):
     search_fields_frame = ttk.Frame(main_container)
     search_fields_frame.pack(fill=tk.X, pady=(0, 20))
 
-    # MR NO and DATE entry fields
-    mr_no_label = ttk.Label(search_fields_frame, text="MR NO.:-")
-    mr_no_label.pack(side=tk.LEFT, padx=(0, 10))
-    mr_no_entry = ttk.Entry(search_fields_frame, width=30)
-    mr_no_entry.pack(side=tk.LEFT, padx=(0, 20))
+    # Field to search in and the text to look for
+    field_label = ttk.Label(search_fields_frame, text="SEARCH IN:-")
+    field_label.pack(side=tk.LEFT, padx=(0, 10))
+    field_combo = ttk.Combobox(search_fields_frame, values=list(SEARCH_FIELDS), state="readonly", width=12)
+    field_combo.set("MR NO")
+    field_combo.pack(side=tk.LEFT, padx=(0, 20))
+
+    search_entry = ttk.Entry(search_fields_frame, width=30)
+    search_entry.pack(side=tk.LEFT, padx=(0, 20))
+
+    count_label = ttk.Label(search_fields_frame, text="Loading...")
+    count_label.pack(side=tk.LEFT)
+
+    # Date range on one of the stage date columns
+    date_range_frame = ttk.Frame(main_container)
+    date_range_frame.pack(fill=tk.X, pady=(0, 20))
+
+    ttk.Label(date_range_frame, text="DATE RANGE:-").pack(side=tk.LEFT, padx=(0, 10))
+    date_column_combo = ttk.Combobox(
+        date_range_frame, values=[NO_DATE_FILTER] + list(DATE_COLUMNS), state="readonly", width=12
+    )
+    date_column_combo.set(NO_DATE_FILTER)
+    date_column_combo.pack(side=tk.LEFT, padx=(0, 20))
+
+    ttk.Label(date_range_frame, text="FROM:-").pack(side=tk.LEFT, padx=(0, 10))
+    date_from_entry = DateEntry(date_range_frame, width=12, date_pattern='dd/mm/yyyy')
+    date_from_entry.pack(side=tk.LEFT, padx=(0, 20))
+
+    ttk.Label(date_range_frame, text="TO:-").pack(side=tk.LEFT, padx=(0, 10))
+    date_to_entry = DateEntry(date_range_frame, width=12, date_pattern='dd/mm/yyyy')
+    date_to_entry.pack(side=tk.LEFT)
+
+    # Filters on the categorical columns and the stage reached
+    filters_frame = ttk.Frame(main_container)
+    filters_frame.pack(fill=tk.X, pady=(0, 20))
 
-    date_label = ttk.Label(search_fields_frame, text="DATE:-")
-    date_label.pack(side=tk.LEFT, padx=(0, 10))
-    date_entry = ttk.Entry(search_fields_frame, width=30)
-    date_entry.pack(side=tk.LEFT)
+    ttk.Label(filters_frame, text="FILTERS:-").pack(side=tk.LEFT, padx=(0, 10))
+    filter_combos = {}
+    for name in FILTER_COLUMNS:
+        ttk.Label(filters_frame, text=f"{name}:").pack(side=tk.LEFT, padx=(0, 5))
+        combo = ttk.Combobox(filters_frame, values=[NO_FILTER], state="readonly", width=10)
+        combo.set(NO_FILTER)
+        combo.pack(side=tk.LEFT, padx=(0, 15))
+        filter_combos[name] = combo
+
+    ttk.Label(filters_frame, text="STAGE:").pack(side=tk.LEFT, padx=(0, 5))
+    stage_combo = ttk.Combobox(
+        filters_frame, values=[NO_STAGE_FILTER] + list(STAGE_FILTERS), state="readonly", width=20
+    )
+    stage_combo.set(NO_STAGE_FILTER)
+    stage_combo.pack(side=tk.LEFT)
 
     # Create the table
     tree_frame = ttk.Frame(main_container)
@@ -76,34 +138,107 @@ def create_search_form(sheet):
 
     tree.pack(fill=tk.BOTH, expand=True)
 
-    def search_data():
-        # Clear existing items
-        for item in tree.get_children():
-            tree.delete(item)
+    table = TableModel(tree)
+    state = {"index": None, "date_index": None, "bitmap_index": None, "pending": None}
 
-        mr_no = mr_no_entry.get()
-        date = date_entry.get()
+    def active_filters():
+        """column name -> [value] of the filter dropdowns that are set"""
+        return {
+            name: [combo.get()] for name, combo in filter_combos.items() if combo.get() != NO_FILTER
+        }
 
-        try:
-            # Get all data from sheet
-            data = sheet.get_all_values()
-            if len(data) > 0:
-                headers = data[0]  # Skip header row
-                data = data[1:]
-
-            # Filter based on search criteria
-            filtered_data = []
-            for row in data:
-                if (mr_no and mr_no in row[2]) or (date and date in row[4]):  # Assuming MR NO is column 3 and DATE is column 5
-                    filtered_data.append(row)
-
-            # Insert filtered data into treeview
-            for i, row in enumerate(filtered_data, 1):
-                tree.insert("", tk.END, values=(i,) + tuple(row) + ("",))
+    def filter_mask():
+        """Row mask of the filter dropdowns, None when none is set"""
+        filters = active_filters()
+        stage = stage_combo.get()
+        if not filters and stage == NO_STAGE_FILTER:
+            return None
+        required, missing = STAGE_FILTERS.get(stage, (0, 0))
+        return state["bitmap_index"].select(filters, required, missing)
 
+    def find_rows(text, date_column):
+        """(match count, first SEARCH_LIMIT row numbers) of the current criteria"""
+        index, date_index, bitmap_index = state["index"], state["date_index"], state["bitmap_index"]
+        mask = filter_mask()
+        dated = date_column != NO_DATE_FILTER
+        if dated:
+            date_from, date_to = date_from_entry.get_date(), date_to_entry.get_date()
+        if mask is None and not (text and dated):
+            # One index answers alone
+            if dated:
+                return date_index.between(date_column, date_from, date_to, SEARCH_LIMIT)
+            return index.search(field_combo.get(), text, SEARCH_LIMIT)
+
+        if text:
+            _, matches = index.search(field_combo.get(), text)
+            if dated:
+                _, dated_rows = date_index.between(date_column, date_from, date_to)
+                date_mask = bitmap_index.mask_of(dated_rows)
+                mask = date_mask if mask is None else mask & date_mask
+        elif dated:
+            _, matches = date_index.between(date_column, date_from, date_to)
+        else:
+            matches = bitmap_index.row_numbers(mask)
+            return len(matches), matches[:SEARCH_LIMIT]
+        matches = bitmap_index.filter_rows(mask, matches)
+        return len(matches), matches[:SEARCH_LIMIT]
+
+    def show_results():
+        state["pending"] = None
+        index = state["index"]
+        if index is None or not tree.winfo_exists():
+            return
+        text = search_entry.get().strip()
+        date_column = date_column_combo.get()
+        if not text and date_column == NO_DATE_FILTER and filter_mask() is None:
+            table.clear()
+            count_label.config(text="")
+            return
+        try:
+            count, row_numbers = find_rows(text, date_column)
+            table.sync([
+                (row_number, (i,) + tuple(index.row(row_number)) + ("",))
+                for i, row_number in enumerate(row_numbers, 1)
+            ])
+            if count > len(row_numbers):
+                count_label.config(text=f"Showing {len(row_numbers)} of {count} matches")
+            else:
+                count_label.config(text=f"{count} matches")
         except Exception as e:
             messagebox.showerror("Error", f"Error searching data: {e}")
 
+    def schedule_search(event=None):
+        # Debounce: search once typing pauses
+        if state["pending"] is not None:
+            search_window.after_cancel(state["pending"])
+        state["pending"] = search_window.after(SEARCH_DELAY, show_results)
+
+    def on_index_loaded(indexes):
+        state["index"], state["date_index"], state["bitmap_index"] = indexes
+        for name, combo in filter_combos.items():
+            combo.config(values=[NO_FILTER] + state["bitmap_index"].choices(name))
+        count_label.config(text="")
+        show_results()
+
+    def search_data():
+        """Refresh the index from the sheet (in the background), then search"""
+        run_in_background(
+            tree,
+            load_indexes, sheet,
+            on_success=on_index_loaded,
+            on_error=lambda e: messagebox.showerror("Error", f"Error searching data: {e}"),
+            busy_message="Loading sheet...",
+        )
+
+    search_entry.bind('<KeyRelease>', schedule_search)
+    field_combo.bind('<<ComboboxSelected>>', schedule_search)
+    date_column_combo.bind('<<ComboboxSelected>>', schedule_search)
+    for combo in list(filter_combos.values()) + [stage_combo]:
+        combo.bind('<<ComboboxSelected>>', schedule_search)
+    for date_entry in (date_from_entry, date_to_entry):
+        date_entry.bind('<<DateEntrySelected>>', schedule_search)
+        date_entry.bind('<FocusOut>', schedule_search, add='+')
+
     def edit_record(event):
         item = tree.selection()[0]
         # Get the values of the selected item
@@ -124,6 +259,8 @@ def create_search_form(sheet):
 
     # Configure tree tag for edit column
     tree.tag_configure('edit', foreground='blue')
+
+    search_data()
 # Function to create the first page form
 
     # Rest of the search form code...
@@ -1,15 +1,14 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from config.sheets_setup import save_to_sheets, setup_google_sheets
+from config.sheets_setup import save_to_sheets, find_worksheet
+from utils.sheet_cache import appended_row_number, get_sheet_values, snapshot_cache
 
-def create_second_form(sheet, total_tc, first_page_data):
-    # Get the current values from both sheets
-    all_values = sheet.get_all_values()
-    start_row = len(all_values) - total_tc + 1
-    
+def create_second_form(sheet, total_tc, first_page_data, start_row, testing_values=None):
+    """start_row: MASTER row the first page rows were appended at (from the append response)"""
     # Get Testing sheet reference
-    testing_sheet = setup_google_sheets().worksheet("TESTING")
-    testing_values = testing_sheet.get_all_values()
+    if testing_values is None:
+        testing_sheet = find_worksheet("TESTING")
+        testing_values = get_sheet_values(testing_sheet)
     testing_start_row = len(testing_values) - total_tc + 1
 
     second_window = tk.Toplevel()
@@ -197,14 +196,14 @@ def on_add_submit(sheet, entries, selected_division):
     # Add the first page data to Google Sheets
     rows_to_add = [first_page_data for _ in range(total_tc)]
     try:
-        for row in rows_to_add:
-            sheet.append_row(row)
+        responses = [sheet.append_row(row) for row in rows_to_add]
     except Exception as e:
         messagebox.showerror("Error", f"Failed to add data: {e}")
         return
+    snapshot_cache.invalidate(sheet)
 
     # Move to the second page
-    create_second_form(sheet, total_tc, first_page_data)
+    create_second_form(sheet, total_tc, first_page_data, appended_row_number(responses[0]))
 
     # Rest of the second form code...
     # (I've truncated this for brevity, but you should include the full second form implementation) 
\ No newline at end of file
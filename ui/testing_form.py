@@ -1,7 +1,12 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from tkcalendar import DateEntry
-from config.sheets_setup import setup_google_sheets
+from utils.sheet_cache import snapshot_cache
+from utils.sheet_index import find_tc_row, get_tc_row
+from utils.stage_status import TESTING, data_rows, get_status_snapshot, yes_no
+from utils.background import run_in_background
+from utils.action_column import ActionColumn
+from utils.table_model import TableModel
 
 class TestingVerificationForm:
     def __init__(self, sheet):
@@ -9,9 +14,6 @@ class TestingVerificationForm:
         self.window.title("TESTING FORM")
         self.window.geometry("1200x800")
         
-        # Initialize buttons list
-        self.buttons = []
-        
         # Store the master sheet reference
         self.master_sheet = sheet
         
@@ -97,156 +99,91 @@ class TestingVerificationForm:
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
-        # Bind events
+        # Enrol buttons for the visible rows: TC NO is at index 4, Testing Completed second to last
+        self.actions = ActionColumn(self.tree, scrollbar, 4, -2, self.start_enrollment)
+        self.table = TableModel(self.tree)
         self.tree.bind('<Map>', lambda e: self.load_table_data())
-        self.tree.bind('<Destroy>', lambda e: self.cleanup_buttons())
-        self.tree.bind('<<TreeviewSelect>>', self.update_button_positions)
-        self.tree.bind('<Configure>', self.update_button_positions)
 
     def load_table_data(self):
+        """Fetch the Master Sheet in the background and fill the table when it arrives"""
+        run_in_background(
+            self.tree,
+            get_status_snapshot, self.master_sheet,
+            on_success=self.fill_table,
+            on_error=lambda e: messagebox.showerror("Error", f"Error loading table data: {str(e)}"),
+            busy_message="Loading transformers...",
+        )
+
+    def fill_table(self, snapshot):
         try:
             # Check if the treeview exists
             if not self.tree.winfo_exists():
                 print("Treeview does not exist.")
                 return
 
-            # Clear existing items and buttons
-            for button in self.buttons:
-                button.destroy()
-            self.buttons = []
-            
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            
-            # Get data from master sheet
-            data = self.master_sheet.get_all_values()
-            
             # Find required column indices
             required_cols = {
                 "DIVISION": 0, "MR NO": 2, "LOT NO": 3, "DATE": 4,
                 "TC NO": 5, "MAKE": 6, "TC CAPACITY": 7, "JOB NO": 8
             }
             
-            # Process each row, starting from row 3
-            for row in data[2:]:
+            # Process each row, starting from row 3, keyed by sheet row number
+            table_rows = []
+            for row_number, row, status in data_rows(snapshot):
                 row_data = [row[required_cols[col]] for col in required_cols]
                 
-                # Check if testing is completed (columns AT to BH)
-                has_testing_data = any(row[47:62])  # Columns AT to BH
-                testing_status = "YES" if has_testing_data else "NO"
+                testing_status = yes_no(status, TESTING)
                 row_data.append(testing_status)
                 row_data.append("")  # Empty string for EXECUTE column
                 
-                # Add row to tree
-                item = self.tree.insert('', tk.END, values=row_data)
-                
-                # Create button
-                self.create_button_for_row(item, row[required_cols["TC NO"]], testing_status)
+                table_rows.append((row_number, row_data))
+            self.table.sync(table_rows)
+            self.actions.refresh()
                 
         except Exception as e:
             messagebox.showerror("Error", f"Error loading table data: {str(e)}")
             print(f"Debug - Error details: {str(e)}")
 
-    def create_button_for_row(self, item, tc_no, status):
-        try:
-            bbox = self.tree.bbox(item, "EXECUTE")
-            if not bbox:
-                return
-            
-            if status == "NO":
-                button = tk.Button(
-                    self.tree,
-                    text="Enrol",
-                    bg='#FF0000',
-                    fg='white',
-                    command=lambda tc=tc_no: self.start_enrollment(tc),
-                    width=8,
-                    font=('Arial', 9, 'bold'),
-                    relief="raised",
-                    borderwidth=2
-                )
-            else:
-                button = tk.Button(
-                    self.tree,
-                    text="Enrolled",
-                    bg='#00FF00',
-                    fg='white',
-                    state='disabled',
-                    width=8,
-                    font=('Arial', 9, 'bold'),
-                    relief="raised",
-                    borderwidth=2
-                )
-            
-            x = bbox[0] + 10
-            y = bbox[1] + 2
-            button.place(x=x, y=y)
-            self.buttons.append(button)
-            
-        except Exception as e:
-            print(f"Error creating button: {str(e)}")
-
-    def cleanup_buttons(self):
-        """Clean up buttons when table is destroyed"""
-        for button in self.buttons:
-            button.destroy()
-        self.buttons = []
-
-    def update_button_positions(self, event=None):
-        """Update positions of all buttons when tree view changes"""
-        try:
-            for button in self.buttons:
-                button.place_forget()
-            
-            for item in self.tree.get_children():
-                bbox = self.tree.bbox(item, "EXECUTE")
-                if bbox:
-                    values = self.tree.item(item)['values']
-                    if values:
-                        tc_no = values[4]  # TC NO is at index 4
-                        status = values[-2]  # Testing Completed is second to last
-                        self.create_button_for_row(item, tc_no, status)
-        except Exception as e:
-            print(f"Error updating button positions: {str(e)}")
-
     def search_and_update_table(self):
+        mr_no = self.mr_search.get().strip()
+        
+        if not mr_no:
+            self.load_table_data()
+            return
+        
+        # Get data in the background, then search it
+        run_in_background(
+            self.tree,
+            get_status_snapshot, self.master_sheet,
+            on_success=lambda snapshot: self.show_search_results(mr_no, snapshot),
+            on_error=lambda e: messagebox.showerror("Error", f"Error searching data: {str(e)}"),
+            busy_message="Searching...",
+        )
+
+    def show_search_results(self, mr_no, snapshot):
         try:
-            mr_no = self.mr_search.get().strip()
-            
-            if not mr_no:
-                self.load_table_data()
-                return
-            
-            # Clear existing items
-            for button in self.buttons:
-                button.destroy()
-            self.buttons = []
-            
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            
-            # Get data and search
-            data = self.master_sheet.get_all_values()
             required_cols = {
                 "DIVISION": 0, "MR NO": 2, "LOT NO": 3, "DATE": 4,
                 "TC NO": 5, "MAKE": 6, "TC CAPACITY": 7, "JOB NO": 8
             }
             
-            for row in data[2:]:
+            table_rows = []
+            for row_number, row, status in data_rows(snapshot):
                 row_mr_no = row[required_cols["MR NO"]]
                 
                 if mr_no.lower() in row_mr_no.lower():
                     row_data = [row[required_cols[col]] for col in required_cols]
                     
-                    has_testing_data = any(row[45:60])  # Columns AT to BH
-                    testing_status = "YES" if has_testing_data else "NO"
+                    testing_status = yes_no(status, TESTING)
                     row_data.append(testing_status)
                     row_data.append("")
                     
-                    item = self.tree.insert('', tk.END, values=row_data)
-                    self.create_button_for_row(item, row[required_cols["TC NO"]], testing_status)
+                    table_rows.append((row_number, row_data))
             
-            if not self.tree.get_children():
+            if table_rows:
+                self.table.sync(table_rows)
+                self.actions.refresh()
+            else:
                 messagebox.showinfo("No Results", "No matching records found.")
                 self.load_table_data()
                 
@@ -255,28 +192,25 @@ class TestingVerificationForm:
             print(f"Debug - Search error details: {str(e)}")
 
     def start_enrollment(self, tc_no):
-        """Start the enrollment process for a TC"""
-        try:
-            # Get row data from master sheet
-            data = self.master_sheet.get_all_values()
-            row_data = None
-            
-            # Skip header rows and find the matching TC NO
-            for row in data[2:]:  # Skip first two rows
-                if str(row[5]).strip() == str(tc_no).strip():  # TC NO is in column F (index 5)
-                    row_data = row
-                    break
-            
-            if row_data is None:
-                messagebox.showerror("Error", f"TC No. {tc_no} not found in master sheet")
-                return
-            
-            # Create new inspection window
-            self.create_inspection_window(row_data)
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Error starting enrollment: {str(e)}")
-            print(f"Debug - Start enrollment error: {str(e)}")
+        """Start the enrollment process for a TC: look it up in the background, then open its window"""
+        run_in_background(
+            self.tree,
+            self.find_master_row, tc_no,
+            on_success=lambda row_data: self.open_enrollment(tc_no, row_data),
+            on_error=lambda e: messagebox.showerror("Error", f"Error starting enrollment: {str(e)}"),
+            busy_message="Loading transformer...",
+        )
+
+    def find_master_row(self, tc_no):
+        """Master Sheet row of tc_no, None if missing; runs on the sheet I/O thread"""
+        return get_tc_row(self.master_sheet, tc_no)  # raises DuplicateTcError if ambiguous
+
+    def open_enrollment(self, tc_no, row_data):
+        if row_data is None:
+            messagebox.showerror("Error", f"TC No. {tc_no} not found in master sheet")
+            return
+        # Create new inspection window
+        self.create_inspection_window(row_data)
 
     def create_inspection_window(self, row_data):
         # Create new window
@@ -479,72 +413,66 @@ class TestingVerificationForm:
                 entries["REMARKS"].get()
             ]
             
-            # Update Master Sheet (columns AV to BJ)
-            master_row = None
-            master_data = self.master_sheet.get_all_values()
-            
-            for idx, row in enumerate(master_data):
-                if row[5] == row_data[5]:  # Match TC NO
-                    master_row = idx + 1
-                    break
-            
-            if master_row:
-                try:
-                    # Update Master Sheet
-                    range_name = f'AV{master_row}:BJ{master_row}'
-                    self.master_sheet.update(range_name, [inspection_data])
-                    
-                    # Update Testing Sheet
-                    # testing_sheet = setup_google_sheets().worksheet("TESTING")
-                    # testing_data = inspection_data  # Combine TC details with testing data
-                    
-                    # # Check if TC already exists in Testing sheet
-                    # testing_data_all = testing_sheet.get_all_values()
-                    # testing_row = None
-                    
-                    # for idx, row in enumerate(testing_data_all):
-                    #     if len(row) > 5 and row[5] == row_data[5]:  # Match TC NO
-                    #         testing_row = idx + 1
-                    #         break
-                    
-                    # if testing_row:
-                    #     # Update existing row
-                    #     range_name = f'J{testing_row}:X{testing_row}'
-                    #     testing_sheet.update(range_name, [testing_data])
-                    # else:
-                    #     # Add new row
-                    #     testing_sheet.append_row(testing_data)
-                    
-                    messagebox.showinfo("Success", "Testing data saved successfully!")
-                    self.load_table_data()  # Refresh the main table
-                    
-                    # Close inspection window
-                    for widget in self.window.winfo_children():
-                        if isinstance(widget, tk.Toplevel):
-                            widget.destroy()
-                            break
-                            
-                except Exception as e:
-                    messagebox.showerror("Error", f"Error saving data: {str(e)}")
-                    print(f"Debug - Save error details: {str(e)}")
-            else:
-                raise Exception("TC not found in master sheet")
+            # Update Master Sheet (columns AV to BJ) in the background
+            run_in_background(
+                self.submit_btn,
+                self.update_sheets, row_data, inspection_data,
+                on_success=lambda result: self.on_inspection_saved(),
+                on_error=self.on_save_error,
+                busy_message="Saving testing data...",
+                disable=[self.submit_btn],
+            )
             
         except Exception as e:
             messagebox.showerror("Error", f"Error submitting inspection: {str(e)}")
             print(f"Debug - Submit error details: {str(e)}")
 
-    def start_loading(self):
-        self.submit_btn.config(state=tk.DISABLED)  # Disable the button
-        self.loading_animation(0)
+    def update_sheets(self, row_data, inspection_data):
+        """Write the testing data of one TC to the Master Sheet; runs on the sheet I/O thread"""
+        # Row number comes from the TC index, no sheet read needed
+        master_row = find_tc_row(self.master_sheet, row_data[5])
+        if not master_row:
+            raise Exception("TC not found in master sheet")
+
+        range_name = f'AV{master_row}:BJ{master_row}'
+        revision = snapshot_cache.revision_before_write(self.master_sheet)
+        self.master_sheet.update(range_name, [inspection_data])
+        snapshot_cache.record_update(self.master_sheet, master_row, 47, [inspection_data], revision)
+        
+        # Update Testing Sheet
+        # testing_sheet = setup_google_sheets().worksheet("TESTING")
+        # testing_data = inspection_data  # Combine TC details with testing data
+        
+        # # Check if TC already exists in Testing sheet
+        # testing_data_all = testing_sheet.get_all_values()
+        # testing_row = None
+        
+        # for idx, row in enumerate(testing_data_all):
+        #     if len(row) > 5 and row[5] == row_data[5]:  # Match TC NO
+        #         testing_row = idx + 1
+        #         break
+        
+        # if testing_row:
+        #     # Update existing row
+        #     range_name = f'J{testing_row}:X{testing_row}'
+        #     testing_sheet.update(range_name, [testing_data])
+        # else:
+        #     # Add new row
+        #     testing_sheet.append_row(testing_data)
+
+    def on_inspection_saved(self):
+        messagebox.showinfo("Success", "Testing data saved successfully!")
+        self.load_table_data()  # Refresh the main table
+        
+        # Close inspection window
+        for widget in self.window.winfo_children():
+            if isinstance(widget, tk.Toplevel):
+                widget.destroy()
+                break
 
-    def loading_animation(self, i):
-        if i <= 100:
-            self.submit_btn.config(text=str(i) + "%")
-            self.submit_btn.after(25, self.loading_animation, i + 1)  # Call again after 25ms
-        else:
-            self.submit_btn.config(text="✓", bg='#16ba9a', fg='white')  # Change to finished state
-            self.submit_btn.config(state=tk.NORMAL)  # Re-enable the button
+    def on_save_error(self, e):
+        messagebox.showerror("Error", f"Error saving data: {str(e)}")
+        print(f"Debug - Save error details: {str(e)}")
 
 def create_testing_form(sheet):
     TestingVerificationForm(sheet)
\ No newline at end of file
@@ -0,0 +1,103 @@
+"""
+EXECUTE column of the inspection tables.
+
+The tables used to place one tk.Button over every row and create a fresh set on
+each scroll or resize. ActionColumn keeps a small pool of buttons instead, one
+per row that fits on screen, and moves them onto the visible rows whenever the
+table scrolls, resizes or changes. Memory and redraw cost do not grow with the
+number of rows.
+"""
+import tkinter as tk
+
+ENROL_STYLE = dict(text="Enrol", bg='#FF0000', fg='white', state='normal')
+ENROLLED_STYLE = dict(text="Enrolled", bg='#00FF00', fg='white', state='disabled')
+
+# Step (px) used to find the first row under the headings
+_PROBE_STEP = 4
+
+
+class ActionColumn:
+    """
+    Recycled Enrol/Enrolled buttons for one Treeview column
+    Args:
+        tree: the Treeview
+        scrollbar: its vertical scrollbar (the tree's yscrollcommand is taken over)
+        key_index: index in the row values of what on_click receives (e.g. TC NO)
+        status_index: index in the row values of the YES/NO completed status
+        on_click: called with the row's key when an Enrol button is pressed
+        column: the column the buttons sit in
+    """
+
+    def __init__(self, tree, scrollbar, key_index, status_index, on_click, column="EXECUTE"):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.key_index = key_index
+        self.status_index = status_index
+        self.on_click = on_click
+        self.column = column
+        self.pool = []
+        self._pending = None
+
+        tree.configure(yscrollcommand=self._on_yscroll)
+        tree.bind('<Configure>', lambda e: self.refresh(), add='+')
+        tree.bind('<ButtonRelease-1>', lambda e: self.refresh(), add='+')  # column resized
+
+    def _on_yscroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.refresh()
+
+    def refresh(self):
+        """Move the buttons onto the visible rows once Tk is idle"""
+        if self._pending is None:
+            try:
+                self._pending = self.tree.after_idle(self._place_buttons)
+            except tk.TclError:
+                self._pending = None  # table destroyed
+
+    def _visible_items(self):
+        height = self.tree.winfo_height()
+        item = ''
+        for y in range(0, height, _PROBE_STEP):
+            item = self.tree.identify_row(y)
+            if item:
+                break
+        while item:
+            bbox = self.tree.bbox(item, self.column)
+            if not bbox or bbox[1] >= height:
+                break
+            yield item, bbox
+            item = self.tree.next(item)
+
+    def _button(self, index):
+        if index == len(self.pool):
+            self.pool.append(tk.Button(
+                self.tree,
+                width=8,
+                font=('Arial', 9, 'bold'),
+                relief="raised",
+                borderwidth=2
+            ))
+        return self.pool[index]
+
+    def _place_buttons(self):
+        self._pending = None
+        try:
+            if not self.tree.winfo_exists():
+                return
+            used = 0
+            for item, bbox in self._visible_items():
+                values = self.tree.item(item)['values']
+                if not values:
+                    continue
+                button = self._button(used)
+                if values[self.status_index] == "NO":
+                    key = values[self.key_index]
+                    button.configure(command=lambda key=key: self.on_click(key), **ENROL_STYLE)
+                else:
+                    button.configure(command='', **ENROLLED_STYLE)
+                button.place(x=bbox[0] + 10, y=bbox[1] + 2)
+                used += 1
+            for button in self.pool[used:]:
+                button.place_forget()
+        except tk.TclError as e:
+            print(f"Debug - Could not place action buttons: {str(e)}")
@@ -0,0 +1,203 @@
+"""
+asyncio facade over the sheets layer, driven from the Tk mainloop.
+
+Multi-step flows (read MASTER, compute, write ESTIMATE, format) are written as
+coroutines. Blocking reads run on a bounded thread pool, so independent reads
+can run together under asyncio.gather(). Writes go to the single sheet worker of
+utils.background, so they stay in order with each other and with every
+run_in_background() save and reload. While a read runs, the worker may be
+patching the same cached snapshot, so reads hand back copies taken under the
+snapshot lock (SheetSnapshot.copy_rows, get_mr_rows).
+
+The asyncio loop runs on the Tk thread: TkAsyncBridge gives it a turn from an
+after() callback while coroutines are pending. Coroutine code between awaits may
+therefore use widgets directly, as any Tk callback would.
+
+    async def save():
+        rows, rates = await asyncio.gather(
+            sheets.mr_rows(master_sheet, mr_no), sheets.rate_card(estimate_sheet))
+        ...
+
+    run_coroutine(window, save(), busy_message="Saving...")
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+import tkinter as tk
+from config.sheets_setup import find_worksheet, write_form_rows
+from utils.background import BusyState, sheet_executor, show_error
+from utils.estimate_memo import compute_estimate_cached
+from utils.estimate_sheets import write_estimate
+from utils.rate_card import get_rate_card
+from utils.sheet_cache import copy_sheet_values, snapshot_cache
+from utils.sheet_index import get_mr_rows
+
+# Blocking sheet reads allowed at the same time
+ASYNC_SHEET_WORKERS = 4
+
+# How often the Tk thread gives the asyncio loop a turn while coroutines run (ms)
+TICK_INTERVAL = 20
+
+
+class AsyncSheets:
+    """Awaitable versions of the sheet calls the forms use"""
+
+    def __init__(self, workers=ASYNC_SHEET_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="async-sheets")
+
+    async def run(self, func, *args, **kwargs):
+        """Run a blocking func(*args, **kwargs) on the pool and await its result"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, functools.partial(func, *args, **kwargs))
+
+    async def run_write(self, func, *args, **kwargs):
+        """Like run(), but on the sheet worker: one write at a time, in the order they were queued"""
+        future = sheet_executor.submit_call(functools.partial(func, *args, **kwargs))
+        return await asyncio.wrap_future(future)
+
+    # Reads
+    async def worksheet(self, title):
+        return await self.run(find_worksheet, title)
+
+    async def values(self, worksheet):
+        return await self.run(copy_sheet_values, worksheet)
+
+    async def sheet_values(self, title):
+        """All values of the worksheet called title"""
+        return await self.values(await self.worksheet(title))
+
+    async def mr_rows(self, worksheet, mr_no):
+        return await self.run(get_mr_rows, worksheet, mr_no)
+
+    async def rate_card(self, estimate_sheet):
+        return await self.run(get_rate_card, estimate_sheet)
+
+    async def estimate(self, rows, rate_card):
+        """(EstimateResult, cached) for the rows of one MR, see compute_estimate_cached"""
+        return await self.run(compute_estimate_cached, rows, rate_card)
+
+    # Writes
+    async def update(self, worksheet, row_number, col_index, range_name, values):
+        """Write values to range_name and keep the cached snapshot in step"""
+        def update():
+            revision = snapshot_cache.revision_before_write(worksheet)
+            worksheet.update(range_name, values)
+            snapshot_cache.record_update(worksheet, row_number, col_index, values, revision)
+        return await self.run_write(update)
+
+    async def write_form_rows(self, data, form_name, additional_data=None):
+        return await self.run_write(write_form_rows, data, form_name, additional_data)
+
+    async def write_estimate(self, estimate_sheet, result):
+        return await self.run_write(write_estimate, estimate_sheet, result)
+
+
+sheets = AsyncSheets()
+
+
+class TkAsyncBridge:
+    """Runs an asyncio event loop in turns from the Tk mainloop"""
+
+    def __init__(self, interval=TICK_INTERVAL):
+        self.interval = interval
+        self.loop = asyncio.new_event_loop()
+        self._tasks = set()
+        self._ticking = None
+
+    def spawn(self, widget, coro):
+        """Schedule coro on the loop and keep the loop turning until it is done"""
+        task = self.loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        self._start(widget._root())
+        return task
+
+    def _start(self, root):
+        if self._ticking is None:
+            try:
+                self._ticking = root.after(0, self._tick, root)
+            except tk.TclError:
+                self._ticking = None  # application is closing
+
+    def _tick(self, root):
+        self._ticking = None
+        # Run everything that is ready now, then hand control back to Tk
+        self.loop.call_soon(self.loop.stop)
+        self.loop.run_forever()
+        if self._tasks:
+            try:
+                self._ticking = root.after(self.interval, self._tick, root)
+            except tk.TclError:
+                pass
+
+
+tk_bridge = TkAsyncBridge()
+
+
+class CoroutineTask:
+    """Handle of a coroutine started with run_coroutine()"""
+
+    def __init__(self, widget, busy):
+        self.widget = widget
+        self.busy = busy
+        self.task = None
+
+    @property
+    def cancelled(self):
+        return self.task is not None and self.task.cancelled()
+
+    def cancel(self):
+        """Cancel at the next await; blocking calls already running finish on their own"""
+        if self.task is not None and not self.task.done():
+            print("Debug - Coroutine cancelled")
+            self.task.cancel()
+        self._end_busy()
+
+    def _end_busy(self):
+        if self.busy is not None:
+            self.busy.end()
+            self.busy = None
+
+
+def run_coroutine(widget, coro, on_success=None, on_error=None,
+                  busy_message=None, disable=(), cancellable=True):
+    """
+    Run a coroutine from a Tk callback
+    Args are as for utils.background.run_in_background: on_success gets the
+    coroutine's result and on_error the exception (default: an error box), both on
+    the Tk thread and only while widget still exists.
+    Returns:
+        CoroutineTask
+    """
+    handle = CoroutineTask(widget, None)
+    if busy_message is not None:
+        handle.busy = BusyState(widget, busy_message, disable, handle.cancel if cancellable else None)
+
+    async def wrapper():
+        try:
+            result, error = await coro, None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Debug - Coroutine failed: {str(e)}")
+            result, error = None, e
+        handle._end_busy()
+        if not _exists(widget):
+            return
+        try:
+            if error is not None:
+                (on_error or show_error)(error)
+            elif on_success is not None:
+                on_success(result)
+        except Exception as e:
+            print(f"Debug - Coroutine callback failed: {str(e)}")
+
+    handle.task = tk_bridge.spawn(widget, wrapper())
+    return handle
+
+
+def _exists(widget):
+    try:
+        return bool(widget.winfo_exists())
+    except tk.TclError:
+        return False
@@ -0,0 +1,239 @@
+"""
+Sheet I/O off the Tk thread.
+
+Network calls run on a background worker; their results come back to the Tk
+thread through a queue polled with after(), so callbacks may touch widgets. Sheet
+calls run on a single worker thread, in the order they were submitted, so a save
+and the reload that follows it never overtake each other.
+
+While a task runs, its window shows a busy bar with a Cancel button. A task that
+has not started yet is dropped on cancel. A request already sent to Google
+cannot be stopped: it finishes and its result is discarded (no callback runs),
+and the busy bar and disabled widgets stay until it has, so a write that is
+still landing cannot be submitted a second time.
+"""
+import queue
+import threading
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import ttk, messagebox
+
+# One worker keeps sheet writes in submission order
+SHEET_IO_WORKERS = 1
+
+# How often the Tk thread checks for finished tasks (ms)
+POLL_INTERVAL = 50
+
+
+class TaskCancelled(Exception):
+    """Raised by CancelToken.check() in a task that was cancelled"""
+
+
+class CancelToken:
+    """Cancellation flag shared by a task and the window that started it"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        self._event.set()
+
+    def check(self):
+        """For multi-step tasks: stop between requests once cancelled"""
+        if self._event.is_set():
+            raise TaskCancelled()
+
+
+class BusyState:
+    """Busy cursor, disabled widgets and an indeterminate bar with Cancel on a window"""
+
+    def __init__(self, window, message="Working...", disable=(), on_cancel=None):
+        self.window = window.winfo_toplevel()
+        self.disabled = []
+        for widget in disable:
+            try:
+                if str(widget.cget("state")) != tk.DISABLED:
+                    widget.configure(state=tk.DISABLED)
+                    self.disabled.append(widget)
+            except tk.TclError:
+                pass
+
+        self.old_cursor = self.window.cget("cursor")
+        self.window.configure(cursor="watch")
+
+        self.frame = ttk.Frame(self.window, padding=8, relief="raised")
+        self.label = ttk.Label(self.frame, text=message)
+        self.label.pack(side=tk.LEFT, padx=(0, 10))
+        self.progress = ttk.Progressbar(self.frame, mode="indeterminate", length=160)
+        self.progress.pack(side=tk.LEFT, padx=(0, 10))
+        self.cancel_button = None
+        if on_cancel is not None:
+            self.cancel_button = ttk.Button(self.frame, text="Cancel", command=on_cancel)
+            self.cancel_button.pack(side=tk.LEFT)
+        self.frame.place(relx=0.5, rely=1.0, anchor="s", y=-10)
+        self.frame.lift()
+        self.progress.start(15)
+
+    def cancelling(self):
+        """Cancelled while a request is in flight: keep everything disabled until it ends"""
+        try:
+            self.label.configure(text="Cancelling, waiting for the current request...")
+            if self.cancel_button is not None:
+                self.cancel_button.configure(state=tk.DISABLED)
+        except tk.TclError:
+            pass
+
+    def end(self):
+        try:
+            self.progress.stop()
+            self.frame.destroy()
+            self.window.configure(cursor=self.old_cursor)
+        except tk.TclError:
+            return  # window already closed
+        for widget in self.disabled:
+            try:
+                widget.configure(state=tk.NORMAL)
+            except tk.TclError:
+                pass
+
+
+class BackgroundTask:
+    """Handle of a submitted task"""
+
+    def __init__(self, widget, on_success, on_error, busy):
+        self.widget = widget
+        self.on_success = on_success
+        self.on_error = on_error
+        self.busy = busy
+        self.token = CancelToken()
+        self.future = None
+
+    @property
+    def cancelled(self):
+        return self.token.cancelled
+
+    def cancel(self):
+        if self.token.cancelled:
+            return
+        print("Debug - Background task cancelled")
+        self.token.cancel()
+        if self.future is None or self.future.cancel():
+            self._end_busy()
+        elif self.busy is not None:
+            # Already running; _deliver ends the busy state once it returns
+            self.busy.cancelling()
+
+    def _end_busy(self):
+        if self.busy is not None:
+            self.busy.end()
+            self.busy = None
+
+    def _deliver(self, error, result):
+        self._end_busy()
+        if self.token.cancelled or isinstance(error, TaskCancelled):
+            return
+        try:
+            if not self.widget.winfo_exists():
+                return
+        except tk.TclError:
+            return
+        if error is not None:
+            self.on_error(error)
+        elif self.on_success is not None:
+            self.on_success(result)
+
+
+def show_error(error):
+    messagebox.showerror("Error", str(error))
+
+
+class SheetExecutor:
+    """Runs sheet I/O on worker threads and hands results back to the Tk thread"""
+
+    def __init__(self, workers=SHEET_IO_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sheet-io")
+        self._done = queue.Queue()
+        self._pending = 0
+        self._polling = None
+
+    def submit(self, widget, func, *args, on_success=None, on_error=None,
+               busy_message=None, disable=(), cancellable=True, pass_token=False):
+        """
+        Run func(*args) in the background; must be called on the Tk thread
+        Args:
+            widget: widget whose window shows the busy state; callbacks are skipped once it is destroyed
+            on_success: called on the Tk thread with func's result
+            on_error: called on the Tk thread with the exception (default: an error box)
+            busy_message: text of the busy bar; None shows no busy state
+            disable: widgets disabled while the task runs
+            pass_token: call func(*args, token) so it can check for cancellation
+        Returns:
+            BackgroundTask
+        """
+        task = BackgroundTask(widget, on_success, on_error or show_error, None)
+        if busy_message is not None:
+            task.busy = BusyState(widget, busy_message, disable, task.cancel if cancellable else None)
+        call_args = args + (task.token,) if pass_token else args
+        task.future = self._pool.submit(self._run, task, func, call_args)
+        self._pending += 1
+        # Also called when the future is cancelled before it starts
+        task.future.add_done_callback(lambda future: self._done.put((task, future)))
+        self._schedule(widget._root())
+        return task
+
+    def submit_call(self, func, *args):
+        """
+        Queue func(*args) on the sheet worker without a widget or callbacks
+        For callers with their own way back to the Tk thread (utils.async_sheets);
+        the call still runs in order with every other sheet task.
+        Returns:
+            concurrent.futures.Future
+        """
+        return self._pool.submit(func, *args)
+
+    def _run(self, task, func, args):
+        task.token.check()
+        try:
+            return func(*args)
+        except TaskCancelled:
+            raise
+        except Exception as e:
+            print(f"Debug - Background task failed: {str(e)}")
+            raise
+
+    def _schedule(self, root):
+        if self._polling is None:
+            try:
+                self._polling = root.after(POLL_INTERVAL, self._poll, root)
+            except tk.TclError:
+                self._polling = None  # application is closing
+
+    def _poll(self, root):
+        self._polling = None
+        while True:
+            try:
+                task, future = self._done.get_nowait()
+            except queue.Empty:
+                break
+            self._pending -= 1
+            if future.cancelled():
+                continue
+            try:
+                error = future.exception()
+                task._deliver(error, None if error else future.result())
+            except Exception as e:
+                print(f"Debug - Background callback failed: {str(e)}")
+        if self._pending:
+            self._schedule(root)
+
+
+sheet_executor = SheetExecutor()
+
+
+def run_in_background(widget, func, *args, **options):
+    """Shortcut for sheet_executor.submit(); see SheetExecutor.submit"""
+    return sheet_executor.submit(widget, func, *args, **options)
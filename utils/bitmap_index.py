@@ -0,0 +1,174 @@
+"""
+Combined filters over the MASTER SHEET snapshot with bitmap indexes.
+
+Every value of a categorical column (DIVISION, MAKE, TC CAPACITY, B/S, CU/ALU)
+gets a NumPy boolean array over the snapshot rows, true where the row holds
+that value; the stage status bytes (utils.stage_status) give the stage
+bitmaps. A query such as "TALOD, 100 KVA, testing pending" is then a few
+vectorised AND/OR operations instead of a scan of the sheet:
+
+    index = get_bitmap_index(master_sheet)
+    mask = index.select({"DIVISION": ["TALOD"], "TC CAPACITY": ["100 KVA"]}, missing=TESTING)
+    row_numbers = index.row_numbers(mask)
+
+Values are compared upper-cased and stripped. The bitmaps follow the snapshot
+hooks, so appends and inspection writes update them in place.
+"""
+import threading
+import numpy as np
+from utils.sheet_cache import snapshot_cache
+from utils.sheet_index import HEADER_ROWS
+from utils.stage_status import ESTIMATE, INTERNAL, PHYSICAL, TESTING, get_stage_status
+
+# Categorical MASTER SHEET columns (0-based); B/S and CU/ALU as read by utils.estimate_engine
+FILTER_COLUMNS = {
+    "DIVISION": 0,
+    "MAKE": 6,
+    "TC CAPACITY": 7,
+    "B/S": 26,
+    "CU/ALU": 35,
+}
+
+# Stage filters: name -> (stage bits that must be set, stage bits that must be clear)
+STAGE_FILTERS = {
+    "PENDING PHYSICAL": (0, PHYSICAL),
+    "PENDING INTERNAL": (0, INTERNAL),
+    "PENDING TESTING": (0, TESTING),
+    "PHYSICAL DONE": (PHYSICAL, 0),
+    "INTERNAL DONE": (INTERNAL, 0),
+    "TESTING DONE": (TESTING, 0),
+    "READY FOR ESTIMATE": (ESTIMATE, 0),
+}
+
+
+def filter_value(value):
+    return str(value).strip().upper()
+
+
+class BitmapIndex:
+    """value -> boolean row mask for every FILTER_COLUMNS column of one snapshot"""
+
+    def __init__(self, snapshot):
+        # Built first, so its hooks run before ours (see utils.mr_summary)
+        self.stages = get_stage_status(snapshot)
+        self._lock = threading.Lock()
+        self.size = len(snapshot.rows)
+        self.capacity = self.size
+        self.bitmaps = {name: {} for name in FILTER_COLUMNS}
+        self.values = {name: [''] * self.size for name in FILTER_COLUMNS}
+        for name, col in FILTER_COLUMNS.items():
+            values = self.values[name]
+            for index in range(HEADER_ROWS, self.size):
+                row = snapshot.rows[index]
+                values[index] = filter_value(row[col]) if len(row) > col else ''
+            code_of = {}
+            codes = np.fromiter(
+                (code_of.setdefault(value, len(code_of)) for value in values), dtype=np.int32, count=len(values)
+            )
+            for value, code in code_of.items():
+                if value:
+                    self.bitmaps[name][value] = codes == code
+
+    def _grow(self, size):
+        if size > self.capacity:
+            self.capacity = max(size, self.capacity * 2)
+            for bitmaps in self.bitmaps.values():
+                for value, bitmap in bitmaps.items():
+                    grown = np.zeros(self.capacity, dtype=bool)
+                    grown[:len(bitmap)] = bitmap
+                    bitmaps[value] = grown
+        for values in self.values.values():
+            values.extend([''] * (size - len(values)))
+        self.size = max(self.size, size)
+
+    def _update_rows(self, snapshot, first_row_number, count):
+        first_row_number = max(first_row_number, HEADER_ROWS + 1)
+        with self._lock:
+            self._grow(len(snapshot.rows))
+            for name, col in FILTER_COLUMNS.items():
+                bitmaps = self.bitmaps[name]
+                values = self.values[name]
+                for index in range(first_row_number - 1, first_row_number - 1 + count):
+                    row = snapshot.rows[index]
+                    value = filter_value(row[col]) if len(row) > col else ''
+                    if value == values[index]:
+                        continue
+                    if values[index]:
+                        bitmaps[values[index]][index] = False
+                    if value:
+                        if value not in bitmaps:
+                            bitmaps[value] = np.zeros(self.capacity, dtype=bool)
+                        bitmaps[value][index] = True
+                    values[index] = value
+
+    def on_rows_patched(self, snapshot, first_row_number, count):
+        self._update_rows(snapshot, first_row_number, count)
+
+    def on_rows_appended(self, snapshot, first_row_number, count):
+        self._update_rows(snapshot, first_row_number, count)
+
+    def choices(self, name):
+        """Values present in the column, sorted, for a filter dropdown"""
+        with self._lock:
+            return sorted(value for value, bitmap in self.bitmaps[name].items() if bitmap[:self.size].any())
+
+    def stage_mask(self, required=0, missing=0):
+        """Rows with every required stage bit set and every missing stage bit clear"""
+        status = np.frombuffer(bytes(self.stages.status), dtype=np.uint8)
+        mask = np.ones(len(status), dtype=bool)
+        if required:
+            mask &= (status & required) == required
+        if missing:
+            mask &= (status & missing) == 0
+        mask[:HEADER_ROWS] = False
+        return self._fit(mask)
+
+    def _fit(self, mask):
+        if len(mask) < self.size:
+            mask = np.concatenate([mask, np.zeros(self.size - len(mask), dtype=bool)])
+        return mask[:self.size]
+
+    def select(self, filters, required=0, missing=0):
+        """
+        Row mask of the rows matching every filter
+        Args:
+            filters: column name -> values; a row matches a column if it holds any of them
+            required, missing: stage bits, see stage_mask
+        """
+        with self._lock:
+            mask = np.zeros(self.size, dtype=bool)
+            mask[HEADER_ROWS:] = True
+            for name, values in filters.items():
+                column_mask = np.zeros(self.size, dtype=bool)
+                for value in values:
+                    bitmap = self.bitmaps[name].get(filter_value(value))
+                    if bitmap is not None:
+                        column_mask |= bitmap[:self.size]
+                mask &= column_mask
+        if required or missing:
+            mask &= self.stage_mask(required, missing)
+        return mask
+
+    def mask_of(self, row_numbers):
+        """Row mask of a list of row numbers (e.g. a search or date index result)"""
+        mask = np.zeros(self.size, dtype=bool)
+        indexes = np.asarray(row_numbers, dtype=np.int64) - 1
+        mask[indexes[indexes < self.size]] = True
+        return mask
+
+    @staticmethod
+    def filter_rows(mask, row_numbers):
+        """The row numbers whose row is set in mask, in the order given"""
+        rows = np.asarray(row_numbers, dtype=np.int64)
+        rows = rows[rows <= len(mask)]
+        return rows[mask[rows - 1]].tolist()
+
+    @staticmethod
+    def row_numbers(mask):
+        """Sheet row numbers of a mask, in sheet order"""
+        return (np.flatnonzero(mask) + 1).tolist()
+
+
+def get_bitmap_index(worksheet, revalidate=True):
+    """BitmapIndex of the worksheet's snapshot, see utils.search_index.get_search_index"""
+    return snapshot_cache.get_derived(worksheet, "bitmap_index", BitmapIndex, revalidate=revalidate)
@@ -0,0 +1,64 @@
+"""
+Date-range queries over the MASTER SHEET snapshot.
+
+The forms write dates as dd/mm/yyyy strings (DateEntry date_pattern). Each
+date column is parsed once per snapshot into ordinals (date.toordinal()) and
+kept sorted with the row numbers, so "intake between 1 and 15 March" or
+"tested this week" is two bisects. Cells that do not parse are left out.
+"""
+from datetime import datetime
+from functools import lru_cache
+from utils.search_index import SortedColumnIndex
+from utils.sheet_cache import snapshot_cache
+
+DATE_FORMAT = "%d/%m/%Y"
+
+# MASTER SHEET date columns (0-based)
+DATE_COLUMNS = {
+    "INTAKE": 4,      # E
+    "PHYSICAL": 9,    # J
+    "INTERNAL": 30,   # AE
+    "TESTING": 47,    # AV
+}
+
+
+def parse_date(text):
+    """date of a dd/mm/yyyy string, None if it does not parse"""
+    try:
+        return datetime.strptime(str(text).strip(), DATE_FORMAT).date()
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=8192)
+def _date_ordinal(text):
+    # Sheets hold few distinct dates; parse each once
+    date = parse_date(text)
+    return None if date is None else date.toordinal()
+
+
+def date_key(value):
+    """Key of a cell for the date index, None for a blank or unparsed cell"""
+    return _date_ordinal(str(value).strip()) if value else None
+
+
+class DateIndex(SortedColumnIndex):
+    """Sorted (date ordinal, row number) list per DATE_COLUMNS column"""
+
+    def __init__(self, snapshot):
+        super().__init__(snapshot, DATE_COLUMNS, date_key)
+
+    def between(self, column, date_from=None, date_to=None, limit=None):
+        """
+        Rows whose column date is within date_from..date_to (both included, either open)
+        Returns:
+            tuple: (number of rows, row numbers of the first limit rows in date order)
+        """
+        low = date_from.toordinal() if date_from else 0
+        high = date_to.toordinal() + 1 if date_to else None
+        return self._slice(column, low, high, limit)
+
+
+def get_date_index(worksheet, revalidate=True):
+    """DateIndex of the worksheet's snapshot, see get_search_index"""
+    return snapshot_cache.get_derived(worksheet, "date_index", DateIndex, revalidate=revalidate)
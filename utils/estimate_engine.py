@@ -0,0 +1,343 @@
+"""
+Estimate computation for the ESTIMATE sheet, free of Tk widgets and sheet I/O.
+
+compute_estimate() takes the MASTER SHEET rows of one MR and the rate card of
+the ESTIMATE template (utils.rate_card), and returns the estimate grid (50 rows,
+5 columns per transformer, placed from J1) together with the totals of each
+transformer. Transformer i occupies grid columns i*5 .. i*5+4 (J..N, O..S, ...):
+rate column, Qty column, value column and two spare columns used by the coils.
+
+Inputs are copied into the grid per transformer; everything after that works on
+(transformers x estimate rows) NumPy arrays so every product, Reqd selection and
+section sum is computed for all transformers at once.
+"""
+import numpy as np
+
+# Part of every memoized estimate's key (utils.estimate_memo); raise it with any
+# change to the arithmetic so results saved by older code are not served again
+ENGINE_VERSION = 2
+
+# Rows of the estimate block (J1:..50); each transformer takes 5 columns
+GRID_ROWS = 50
+COLS_PER_TRANSFORMER = 5
+
+# (grid row, MASTER column number) of the quantities copied from physical inspection
+PHYSICAL_QTY = [
+    (20, 11),  # HT SIDE - BUSHING
+    (21, 12),  # HT SIDE - METAL PART
+    (22, 13),  # HT SIDE - HT CONNECTOR
+    (23, 14),  # LT SIDE - BUSHING
+    (24, 15),  # LT SIDE - METAL PART
+    (25, 16),  # LT SIDE - LT CONNECTOR
+    (18, 17),  # GUAGE GLASS
+    (19, 20),  # OUTSIDE PAINT
+    (17, 21),  # BOLT & NUTS
+    (11, 22),  # ROD GASKET
+    (10, 23),  # TOP GASKET
+    (27, 24),  # NAME PLATE
+    (26, 25),  # BREATHER
+]
+
+# (grid row, MASTER column number) of the quantities copied from internal inspection
+INTERNAL_QTY = [
+    (30, 38),  # COILS HT
+    (31, 40),  # WEIGHT HT
+    (36, 41),  # WEIGHT LT
+    (41, 43),  # INSIDE PAINT
+    (42, 42),  # WASHER RINGS
+    (8, 45),   # TESTING CHARGES
+    (12, 44),  # INSU MATERIAL
+]
+
+# Fixed Qty column labels and fixed rates (grid row, value)
+STATIC_QTY = [(7, "Qty"), (9, "Reqd"), (13, "Reqd"), (14, "Reqd")]
+STATIC_RATES = [(7, "Rate"), (16, "1452"), (26, "309"), (27, "143")]
+
+# MASTER columns of the HT (row 31) and LT (row 36) coil states A, B, C
+HT_COIL_COLUMNS = [32, 33, 34]
+LT_COIL_COLUMNS = [35, 36, 37]
+
+# Rows whose rate comes from the capacity column of the template
+RATE_ROWS = list(range(8, 15)) + list(range(17, 26)) + [41, 42]
+
+# Rows valued at their rate when Qty is "Reqd", 0 otherwise
+REQD_ROWS = [8, 9, 12, 13, 14, 16, 17, 18, 19, 26, 27, 41]
+
+# Rows valued at rate x Qty
+MULTIPLY_ROWS = [10, 11, 20, 21, 22, 23, 24, 25, 42]
+
+# Discount written to L46 and tax rate applied in L48
+DISCOUNT = "0.00"
+TAX_RATE = 0.04
+
+
+class TransformerTotals:
+    """Roll-ups of one transformer, named after the cells of the first transformer"""
+
+    def __init__(self, l16, l29, l44, l45, l46, l47, l48, l49):
+        self.l16 = l16  # sum of rows 9-15
+        self.l29 = l29  # sum of rows 17-28
+        self.l44 = l44  # sum of rows 33-43
+        self.l45 = l45  # L29 + L44
+        self.l46 = l46  # discount
+        self.l47 = l47  # L45 + L16 - L46
+        self.l48 = l48  # 4% of L47
+        self.l49 = l49  # L47 + L48, the estimate total
+
+    def __repr__(self):
+        return f"TransformerTotals(l16={self.l16}, l29={self.l29}, l44={self.l44}, l49={self.l49})"
+
+
+class EstimateResult:
+    """Output of compute_estimate: the estimate grid and one TransformerTotals per transformer"""
+
+    def __init__(self, grid, totals):
+        self.grid = grid
+        self.totals = totals
+
+
+def _cell(row, col_index):
+    return row[col_index] if col_index < len(row) else ''
+
+
+def transformer_header(row):
+    """Rows 1-7 of a transformer: JOB NO, MAKE, TC NO, capacity, bolted/sealed, winding, SE/DPC"""
+    return [
+        _cell(row, 8),
+        _cell(row, 6),
+        _cell(row, 5),
+        _cell(row, 7),
+        "BOLTED" if _cell(row, 26) == "B" else "SEALED",
+        "CU" if _cell(row, 35) == "CU" else "AL",
+        _cell(row, 45),
+    ]
+
+
+def _fill_inputs(grid, index, row, rates):
+    """Copy quantities, rates and coil states of one transformer into the grid"""
+    rate_col = index * 5
+    qty_col = rate_col + 1
+    val_col = rate_col + 2
+
+    for grid_row, value in enumerate(transformer_header(row)):
+        grid[grid_row][qty_col] = value
+
+    for grid_row, col in PHYSICAL_QTY + INTERNAL_QTY:
+        qty = _cell(row, col - 1)
+        if qty:
+            grid[grid_row][qty_col] = qty
+
+    for grid_row, value in STATIC_QTY:
+        grid[grid_row][qty_col] = value
+    grid[16][qty_col] = "Reqd" if _cell(row, 26) == "S" else "NR"
+    for grid_row, value in STATIC_RATES:
+        grid[grid_row][rate_col] = value
+
+    # Winding rates depend on CU/ALU (AM) and SE/DPC (AT)
+    winding = _cell(row, 38).strip().upper()
+    al_dpc = winding == "AL" and _cell(row, 45).strip().upper() == "DPC"
+    d36 = rates.value(35, 3)
+    grid[32][rate_col] = rates.value(32, 2) if al_dpc else rates.value(30, 2)  # C33 / C31
+    grid[33][rate_col] = rates.value(33, 2) if winding == "AL" else rates.value(33, 5)  # C34 / F34
+    grid[37][rate_col] = rates.value(37, 2) if al_dpc else d36  # C38 / D36
+    grid[38][rate_col] = rates.value(38, 2) if al_dpc else d36  # C39 / D36
+    grid[39][rate_col] = rates.value(39, 2) if al_dpc else "0"  # C40
+    grid[40][rate_col] = rates.value(40, 2) if al_dpc else "0"  # C41
+
+    # Capacity rates: one column of the rate card, 0 when the capacity has none
+    rate_texts = rates.rate_texts(_cell(row, 7))
+    for grid_row in RATE_ROWS:
+        grid[grid_row][rate_col] = rate_texts[grid_row] if rate_texts is not None else 0
+
+    # Coil labels A, B, C with the non-empty coil states packed under them
+    for grid_row, columns in ((29, None), (30, HT_COIL_COLUMNS), (34, None), (35, LT_COIL_COLUMNS)):
+        if columns is None:
+            grid[grid_row][val_col:val_col + 3] = ["A", "B", "C"]
+            continue
+        values = [value for value in (_cell(row, col - 1) for col in columns) if value]
+        grid[grid_row][val_col:val_col + len(values)] = values
+
+
+def _parse_cell(cell):
+    if not cell:
+        return 0.0, False
+    try:
+        return float(cell), False
+    except ValueError:
+        return 0.0, True
+
+
+def _parse(cells):
+    """
+    Parse an array of cells with float(); returns (values, bad, blank)
+    Blank cells are 0; bad marks the cells float() rejects, whose value is also 0.
+    Each distinct cell text is parsed once and spread back by index.
+    """
+    flat = cells.ravel().tolist()
+    codes = {}
+    indices = np.array([codes.setdefault(cell, len(codes)) for cell in flat], dtype=np.intp)
+    parsed = [_parse_cell(cell) for cell in codes]
+    values = np.array([value for value, _ in parsed], dtype=float)[indices]
+    bad = np.array([failed for _, failed in parsed], dtype=bool)[indices]
+    blank = np.array([not cell for cell in codes], dtype=bool)[indices]
+    return values.reshape(cells.shape), bad.reshape(cells.shape), blank.reshape(cells.shape)
+
+
+def _round(values):
+    # np.round scales by 100 first and turns 17.245 into 17.24; amounts are rounded
+    # with round(), which works on the exact decimal value, like the sheet always was
+    return np.array([round(value, 2) for value in values.ravel().tolist()]).reshape(values.shape)
+
+
+def _sum_rows(values):
+    # Left to right, as the step-by-step calculation added them: ndarray.sum() adds
+    # pairwise, in another order, which can move a rounded total by a cent
+    if values.shape[1] == 0:
+        return np.zeros(len(values))
+    return np.cumsum(values, axis=1)[:, -1]
+
+
+def _format(values):
+    """str() of each rounded value, as the sheet expects"""
+    return np.array([str(value) for value in values.ravel().tolist()], dtype=object).reshape(values.shape)
+
+
+def _text_mask(cells, test):
+    # String tests stay per cell: np.char would first copy the object array to unicode
+    flat = cells.ravel().tolist()
+    return np.fromiter((test(str(cell)) for cell in flat), dtype=bool, count=len(flat)).reshape(cells.shape)
+
+
+def _not_text(cells):
+    # Cells holding something other than text, e.g. the integer 0 rate of an unknown capacity
+    flat = cells.ravel().tolist()
+    return np.fromiter((not isinstance(cell, str) for cell in flat), dtype=bool, count=len(flat)).reshape(cells.shape)
+
+
+def _is_reqd(cells):
+    return _text_mask(cells, lambda text: text.strip().upper() == "REQD")
+
+
+def _plain_decimal(cells):
+    # Only plain non-negative decimals ("12", "3.5") count towards L44
+    return _text_mask(cells, lambda text: text.replace('.', '', 1).isdigit())
+
+
+def _apply_reqd(rate, qty, val):
+    rows = REQD_ROWS
+    reqd = _is_reqd(qty[:, rows])
+    val[:, rows] = np.where(reqd, rate[:, rows], "0")
+
+
+def _apply_coils(rates, qtys, qty, val, coils):
+    """K33/L33/L34 from the HT coils and K38-K41/L38-L41 from the LT coils
+
+    A cell that does not parse stops the chain for that transformer; the cells
+    after it are set to 0, as the step-by-step calculation did.
+    """
+    rate_values, rate_bad, _ = rates
+    qty_values, qty_bad, _ = qtys
+    zero = np.full(len(val), "0", dtype=object)
+
+    ht, ht_bad, _ = _parse(coils[:, 30, :])
+    ok_k33 = ~ht_bad.any(axis=1) & ~qty_bad[:, 31]
+    k33 = _round(_sum_rows(ht) * qty_values[:, 31])
+    ok_l33 = ok_k33 & ~rate_bad[:, 32]
+    ok_l34 = ok_l33 & ~rate_bad[:, 33]
+
+    qty[:, 32] = np.where(ok_k33, _format(k33), zero)
+    val[:, 32] = np.where(ok_l33, _format(_round(k33 * rate_values[:, 32])), zero)
+    val[:, 33] = np.where(ok_l34, _format(_round(k33 * rate_values[:, 33])), zero)
+
+    # Count the LT coils marked R (rewind) and D (damaged): K38/K40 and K39/K41
+    states = coils[:, 35, :]
+    rewound = _text_mask(states, lambda text: text.strip().upper() == "R").sum(axis=1)
+    damaged = _text_mask(states, lambda text: text.strip().upper() == "D").sum(axis=1)
+    counts = np.stack([rewound, damaged, rewound, damaged], axis=1)
+    qty[:, 37:41] = np.where(ok_l34[:, None], _format(counts), "0")
+
+    k37 = qty_values[:, 36]
+    ok_lt = ok_l34 & ~qty_bad[:, 36] & ~rate_bad[:, 37:41].any(axis=1)
+    lt_values = _round(rate_values[:, 37:41] * counts * k37[:, None])
+    val[:, 37:41] = np.where(ok_lt[:, None], _format(lt_values), np.where(ok_l34[:, None], "0", val[:, 37:41]))
+
+
+def _apply_products(rates, qtys, val):
+    rows = MULTIPLY_ROWS
+    rate_values, rate_bad, rate_blank = rates
+    qty_values, qty_bad, qty_blank = qtys
+    products = _format(_round(rate_values[:, rows] * qty_values[:, rows]))
+    # Two blank cells multiply as integers and give "0", not "0.0"
+    products = np.where(rate_blank[:, rows] & qty_blank[:, rows], "0", products)
+    val[:, rows] = np.where(rate_bad[:, rows] | qty_bad[:, rows], "0", products)
+
+
+def _apply_totals(val):
+    # Rows 9-43 hold every summed value; cells that do not parse count as 0
+    values = np.zeros(val.shape)
+    values[:, 8:43] = _parse(val[:, 8:43])[0]
+    l16 = _round(_sum_rows(values[:, 8:15]))
+    l29 = _round(_sum_rows(values[:, 16:28]))
+    plain = _plain_decimal(val[:, 32:43])
+    # A rate left as the integer 0 (unknown capacity, Reqd in row 42) made the old
+    # L44 loop fail on str.replace(), and its error handler wrote 0: L44 stays 0
+    failed = _not_text(val[:, 32:43]).any(axis=1)
+    l44 = np.where(failed, 0.0, _round(_sum_rows(np.where(plain, values[:, 32:43], 0))))
+    l45 = _round(l29 + l44)
+    l46 = np.full(len(val), float(DISCOUNT))
+    l47 = _round(l45 + l16 - l46)
+    l48 = _round(l47 * TAX_RATE)
+    l49 = _round(l47 + l48)
+
+    for grid_row, column in ((15, l16), (28, l29), (43, l44), (44, l45), (46, l47), (47, l48), (48, l49)):
+        val[:, grid_row] = _format(column)
+    # L44 stays an integer 0 when none of its rows holds a number, or when it failed
+    val[:, 43] = np.where(plain.any(axis=1) & ~failed, val[:, 43], "0")
+    val[:, 45] = DISCOUNT
+    return [
+        TransformerTotals(*[float(column[i]) for column in (l16, l29, l44, l45, l46, l47, l48, l49)])
+        for i in range(len(val))
+    ]
+
+
+def compute_estimate(rows, rates):
+    """
+    Compute the ESTIMATE grid for the MASTER rows of one MR
+    Args:
+        rows: MASTER SHEET rows, one per transformer, in display order
+        rates: RateCard of the ESTIMATE template (utils.rate_card)
+    Returns:
+        EstimateResult
+    """
+    # Inputs are copied cell by cell into plain lists, which is much cheaper than
+    # item assignment on an object array, then converted once
+    count = len(rows)
+    width = count * COLS_PER_TRANSFORMER
+    cells = [['' for _ in range(width)] for _ in range(GRID_ROWS)]
+    for index, row in enumerate(rows):
+        cells[7][index * 5 + 2] = "Amount"
+        _fill_inputs(cells, index, row, rates)
+    grid = np.empty((GRID_ROWS, width), dtype=object)
+    grid[:] = cells
+
+    # (transformers x rows) views of the rate, Qty and value columns; coils spans the
+    # value column and the two columns after it
+    end = width
+    rate = grid[:, 0:end:5].T.copy()
+    qty = grid[:, 1:end:5].T.copy()
+    val = grid[:, 2:end:5].T.copy()
+    coils = np.stack([grid[:, offset:end:5].T for offset in (2, 3, 4)], axis=2)
+
+    # Rates and quantities are parsed once; the coil step only rewrites Qty rows
+    # 33 and 38-41, which nothing reads back as numbers
+    parsed_rates = _parse(rate)
+    parsed_qtys = _parse(qty)
+
+    _apply_reqd(rate, qty, val)
+    _apply_coils(parsed_rates, parsed_qtys, qty, val, coils)
+    _apply_products(parsed_rates, parsed_qtys, val)
+    totals = _apply_totals(val)
+
+    grid[:, 1:end:5] = qty.T
+    grid[:, 2:end:5] = val.T
+    return EstimateResult(grid.tolist(), totals)
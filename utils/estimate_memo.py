@@ -0,0 +1,138 @@
+"""
+Memoized estimate results.
+
+An estimate depends only on the MASTER rows of its MR (columns A:AU, the
+identity, physical and internal data), on the rate card and on the engine code,
+so results are kept under a SHA-1 of exactly that (the engine counted by
+ENGINE_VERSION). The cache is a bounded LRU in memory, mirrored to
+.sheets_cache/estimates.json so it survives restarts.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from config.sheets_setup import CACHE_DIR
+from utils.estimate_engine import (
+    COLS_PER_TRANSFORMER,
+    ENGINE_VERSION,
+    EstimateResult,
+    GRID_ROWS,
+    TransformerTotals,
+    compute_estimate,
+)
+
+# Columns of a MASTER row the estimate reads (A:AU)
+KEY_COLUMNS = 47
+
+MEMO_SIZE = 64
+ESTIMATE_MEMO_FILE = os.path.join(CACHE_DIR, "estimates.json")
+
+
+def estimate_key(rows, rate_card):
+    """Content hash of the MASTER rows (A:AU) of an MR, the rate card version and ENGINE_VERSION"""
+    content = [[str(value) for value in row[:KEY_COLUMNS]] for row in rows]
+    content.append(rate_card.version)
+    content.append(ENGINE_VERSION)
+    return hashlib.sha1(json.dumps(content).encode("utf-8")).hexdigest()
+
+
+def _to_json(result):
+    # The grid is mostly empty; keep only the filled cells
+    cells = [
+        [row_index, col_index, value]
+        for row_index, row in enumerate(result.grid)
+        for col_index, value in enumerate(row)
+        if value != ''
+    ]
+    return {"cells": cells, "totals": [vars(totals) for totals in result.totals]}
+
+
+def _from_json(data):
+    width = len(data["totals"]) * COLS_PER_TRANSFORMER
+    grid = [['' for _ in range(width)] for _ in range(GRID_ROWS)]
+    for row_index, col_index, value in data["cells"]:
+        grid[row_index][col_index] = value
+    return EstimateResult(grid, [TransformerTotals(**totals) for totals in data["totals"]])
+
+
+class EstimateMemo:
+    """Bounded LRU of EstimateResult by estimate_key, persisted to a JSON file"""
+
+    def __init__(self, maxsize=MEMO_SIZE, path=ESTIMATE_MEMO_FILE):
+        self.maxsize = maxsize
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = None
+        self._lock = threading.RLock()
+
+    def _load(self):
+        self._entries = OrderedDict()
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for key, data in json.load(f):
+                    self._entries[key] = data
+        except (OSError, ValueError, TypeError) as e:
+            if os.path.exists(self.path):
+                print(f"Debug - Ignoring saved estimates: {str(e)}")
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(list(self._entries.items()), f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Debug - Could not save estimates: {str(e)}")
+
+    def get(self, key):
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return _from_json(data)
+
+    def put(self, key, result):
+        self.put_many([(key, result)])
+
+    def put_many(self, items):
+        """Store several (key, result) pairs and save the file once"""
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            for key, result in items:
+                self._entries[key] = _to_json(result)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def clear(self):
+        with self._lock:
+            self._entries = OrderedDict()
+            self._save()
+
+
+estimate_memo = EstimateMemo()
+
+
+def compute_estimate_cached(rows, rate_card):
+    """
+    compute_estimate() memoized by estimate_key()
+    Returns:
+        (EstimateResult, True if it came from the memo)
+    """
+    key = estimate_key(rows, rate_card)
+    result = estimate_memo.get(key)
+    if result is not None:
+        return result, True
+    result = compute_estimate(rows, rate_card)
+    estimate_memo.put(key, result)
+    return result, False
@@ -0,0 +1,149 @@
+"""
+Writing estimate results to the ESTIMATE worksheets.
+
+An ESTIMATE worksheet holds at most TRANSFORMERS_PER_SHEET transformers (J..FH).
+Larger MRs continue on ESTIMATE-2, ESTIMATE-3, ..., created as copies of the
+ESTIMATE template (its A:I labels; J onwards is cleared) when they do not exist
+yet. Every page is written padded to the full page width so columns left over
+from a bigger MR are cleared, and pages no longer needed are blanked. How many
+pages the last estimate used is kept with the ESTIMATE snapshot, so a save only
+reads the pages it writes.
+"""
+import re
+import gspread
+from gspread.utils import rowcol_to_a1
+from config.sheets_setup import duplicate_worksheet, find_worksheet, worksheet_titles
+from utils.estimate_engine import COLS_PER_TRANSFORMER, GRID_ROWS
+from utils.sheet_cache import snapshot_cache
+from utils.sheet_writer import BOLD, batch_format, write_grid
+
+ESTIMATE_SHEET = "ESTIMATE"
+
+# Transformers per ESTIMATE worksheet; 31 fit the original J1:FR50 block
+TRANSFORMERS_PER_SHEET = 31
+
+# The estimate block starts at column J
+FIRST_COL_INDEX = 9
+
+# Cells bolded on every transformer (rows of L16 and L29)
+BOLD_ROWS = [16, 29]
+
+
+def page_title(page, base=ESTIMATE_SHEET):
+    return base if page == 0 else f"{base}-{page + 1}"
+
+
+def split_pages(grid, transformer_count, per_sheet=TRANSFORMERS_PER_SHEET):
+    """Cut the estimate grid into per-sheet grids, each padded to the page width"""
+    page_width = per_sheet * COLS_PER_TRANSFORMER
+    page_count = max(1, -(-transformer_count // per_sheet))
+    pages = []
+    for page in range(page_count):
+        start = page * page_width
+        rows = []
+        for row in grid:
+            cells = list(row[start:start + page_width])
+            rows.append(cells + [''] * (page_width - len(cells)))
+        transformers = min(per_sheet, transformer_count - page * per_sheet)
+        pages.append((rows, max(0, transformers)))
+    return pages
+
+
+class EstimatePages:
+    """Number of ESTIMATE pages holding the last estimate written, None until one is written"""
+
+    def __init__(self, snapshot):
+        self.count = None
+
+    # Kept across our own writes to ESTIMATE; a new snapshot starts unknown again
+    def on_rows_patched(self, snapshot, first_row_number, count):
+        pass
+
+    def on_rows_appended(self, snapshot, first_row_number, count):
+        pass
+
+
+def _clear_estimate_block(worksheet):
+    # Values and bolding from column J on; the copy carries the current MR's
+    # estimate and every column of the template beyond the page (FI:FR)
+    revision = snapshot_cache.revision_before_write(worksheet)
+    worksheet.spreadsheet.batch_update({"requests": [{
+        "updateCells": {
+            "range": {"sheetId": worksheet.id, "startColumnIndex": FIRST_COL_INDEX},
+            "fields": "userEnteredValue,userEnteredFormat.textFormat.bold",
+        }
+    }]})
+    snapshot_cache.record_format(worksheet, revision)
+
+
+def page_sheet(page, template_sheet, base=ESTIMATE_SHEET):
+    """Return the worksheet of one estimate page, copying the template if it does not exist"""
+    title = page_title(page, base)
+    try:
+        return find_worksheet(title)
+    except gspread.WorksheetNotFound:
+        print(f"Debug - Creating {title} from the {ESTIMATE_SHEET} template")
+        revision = snapshot_cache.revision_before_write(template_sheet)
+        worksheet = duplicate_worksheet(template_sheet, title)
+        snapshot_cache.record_format(template_sheet, revision)
+        _clear_estimate_block(worksheet)
+        return worksheet
+
+
+def bold_cells(transformers):
+    """A1 cells of L16/L29 for the first `transformers` transformers of a page"""
+    return [
+        rowcol_to_a1(row, FIRST_COL_INDEX + index * COLS_PER_TRANSFORMER + 3)
+        for index in range(transformers)
+        for row in BOLD_ROWS
+    ]
+
+
+def _extra_pages(page_count):
+    # Every ESTIMATE-n worksheet past page_count, from the cached worksheet titles
+    pattern = re.compile(rf"^{ESTIMATE_SHEET}-(\d+)$")
+    titles = []
+    for title in worksheet_titles():
+        match = pattern.match(title)
+        if match and int(match.group(1)) > page_count:
+            titles.append(title)
+    return titles
+
+
+def write_estimate(template_sheet, result, per_sheet=TRANSFORMERS_PER_SHEET):
+    """
+    Write an EstimateResult over as many ESTIMATE worksheets as it needs
+    Only changed cells are sent (see write_grid); L16/L29 of each transformer are bolded
+    in one request per worksheet that changed.
+    Returns:
+        Number of ranges written over all worksheets
+    """
+    pages = split_pages(result.grid, len(result.totals), per_sheet)
+    # Also the baseline of page 0 for the diff
+    previous_count = snapshot_cache.get_derived(template_sheet, "estimate_pages", EstimatePages).count
+    written = 0
+    for page, (grid, transformers) in enumerate(pages):
+        worksheet = template_sheet if page == 0 else page_sheet(page, template_sheet)
+        if page:
+            snapshot_cache.get_snapshot(worksheet)  # baseline for the diff
+        ranges = write_grid(worksheet, 1, FIRST_COL_INDEX, grid)
+        written += ranges
+        if ranges:
+            batch_format(worksheet, [(cell, BOLD) for cell in bold_cells(transformers)])
+
+    # Blank pages left over from a bigger MR: the ones the last estimate used, or
+    # every extra page when that is not known (first save, ESTIMATE changed elsewhere)
+    if previous_count is None:
+        stale = _extra_pages(len(pages))
+    else:
+        stale = [page_title(page) for page in range(len(pages), previous_count)]
+    blank = [[''] * (per_sheet * COLS_PER_TRANSFORMER) for _ in range(GRID_ROWS)]
+    for title in stale:
+        worksheet = find_worksheet(title)
+        snapshot_cache.get_snapshot(worksheet)
+        written += write_grid(worksheet, 1, FIRST_COL_INDEX, blank)
+
+    snapshot = snapshot_cache.peek(template_sheet)
+    if snapshot is not None:
+        snapshot.derived("estimate_pages", EstimatePages).count = len(pages)
+    return written
@@ -1,44 +1,42 @@
-import re
 import tkinter as tk
 from tkinter import messagebox
+from utils.background import run_in_background
+from utils.lot_allocator import preview_lot
 
-def get_last_lot_number(sheet, division):
-    try:
-        all_values = sheet.get_all_values()
-        
-        if all_values:
-            all_values = all_values[1:]
-        
-        division_rows = [row for row in all_values if row[0] == division]
-        
-        if not division_rows:
-            return f"{division[0]}1"
-        
-        lot_numbers = [row[3] for row in division_rows if row[3]]
-        
-        if not lot_numbers:
-            return f"{division[0]}1"
-        
-        max_number = 0
-        prefix = division[0].upper()
-        
-        for lot in lot_numbers:
-            match = re.match(f"{prefix}(\d+)", lot)
-            if match:
-                number = int(match.group(1))
-                max_number = max(max_number, number)
-        
-        return f"{prefix}{max_number + 1}"
-    
-    except Exception as e:
-        messagebox.showerror("Error", f"Failed to get last lot number: {e}")
-        return f"{division[0]}1"
+# Shown in the Lot No entry while the next lot number is looked up
+LOT_LOADING = "Loading..."
+
+def set_lot_entry(lot_entry, text):
+    lot_entry.configure(state='normal')
+    lot_entry.delete(0, tk.END)
+    lot_entry.insert(0, text)
+    lot_entry.configure(state='readonly')
+
+# Lot lookup still running for each Lot No entry; a newer selection cancels it
+_lot_tasks = {}
 
 def on_division_select(event, division_var, lot_entry, sheet):
     selected_division = division_var.get()
-    if selected_division:
-        next_lot_number = get_last_lot_number(sheet, selected_division)
-        lot_entry.configure(state='normal')
-        lot_entry.delete(0, tk.END)
-        lot_entry.insert(0, next_lot_number)
-        lot_entry.configure(state='readonly') 
\ No newline at end of file
+    if not selected_division:
+        return
+
+    previous = _lot_tasks.pop(str(lot_entry), None)
+    if previous is not None:
+        previous.cancel()
+
+    def on_done(next_lot):
+        _lot_tasks.pop(str(lot_entry), None)
+        set_lot_entry(lot_entry, next_lot)
+
+    def on_error(e):
+        _lot_tasks.pop(str(lot_entry), None)
+        messagebox.showerror("Error", f"Failed to get last lot number: {e}")
+        set_lot_entry(lot_entry, f"{selected_division[0]}1")
+
+    set_lot_entry(lot_entry, LOT_LOADING)
+    _lot_tasks[str(lot_entry)] = run_in_background(
+        lot_entry,
+        preview_lot, sheet, selected_division,
+        on_success=on_done,
+        on_error=on_error,
+    )
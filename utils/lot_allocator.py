@@ -0,0 +1,178 @@
+"""
+Lot numbers per division.
+
+A lot number is the division's first letter and a running number (M12, T4, ...).
+The highest number of each division is read once from the MASTER SHEET snapshot
+and kept current by the snapshot hooks as intake rows are appended.
+
+Handing a number out goes through the LOT COUNTERS worksheet, an append-only log
+of reservations. Appends to a sheet are applied one after the other, so when two
+workstations claim the same number the row appended first wins; the other side
+sees the earlier claim when it reads the log back and moves on to the next
+number.
+"""
+import re
+import socket
+import time
+import uuid
+import gspread
+from config.sheets_setup import add_worksheet, find_worksheet
+from utils.sheet_cache import appended_row_number, snapshot_cache
+from utils.sheet_index import HEADER_ROWS
+
+LOT_SHEET = "LOT COUNTERS"
+LOT_SHEET_HEADER = ["DIVISION", "LOT NUMBER", "WORKSTATION", "TOKEN", "RESERVED AT"]
+
+# MASTER SHEET columns (0-based)
+DIVISION_COL = 0
+LOT_NO_COL = 3
+
+# Reservation log columns (0-based)
+LOG_DIVISION_COL = 0
+LOG_NUMBER_COL = 1
+LOG_TOKEN_COL = 3
+
+# Attempts before giving up when other workstations keep winning the same number
+MAX_RESERVE_ATTEMPTS = 5
+
+_LOT_PATTERN = re.compile(r"([A-Z])(\d+)")
+
+
+def lot_prefix(division):
+    return division[0].upper()
+
+
+def format_lot(division, number):
+    return f"{lot_prefix(division)}{number}"
+
+
+def _lot_number(division, lot):
+    """Running number of lot if it belongs to division's series, else None"""
+    match = _LOT_PATTERN.match(str(lot).strip())
+    if match and match.group(1) == lot_prefix(division):
+        return int(match.group(2))
+    return None
+
+
+class LotCounters:
+    """Highest lot number of each division in the MASTER SHEET, kept current on appends"""
+
+    def __init__(self, snapshot):
+        self.last_by_division = {}
+        self._count_rows(snapshot, HEADER_ROWS + 1, len(snapshot.rows) - HEADER_ROWS)
+
+    def _count_rows(self, snapshot, first_row_number, count):
+        for row in snapshot.rows[first_row_number - 1:first_row_number - 1 + count]:
+            if len(row) <= LOT_NO_COL or not row[DIVISION_COL]:
+                continue
+            number = _lot_number(row[DIVISION_COL], row[LOT_NO_COL])
+            if number is not None:
+                division = row[DIVISION_COL]
+                self.last_by_division[division] = max(self.last_by_division.get(division, 0), number)
+
+    def on_rows_appended(self, snapshot, first_row_number, count):
+        self._count_rows(snapshot, first_row_number, count)
+
+    def on_rows_patched(self, snapshot, first_row_number, count):
+        # Lots are only ever added; a patched row can only raise a counter
+        self._count_rows(snapshot, max(first_row_number, HEADER_ROWS + 1), count)
+
+    def last(self, division):
+        return self.last_by_division.get(division, 0)
+
+
+class ReservationLog:
+    """Highest reserved lot number of each division in the LOT COUNTERS log"""
+
+    def __init__(self, snapshot):
+        self.last_by_division = {}
+        self._count_rows(snapshot, 2, len(snapshot.rows) - 1)
+
+    def _count_rows(self, snapshot, first_row_number, count):
+        for row in snapshot.rows[first_row_number - 1:first_row_number - 1 + count]:
+            if len(row) <= LOG_NUMBER_COL:
+                continue
+            try:
+                number = int(row[LOG_NUMBER_COL])
+            except ValueError:
+                continue
+            division = row[LOG_DIVISION_COL]
+            self.last_by_division[division] = max(self.last_by_division.get(division, 0), number)
+
+    def on_rows_appended(self, snapshot, first_row_number, count):
+        self._count_rows(snapshot, first_row_number, count)
+
+    def last(self, division):
+        return self.last_by_division.get(division, 0)
+
+
+def find_lot_sheet():
+    """Return the LOT COUNTERS worksheet, or None if nothing was reserved yet"""
+    try:
+        return find_worksheet(LOT_SHEET)
+    except gspread.WorksheetNotFound:
+        return None
+
+
+def get_lot_sheet():
+    """Return the LOT COUNTERS worksheet, creating it on first use"""
+    worksheet = find_lot_sheet()
+    if worksheet is None:
+        print(f"Debug - Creating the {LOT_SHEET} worksheet")
+        worksheet = add_worksheet(LOT_SHEET, rows=1, cols=len(LOT_SHEET_HEADER))
+        # The cached revision is from before both requests, adding the sheet included
+        revision = snapshot_cache.revision_before_write(worksheet)
+        worksheet.update("A1", [LOT_SHEET_HEADER])
+        snapshot_cache.record_format(worksheet, revision, requests=2)
+    return worksheet
+
+
+def _last_number(master_sheet, lot_sheet, division):
+    # Cached snapshots are used as they are; reserve_lot() reads back what it missed.
+    # No lot_sheet counts as an empty log.
+    counters = snapshot_cache.get_derived(master_sheet, "lot_counters", LotCounters, revalidate=False)
+    if lot_sheet is None:
+        return counters.last(division)
+    log = snapshot_cache.get_derived(lot_sheet, "reservation_log", ReservationLog, revalidate=False)
+    return max(counters.last(division), log.last(division))
+
+
+def preview_lot(master_sheet, division):
+    """
+    Next lot number of division, for display only (nothing is reserved)
+    No network call once both sheets are cached.
+    """
+    return format_lot(division, _last_number(master_sheet, find_lot_sheet(), division) + 1)
+
+
+def reserve_lot(master_sheet, division):
+    """
+    Reserve the next lot number of division for this workstation
+    Raises:
+        Exception: If no number could be reserved after MAX_RESERVE_ATTEMPTS
+    """
+    lot_sheet = get_lot_sheet()
+    workstation = socket.gethostname()
+    for attempt in range(MAX_RESERVE_ATTEMPTS):
+        known_rows = len(snapshot_cache.get_snapshot(lot_sheet).rows)
+        number = _last_number(master_sheet, lot_sheet, division) + 1
+        token = uuid.uuid4().hex
+        revision = snapshot_cache.revision_before_write(lot_sheet)
+        response = lot_sheet.append_rows(
+            [[division, number, workstation, token, time.strftime("%d/%m/%Y %H:%M:%S")]]
+        )
+        own_row = appended_row_number(response)
+
+        # Rows appended since our last read, ours included, in the order the sheet applied them
+        new_rows = lot_sheet.get(f"A{known_rows + 1}:E{own_row}")
+        snapshot_cache.record_append(lot_sheet, new_rows, known_rows + 1, revision)
+        for row in new_rows:
+            if len(row) > LOG_TOKEN_COL and row[LOG_TOKEN_COL] == token:
+                print(f"Debug - Reserved lot {format_lot(division, number)} (row {own_row})")
+                return format_lot(division, number)
+            if row[LOG_DIVISION_COL:LOG_NUMBER_COL + 1] == [division, str(number)]:
+                print(f"Debug - Lot {format_lot(division, number)} already taken, trying the next one")
+                break
+        else:
+            raise Exception(f"Reservation row {own_row} not found in {LOT_SHEET}")
+    raise Exception(f"Could not reserve a lot number for {division}, please try again")
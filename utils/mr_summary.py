@@ -0,0 +1,138 @@
+"""
+MR summary shared by the MR list windows.
+
+One entry per MR NO, in sheet order: division, lot and date of its first TC, the
+number of TCs and how many of them are done for each stage. It is derived once
+from the MASTER snapshot and kept current by the snapshot hooks as intake rows
+are appended and inspection ranges are written, so opening a list window only
+renders it.
+"""
+import copy
+import threading
+from utils.sheet_projection import Projection, get_projected_derived
+from utils.sheet_index import HEADER_ROWS, MR_NO_COL
+from utils.stage_status import INTERNAL, PHYSICAL, TESTING, get_stage_status
+
+# MASTER columns the MR lists read: A:I and the stage date columns
+MR_LIST_COLUMNS = Projection("mr_list", ["A:I", "J", "AE", "AV"])
+
+# MASTER SHEET columns (0-based)
+DIVISION_COL = 0
+LOT_NO_COL = 3
+DATE_COL = 4
+
+STAGES = (PHYSICAL, INTERNAL, TESTING)
+
+
+def _mr_key(row):
+    return str(row[MR_NO_COL]).strip() if len(row) > MR_NO_COL else ''
+
+
+class MrEntry:
+    """Summary of one MR NO"""
+
+    def __init__(self, mr_no):
+        self.mr_no = mr_no
+        self.division = ''
+        self.lot_no = ''
+        self.date = ''
+        self.first_row = None
+        self.row_numbers = set()
+        self.done = dict.fromkeys(STAGES, 0)
+
+    @property
+    def tc_count(self):
+        return len(self.row_numbers)
+
+    def completed(self, stage):
+        """YES once every TC of the MR is done with stage"""
+        return "YES" if self.tc_count and self.done[stage] == self.tc_count else "NO"
+
+    def copy(self):
+        entry = copy.copy(self)
+        entry.row_numbers = set(self.row_numbers)
+        entry.done = dict(self.done)
+        return entry
+
+
+class MrSummary:
+    """MR NO -> MrEntry for a MASTER snapshot, kept current on patches and appends"""
+
+    def __init__(self, snapshot):
+        # Built first, so its hooks run before ours and the row statuses are current
+        self.stages = get_stage_status(snapshot)
+        self.entries_by_mr = {}
+        self._row_keys = {}
+        self._lock = threading.Lock()
+        self._add_rows(snapshot, HEADER_ROWS + 1, len(snapshot.rows) - HEADER_ROWS)
+
+    def _add_rows(self, snapshot, first_row_number, count):
+        for row_number in range(first_row_number, first_row_number + count):
+            row = snapshot.rows[row_number - 1]
+            mr_no = _mr_key(row)
+            if not mr_no:
+                continue
+            entry = self.entries_by_mr.get(mr_no)
+            if entry is None:
+                entry = self.entries_by_mr[mr_no] = MrEntry(mr_no)
+            entry.row_numbers.add(row_number)
+            status = self.stages.of(row_number)
+            for stage in STAGES:
+                if status & stage:
+                    entry.done[stage] += 1
+            self._row_keys[row_number] = (mr_no, status)
+            if entry.first_row is None or row_number <= entry.first_row:
+                entry.first_row = row_number
+                entry.division, entry.lot_no, entry.date = row[DIVISION_COL], row[LOT_NO_COL], row[DATE_COL]
+
+    def _forget_rows(self, first_row_number, count):
+        for row_number in range(first_row_number, first_row_number + count):
+            key = self._row_keys.pop(row_number, None)
+            if key is None:
+                continue
+            mr_no, status = key
+            entry = self.entries_by_mr[mr_no]
+            entry.row_numbers.discard(row_number)
+            for stage in STAGES:
+                if status & stage:
+                    entry.done[stage] -= 1
+
+    def _refresh_heads(self, snapshot):
+        # An MR whose first TC moved away takes its details from its next TC
+        for mr_no, entry in list(self.entries_by_mr.items()):
+            if not entry.row_numbers:
+                del self.entries_by_mr[mr_no]
+                continue
+            entry.first_row = min(entry.row_numbers)
+            row = snapshot.rows[entry.first_row - 1]
+            entry.division, entry.lot_no, entry.date = row[DIVISION_COL], row[LOT_NO_COL], row[DATE_COL]
+
+    def on_rows_patched(self, snapshot, first_row_number, count):
+        first_row_number = max(first_row_number, HEADER_ROWS + 1)
+        count = min(count, len(snapshot.rows) - first_row_number + 1)
+        with self._lock:
+            moved = any(
+                self._row_keys.get(row_number, ('',))[0] != _mr_key(snapshot.rows[row_number - 1])
+                for row_number in range(first_row_number, first_row_number + count)
+            )
+            self._forget_rows(first_row_number, count)
+            self._add_rows(snapshot, first_row_number, count)
+            if moved:
+                self._refresh_heads(snapshot)
+
+    def on_rows_appended(self, snapshot, first_row_number, count):
+        with self._lock:
+            self._add_rows(snapshot, first_row_number, count)
+
+    def entries(self):
+        """Copies of every MrEntry, in the order the MRs first appear in the sheet"""
+        with self._lock:
+            return [entry.copy() for entry in self.entries_by_mr.values()]
+
+
+def get_mr_summary(worksheet):
+    """
+    MR summary entries of the MASTER SHEET worksheet
+    Only A:I and the stage date columns are downloaded unless the full sheet is cached.
+    """
+    return get_projected_derived(worksheet, MR_LIST_COLUMNS, "mr_summary", MrSummary).entries()
@@ -0,0 +1,174 @@
+"""
+Rate card compiled from the ESTIMATE template (A1:I50).
+
+The template holds one rate column per capacity group (C..H) and a few fixed
+cells (C31, C33, C34, F34, D36, C38-C41). RateCard keeps the template text, a dense
+(estimate row x capacity column) matrix of the rate text and of the parsed rates,
+and a capacity -> matrix column map, so a rate lookup is a single index.
+
+Cards are identified by a checksum of the template text. The card of a worksheet
+is built once per cached snapshot, and the last card is kept on disk so it can be
+used without a connection.
+"""
+import hashlib
+import json
+import os
+import numpy as np
+from config.sheets_setup import CACHE_DIR
+from utils.sheet_cache import snapshot_cache
+
+# Template block read for the card
+TEMPLATE_ROWS = 50
+TEMPLATE_COLS = 9  # A..I, the estimate grid starts at J
+
+# Template columns holding the rates of each capacity group (C=2 .. H=7)
+FIRST_RATE_COL = 2
+LAST_RATE_COL = 7
+
+# Template column of each capacity
+CAPACITY_COLUMNS = {
+    "200 KVA": 7,
+    "100 KVA": 6,
+    "75 KVA": 5,
+    "63 KVA": 5,
+    "50 KVA": 5,
+    "25 KVA": 4,
+    "16 KVA": 3,
+    "10 KVA": 3,
+    "5 KVA": 2,
+}
+
+RATE_CARD_FILE = os.path.join(CACHE_DIR, "rate_card.json")
+
+
+def _template_cells(rows):
+    """Cut the A1:I50 block out of sheet rows, padded with ''"""
+    cells = []
+    for row_index in range(TEMPLATE_ROWS):
+        row = rows[row_index] if row_index < len(rows) else []
+        cells.append([str(row[col]) if col < len(row) else '' for col in range(TEMPLATE_COLS)])
+    return cells
+
+
+def _checksum(cells):
+    return hashlib.sha1(json.dumps(cells).encode("utf-8")).hexdigest()
+
+
+def _to_float(text):
+    try:
+        return float(text)
+    except ValueError:
+        return np.nan
+
+
+class RateCard:
+    """Compiled ESTIMATE template, see the module docstring"""
+
+    def __init__(self, cells, checksum=None):
+        self.cells = cells
+        self.checksum = checksum or _checksum(cells)
+        self.capacity_index = {
+            capacity: col - FIRST_RATE_COL for capacity, col in CAPACITY_COLUMNS.items()
+        }
+        # Blank rates count as "0", as the estimate always treated them
+        self.text = np.array(
+            [[cell or '0' for cell in row[FIRST_RATE_COL:LAST_RATE_COL + 1]] for row in cells],
+            dtype=object,
+        )
+        self.values = np.array([[_to_float(cell) for cell in row] for row in self.text.tolist()])
+
+    @classmethod
+    def from_rows(cls, rows):
+        return cls(_template_cells(rows))
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        return cls.from_rows(snapshot.rows)
+
+    def on_rows_patched(self, snapshot, first_row_number, count):
+        # Estimate writes start at column J and leave the template alone; rebuild only
+        # if the template text really changed
+        if first_row_number > TEMPLATE_ROWS:
+            return
+        cells = _template_cells(snapshot.rows)
+        if _checksum(cells) != self.checksum:
+            self.__init__(cells)
+
+    def on_rows_appended(self, snapshot, first_row_number, count):
+        self.on_rows_patched(snapshot, first_row_number, count)
+
+    @property
+    def version(self):
+        return self.checksum
+
+    def value(self, row_index, col_index):
+        """Template cell text at 0-based row/column, '' when outside the template"""
+        if row_index < TEMPLATE_ROWS and col_index < TEMPLATE_COLS:
+            return self.cells[row_index][col_index]
+        return ''
+
+    def column_for(self, capacity):
+        """Matrix column of a capacity such as "100 KVA", or None if it has no rates"""
+        return self.capacity_index.get(capacity)
+
+    def rate_texts(self, capacity):
+        """Rate text of every template row for capacity, or None for an unknown capacity"""
+        column = self.column_for(capacity)
+        if column is None:
+            return None
+        return self.text[:, column].tolist()
+
+    def rate(self, row_index, capacity):
+        """Rate of one template row for capacity, 0 for an unknown capacity"""
+        column = self.column_for(capacity)
+        if column is None:
+            return 0
+        return self.text[row_index, column]
+
+    def save(self, path=RATE_CARD_FILE):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"checksum": self.checksum, "cells": self.cells}, f)
+        except OSError as e:
+            print(f"Debug - Could not save rate card: {str(e)}")
+
+    @classmethod
+    def load(cls, path=RATE_CARD_FILE):
+        """Return the card saved on disk, or None if there is none or it is damaged"""
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if _checksum(data.get("cells", [])) != data.get("checksum"):
+            print("Debug - Saved rate card does not match its checksum, ignoring it")
+            return None
+        return cls(data["cells"], data["checksum"])
+
+
+_saved_checksum = None
+
+
+def get_rate_card(estimate_sheet):
+    """
+    Return the rate card of the ESTIMATE worksheet
+    The card is built once per cached snapshot and written to disk whenever its
+    checksum changes. If the sheet cannot be read, the card saved on disk is used.
+    """
+    global _saved_checksum
+    try:
+        card = snapshot_cache.get_derived(estimate_sheet, "rate_card", RateCard.from_snapshot)
+    except Exception as e:
+        card = RateCard.load()
+        if card is None:
+            raise
+        print(f"Debug - Using saved rate card, ESTIMATE sheet unavailable: {str(e)}")
+        return card
+
+    if card.checksum != _saved_checksum:
+        saved = RateCard.load()
+        if saved is None or saved.checksum != card.checksum:
+            card.save()
+        _saved_checksum = card.checksum
+    return card
@@ -0,0 +1,120 @@
+"""
+Prefix search over the MASTER SHEET snapshot.
+
+For each searchable column the (key, row number) pairs of every data row are
+kept in one sorted list, so the rows whose key starts with what the user typed
+are one contiguous slice found with two bisects: counting the matches and
+taking the first N costs O(log n + N) whatever the size of the sheet. Keys are
+upper-cased and stripped. The lists follow the snapshot hooks; a patch only
+moves the rows whose key actually changed. SortedColumnIndex is the same
+structure for any key function (see utils.date_index).
+"""
+import threading
+from bisect import bisect_left, insort
+from utils.sheet_cache import snapshot_cache
+from utils.sheet_index import HEADER_ROWS
+
+# Searchable MASTER SHEET columns (0-based)
+SEARCH_FIELDS = {
+    "MR NO": 2,
+    "DATE": 4,
+    "TC NO": 5,
+    "JOB NO": 8,
+}
+
+# Sorts after every character a key can hold, closes a prefix range
+_PREFIX_END = "\uffff"
+
+
+def search_key(value):
+    """Key of a cell for prefix search, None for a blank cell"""
+    return str(value).strip().upper() or None
+
+
+class SortedColumnIndex:
+    """
+    Sorted (key, row number) list per column of one snapshot
+    columns maps names to 0-based columns; key(value) returns the sort key of a
+    cell, or None to leave the row out.
+    """
+
+    def __init__(self, snapshot, columns, key):
+        self.snapshot = snapshot
+        self.columns = columns
+        self.key = key
+        self._lock = threading.Lock()
+        self.keys = {}
+        self.entries = {}
+        for name, col in self.columns.items():
+            keys = [None] * len(snapshot.rows)
+            for index in range(HEADER_ROWS, len(snapshot.rows)):
+                row = snapshot.rows[index]
+                keys[index] = self.key(row[col]) if len(row) > col else None
+            self.keys[name] = keys
+            self.entries[name] = sorted(
+                (key, index + 1) for index, key in enumerate(keys) if key is not None
+            )
+
+    def _update_rows(self, snapshot, first_row_number, count):
+        first_row_number = max(first_row_number, HEADER_ROWS + 1)
+        with self._lock:
+            for name, col in self.columns.items():
+                keys = self.keys[name]
+                entries = self.entries[name]
+                if len(keys) < len(snapshot.rows):
+                    keys.extend([None] * (len(snapshot.rows) - len(keys)))
+                for row_number in range(first_row_number, first_row_number + count):
+                    row = snapshot.rows[row_number - 1]
+                    key = self.key(row[col]) if len(row) > col else None
+                    old_key = keys[row_number - 1]
+                    if key == old_key:
+                        continue
+                    if old_key is not None:
+                        del entries[bisect_left(entries, (old_key, row_number))]
+                    if key is not None:
+                        insort(entries, (key, row_number))
+                    keys[row_number - 1] = key
+
+    def on_rows_patched(self, snapshot, first_row_number, count):
+        self._update_rows(snapshot, first_row_number, count)
+
+    def on_rows_appended(self, snapshot, first_row_number, count):
+        self._update_rows(snapshot, first_row_number, count)
+
+    def _slice(self, name, low, high, limit=None):
+        # Rows with low <= key < high, as (count, row numbers of the first limit)
+        with self._lock:
+            entries = self.entries[name]
+            start = bisect_left(entries, (low,))
+            end = len(entries) if high is None else bisect_left(entries, (high,))
+            end = max(start, end)
+            stop = end if limit is None else min(end, start + limit)
+            return end - start, [row_number for _, row_number in entries[start:stop]]
+
+    def row(self, row_number):
+        return self.snapshot.rows[row_number - 1]
+
+
+class SearchIndex(SortedColumnIndex):
+    """Prefix search over the SEARCH_FIELDS columns"""
+
+    def __init__(self, snapshot):
+        super().__init__(snapshot, SEARCH_FIELDS, search_key)
+
+    def search(self, field, text, limit=None):
+        """
+        Rows whose field starts with text
+        Returns:
+            tuple: (number of matches, row numbers of the first limit matches in key order)
+        """
+        prefix = search_key(text) or ''
+        return self._slice(field, prefix, prefix + _PREFIX_END, limit)
+
+
+def get_search_index(worksheet, revalidate=True):
+    """
+    SearchIndex of the worksheet's snapshot
+    With revalidate=False a cached snapshot is used as is (no network call), for
+    lookups made while the user types.
+    """
+    return snapshot_cache.get_derived(worksheet, "search_index", SearchIndex, revalidate=revalidate)
@@ -0,0 +1,318 @@
+import threading
+import time
+from gspread.urls import DRIVE_FILES_API_V3_URL
+from gspread.utils import a1_range_to_grid_range
+
+# Seconds a snapshot may be served before it is downloaded again, whatever the revision says
+SNAPSHOT_TTL = 300
+
+# Seconds between two revision checks of the same worksheet (a check is one small Drive call)
+REVISION_CHECK_INTERVAL = 5
+
+
+class SheetSnapshot:
+    """In-memory copy of every value of one worksheet.
+
+    rows[i] holds sheet row i + 1, so row numbers used by the patch methods
+    are the same 1-based numbers used in A1 ranges.
+
+    Patches (on the sheet worker) and derived structures are built under lock;
+    code reading rows from another thread (utils.async_sheets) holds it too, or
+    works on copy_rows().
+    """
+
+    def __init__(self, rows, revision):
+        self.rows = rows
+        self.revision = revision
+        self.fetched_at = time.monotonic()
+        self.checked_at = self.fetched_at
+        self.lock = threading.RLock()
+        self._derived = {}
+
+    def derived(self, name, factory):
+        """Return the structure built by factory(snapshot), building it once per snapshot.
+
+        Derived structures may define on_rows_patched(snapshot, first_row_number, count)
+        and on_rows_appended(snapshot, first_row_number, count) to follow local writes;
+        structures without them are rebuilt on next use.
+        """
+        with self.lock:
+            if name not in self._derived:
+                self._derived[name] = factory(self)
+            return self._derived[name]
+
+    def copy_rows(self):
+        """Private copy of the rows, safe to use while the snapshot is patched"""
+        with self.lock:
+            return [list(row) for row in self.rows]
+
+    def _notify(self, hook, first_row_number, count):
+        for name, structure in list(self._derived.items()):
+            callback = getattr(structure, hook, None)
+            if callback is None:
+                del self._derived[name]
+            else:
+                callback(self, first_row_number, count)
+
+    def width(self):
+        return max((len(row) for row in self.rows), default=0)
+
+    def patch_range(self, row_number, col_index, values):
+        """Apply a rectangular write starting at row_number / 0-based col_index"""
+        with self.lock:
+            width = self.width()
+            for offset, new_values in enumerate(values):
+                index = row_number - 1 + offset
+                while len(self.rows) <= index:
+                    self.rows.append([''] * width)
+                row = self.rows[index]
+                end = col_index + len(new_values)
+                if len(row) < end:
+                    row.extend([''] * (end - len(row)))
+                row[col_index:end] = [str(value) for value in new_values]
+            self._notify("on_rows_patched", row_number, len(values))
+
+    def append_rows(self, rows):
+        """Add rows written with append_rows, padded to the snapshot width"""
+        with self.lock:
+            width = self.width()
+            first_row_number = len(self.rows) + 1
+            for new_row in rows:
+                row = [str(value) for value in new_row]
+                if len(row) < width:
+                    row.extend([''] * (width - len(row)))
+                self.rows.append(row)
+            self._notify("on_rows_appended", first_row_number, len(rows))
+            return first_row_number
+
+
+class SheetSnapshotCache:
+    """Process-wide cache of worksheet values shared by every form.
+
+    A snapshot is reused until the spreadsheet revision (the Drive file version,
+    bumped once per change) moves or the TTL expires. Writes made by this process
+    are applied to the cached rows directly and counted into the revision expected
+    next, so the next read does not need a download unless someone else wrote too.
+    """
+
+    def __init__(self, ttl=SNAPSHOT_TTL, revision_check_interval=REVISION_CHECK_INTERVAL):
+        self.ttl = ttl
+        self.revision_check_interval = revision_check_interval
+        self.hits = 0
+        self.misses = 0
+        self._snapshots = {}
+        self._revisions = {}
+        self._worksheet_locks = {}
+        self._followers = []
+        self._lock = threading.RLock()
+
+    def _key(self, worksheet):
+        return (worksheet.spreadsheet_id, worksheet.id)
+
+    def _fetch(self, worksheet):
+        print(f"Snapshot cache miss for {worksheet.title}, downloading all values")
+        return worksheet.get_all_values()
+
+    def _get_revision(self, worksheet):
+        try:
+            response = worksheet.spreadsheet.client.request(
+                "get", f"{DRIVE_FILES_API_V3_URL}/{worksheet.spreadsheet_id}",
+                params={"fields": "version", "supportsAllDrives": True},
+            )
+            revision = int(response.json()["version"])
+        except Exception as e:
+            print(f"Debug - Could not read spreadsheet revision: {str(e)}")
+            return None
+        with self._lock:
+            self._revisions[worksheet.spreadsheet_id] = revision
+        return revision
+
+    def _worksheet_lock(self, worksheet):
+        # Downloads hold only their worksheet's lock, so different worksheets can be
+        # read at the same time (see utils.async_sheets)
+        with self._lock:
+            return self._worksheet_locks.setdefault(self._key(worksheet), threading.RLock())
+
+    def get_snapshot(self, worksheet, force_refresh=False):
+        """Return the snapshot for worksheet, downloading it only when stale"""
+        key = self._key(worksheet)
+        with self._worksheet_lock(worksheet):
+            with self._lock:
+                snapshot = self._snapshots.get(key)
+            revision = None
+            if snapshot is not None and not force_refresh:
+                now = time.monotonic()
+                if now - snapshot.fetched_at < self.ttl:
+                    if now - snapshot.checked_at < self.revision_check_interval:
+                        self._count(hit=True)
+                        return snapshot
+                    revision = self._get_revision(worksheet)
+                    snapshot.checked_at = now
+                    if revision is None or revision == snapshot.revision:
+                        self._count(hit=True)
+                        return snapshot
+
+            self._count(hit=False)
+            if revision is None:
+                revision = self._get_revision(worksheet)
+            snapshot = SheetSnapshot(self._fetch(worksheet), revision)
+            with self._lock:
+                self._snapshots[key] = snapshot
+            return snapshot
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get_derived(self, worksheet, name, factory, revalidate=True):
+        """Return a structure derived from the worksheet snapshot (see SheetSnapshot.derived).
+
+        With revalidate=False an already cached snapshot is used as is, without
+        the revision check, so the lookup costs no network call at all.
+        """
+        with self._worksheet_lock(worksheet):
+            snapshot = None if revalidate else self.peek(worksheet)
+            if snapshot is None:
+                snapshot = self.get_snapshot(worksheet)
+            return snapshot.derived(name, factory)
+
+    def peek(self, worksheet):
+        """Return the cached snapshot without any network call, or None"""
+        with self._lock:
+            return self._snapshots.get(self._key(worksheet))
+
+    def follow(self, cache):
+        """Also mirror the local writes recorded here into cache (e.g. a projection cache)"""
+        self._followers.append(cache)
+
+    def revision_before_write(self, worksheet):
+        """
+        Latest spreadsheet revision this cache or its followers know, taken just before
+        a write (no network call) to pass to record_update, record_append or record_format
+        """
+        with self._lock:
+            known = [self._revisions.get(worksheet.spreadsheet_id)]
+        known.extend(follower.revision_before_write(worksheet) for follower in self._followers)
+        known = [revision for revision in known if revision is not None]
+        return max(known) if known else None
+
+    def record_update(self, worksheet, row_number, col_index, values, revision_before=None, requests=1):
+        """
+        Mirror a ranged worksheet.update() into the cached snapshot
+        Args:
+            revision_before: See revision_before_write
+            requests: Write requests the update took, each bumps the revision once
+        """
+        with self._worksheet_lock(worksheet):
+            snapshot = self.peek(worksheet)
+            if snapshot is not None and self._still_current(worksheet, snapshot, revision_before):
+                snapshot.patch_range(row_number, col_index, values)
+            self._adopt_own_revision(worksheet, revision_before, requests)
+        for follower in self._followers:
+            follower.record_update(worksheet, row_number, col_index, values, revision_before, requests)
+
+    def record_append(self, worksheet, rows, first_row_number=None, revision_before=None):
+        """
+        Mirror worksheet.append_rows() (one request) into the cached snapshot
+        Args:
+            first_row_number: Row the sheet appended at, see appended_row_number
+            revision_before: See revision_before_write
+        Returns:
+            int: first_row_number, or the row after the cached rows if it was not given
+        """
+        with self._worksheet_lock(worksheet):
+            snapshot = self.peek(worksheet)
+            if snapshot is not None and self._still_current(worksheet, snapshot, revision_before):
+                if first_row_number not in (None, len(snapshot.rows) + 1):
+                    # Rows were added elsewhere: the snapshot is missing them
+                    print(f"Debug - {worksheet.title} appended at row {first_row_number}, "
+                          f"snapshot ends at row {len(snapshot.rows)}, dropping it")
+                    self.invalidate(worksheet)
+                else:
+                    first_row_number = snapshot.append_rows(rows)
+            self._adopt_own_revision(worksheet, revision_before, 1)
+        for follower in self._followers:
+            follower.record_append(worksheet, rows, first_row_number, revision_before)
+        return first_row_number
+
+    def record_format(self, worksheet, revision_before=None, requests=1):
+        """
+        Note a write that changed no cached value (formatting, worksheet copies):
+        only the revision moves on, by one per request
+        """
+        with self._worksheet_lock(worksheet):
+            snapshot = self.peek(worksheet)
+            if snapshot is not None:
+                self._still_current(worksheet, snapshot, revision_before)
+            self._adopt_own_revision(worksheet, revision_before, requests)
+        for follower in self._followers:
+            follower.record_format(worksheet, revision_before, requests)
+
+    def _still_current(self, worksheet, snapshot, revision_before):
+        # A write can only be mirrored into a snapshot nobody else changed since it
+        # was read; otherwise the snapshot is dropped and read again on next use
+        if revision_before is not None and revision_before == snapshot.revision:
+            return True
+        print(f"Debug - {worksheet.title} changed before our write, dropping its snapshot")
+        self.invalidate(worksheet)
+        return False
+
+    def _adopt_own_revision(self, worksheet, revision_before, requests):
+        # Our own requests bump the version by one each; expect exactly that on the
+        # next revision check, so it is not mistaken for someone else's change. A
+        # write from elsewhere, before or after ours, makes the version differ and
+        # the snapshot is downloaded again. The revision covers the whole
+        # spreadsheet, so every snapshot that was current just before the write
+        # (other worksheets included) expects the same version.
+        if revision_before is None:
+            return
+        expected = revision_before + requests
+        with self._lock:
+            for snapshot in self._snapshots.values():
+                if snapshot.revision == revision_before:
+                    snapshot.revision = expected
+            if self._revisions.get(worksheet.spreadsheet_id) == revision_before:
+                self._revisions[worksheet.spreadsheet_id] = expected
+
+    def invalidate(self, worksheet=None):
+        """Drop the snapshot of one worksheet, or of all worksheets"""
+        with self._lock:
+            if worksheet is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(self._key(worksheet), None)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "snapshots": len(self._snapshots),
+            }
+
+
+snapshot_cache = SheetSnapshotCache()
+
+
+def appended_row_number(response):
+    """First row number written by append_rows/append_row, from its response"""
+    updated_range = response["updates"]["updatedRange"]
+    return a1_range_to_grid_range(updated_range.split("!")[-1])["startRowIndex"] + 1
+
+
+def copy_sheet_values(worksheet):
+    """All values of worksheet as a private copy, for readers beside the sheet worker"""
+    return snapshot_cache.get_snapshot(worksheet).copy_rows()
+
+
+def get_sheet_values(worksheet, force_refresh=False):
+    """Return all values of worksheet from the shared snapshot cache.
+
+    The returned rows are shared between forms and must not be modified.
+    """
+    return snapshot_cache.get_snapshot(worksheet, force_refresh).rows
@@ -0,0 +1,231 @@
+from utils.sheet_cache import SheetSnapshotCache, snapshot_cache
+
+# MASTER SHEET column positions (0-based)
+MR_NO_COL = 2
+TC_NO_COL = 5
+
+# Rows 1-2 of MASTER SHEET are headers; data starts on row 3
+HEADER_ROWS = 2
+
+# Last column written by the forms (testing ends at BJ)
+LAST_COL = "BJ"
+ROW_WIDTH = 62
+
+
+class DuplicateTcError(Exception):
+    """Raised when a TC NO is found on more than one sheet row"""
+
+    def __init__(self, tc_no, row_numbers):
+        self.tc_no = tc_no
+        self.row_numbers = row_numbers
+        rows = ", ".join(str(row_number) for row_number in row_numbers)
+        super().__init__(f"TC No. {tc_no} appears on more than one row ({rows})")
+
+
+def _key(value):
+    return str(value).strip()
+
+
+class TcIndex:
+    """TC NO -> sheet row numbers, built once per snapshot and kept current on local writes"""
+
+    def __init__(self, snapshot, col=TC_NO_COL):
+        self.col = col
+        self.rows_by_tc = {}
+        self.tc_by_row = {}
+        self._index_rows(snapshot, 1, len(snapshot.rows))
+        duplicates = self.duplicates()
+        if duplicates:
+            print(f"Debug - Duplicate TC NOs found: {duplicates}")
+
+    def _index_rows(self, snapshot, first_row_number, count):
+        for row_number in range(first_row_number, first_row_number + count):
+            row = snapshot.rows[row_number - 1]
+            tc_no = _key(row[self.col]) if len(row) > self.col else ''
+            if tc_no:
+                self.rows_by_tc.setdefault(tc_no, []).append(row_number)
+                self.tc_by_row[row_number] = tc_no
+
+    def _forget_rows(self, first_row_number, count):
+        for row_number in range(first_row_number, first_row_number + count):
+            tc_no = self.tc_by_row.pop(row_number, None)
+            if tc_no is None:
+                continue
+            rows = self.rows_by_tc[tc_no]
+            rows.remove(row_number)
+            if not rows:
+                del self.rows_by_tc[tc_no]
+
+    def on_rows_appended(self, snapshot, first_row_number, count):
+        self._index_rows(snapshot, first_row_number, count)
+
+    def on_rows_patched(self, snapshot, first_row_number, count):
+        self._forget_rows(first_row_number, count)
+        self._index_rows(snapshot, first_row_number, count)
+        for row_number in range(first_row_number, first_row_number + count):
+            if row_number in self.tc_by_row:
+                self.rows_by_tc[self.tc_by_row[row_number]].sort()
+
+    def row_for(self, tc_no):
+        """Return the row number of tc_no, None if missing; raises DuplicateTcError if ambiguous"""
+        rows = self.rows_by_tc.get(_key(tc_no))
+        if not rows:
+            return None
+        if len(rows) > 1:
+            raise DuplicateTcError(_key(tc_no), list(rows))
+        return rows[0]
+
+    def duplicates(self):
+        """Return {tc_no: [row numbers]} for every TC NO found on more than one row"""
+        return {tc_no: list(rows) for tc_no, rows in self.rows_by_tc.items() if len(rows) > 1}
+
+
+def get_tc_index(worksheet):
+    """
+    Return the TC index of worksheet
+    The snapshot is revalidated first (one Drive metadata call at most), so TCs added
+    and rows moved on other workstations are seen before an inspection is written.
+    """
+    return snapshot_cache.get_derived(worksheet, "tc_index", TcIndex)
+
+
+def find_tc_row(worksheet, tc_no):
+    """
+    Return the sheet row number holding tc_no, or None if it is not in the sheet
+    Raises:
+        DuplicateTcError: If tc_no is on more than one row
+    """
+    return get_tc_index(worksheet).row_for(tc_no)
+
+
+def get_tc_row(worksheet, tc_no):
+    """
+    Return a copy of the sheet row holding tc_no, or None if it is not in the sheet
+    Raises:
+        DuplicateTcError: If tc_no is on more than one row
+    """
+    snapshot = snapshot_cache.get_snapshot(worksheet)
+    with snapshot.lock:
+        row_number = snapshot.derived("tc_index", TcIndex).row_for(tc_no)
+        return None if row_number is None else list(snapshot.rows[row_number - 1])
+
+
+class MrIndex:
+    """MR NO -> list of [first_row, last_row] spans of sheet rows.
+
+    Rows of one MR are appended together, so an MR is nearly always a single span.
+    """
+
+    def __init__(self, snapshot, col=MR_NO_COL):
+        self.col = col
+        self.spans_by_mr = {}
+        self._index_rows(snapshot, HEADER_ROWS + 1, len(snapshot.rows) - HEADER_ROWS)
+
+    def _index_rows(self, snapshot, first_row_number, count):
+        for row_number in range(first_row_number, first_row_number + count):
+            row = snapshot.rows[row_number - 1]
+            mr_no = _key(row[self.col]) if len(row) > self.col else ''
+            if not mr_no:
+                continue
+            spans = self.spans_by_mr.setdefault(mr_no, [])
+            if spans and spans[-1][1] == row_number - 1:
+                spans[-1][1] = row_number
+            else:
+                spans.append([row_number, row_number])
+
+    def on_rows_appended(self, snapshot, first_row_number, count):
+        self._index_rows(snapshot, first_row_number, count)
+
+    def on_rows_patched(self, snapshot, first_row_number, count):
+        # Inspection writes never change the MR column; if a write did, rebuild (rare)
+        for row_number in range(max(first_row_number, HEADER_ROWS + 1), first_row_number + count):
+            row = snapshot.rows[row_number - 1]
+            mr_no = _key(row[self.col]) if len(row) > self.col else ''
+            spans = self.spans_by_mr.get(mr_no, [])
+            if mr_no and not any(first <= row_number <= last for first, last in spans):
+                self.spans_by_mr = {}
+                self._index_rows(snapshot, HEADER_ROWS + 1, len(snapshot.rows) - HEADER_ROWS)
+                return
+
+    def spans_for(self, mr_no):
+        return [tuple(span) for span in self.spans_by_mr.get(_key(mr_no), [])]
+
+
+class ColumnSnapshotCache(SheetSnapshotCache):
+    """Snapshot cache holding a single column of each worksheet, used to locate rows cheaply"""
+
+    def __init__(self, col, **kwargs):
+        super().__init__(**kwargs)
+        self.col = col
+
+    def _fetch(self, worksheet):
+        print(f"Column cache miss for {worksheet.title}, downloading column {self.col + 1}")
+        return [[value] for value in worksheet.col_values(self.col + 1)]
+
+    # Local writes recorded in the main cache arrive full width; keep our column
+    def record_update(self, worksheet, row_number, col_index, values, revision_before=None, requests=1):
+        offset = self.col - col_index
+        covered = [offset >= 0 and len(row) > offset for row in values]
+        if all(covered):
+            column = [[row[offset]] for row in values]
+            super().record_update(worksheet, row_number, 0, column, revision_before, requests)
+            return
+        if any(covered):
+            self.invalidate(worksheet)  # ragged write over our column, read it again
+        super().record_format(worksheet, revision_before, requests)
+
+    def record_append(self, worksheet, rows, first_row_number=None, revision_before=None):
+        column = [[row[self.col] if len(row) > self.col else ''] for row in rows]
+        return super().record_append(worksheet, column, first_row_number, revision_before)
+
+
+mr_column_cache = ColumnSnapshotCache(MR_NO_COL)
+snapshot_cache.follow(mr_column_cache)
+
+
+def _pad(row):
+    if len(row) < ROW_WIDTH:
+        row = row + [''] * (ROW_WIDTH - len(row))
+    return row
+
+
+def get_mr_rows(worksheet, mr_no):
+    """
+    Return the sheet rows of one MR NO, in sheet order
+    Uses the cached snapshot when there is one; otherwise only the MR's spans are
+    fetched (one values:batchGet of A{start}:BJ{end} ranges) after locating them
+    from the cached MR NO column. Fetched rows whose MR NO is not mr_no (rows moved
+    since the column was read) are left out and the column is read again next time.
+    """
+    # Rows are copied under the snapshot lock: callers may run beside the sheet worker
+    if snapshot_cache.peek(worksheet) is not None:
+        snapshot = snapshot_cache.get_snapshot(worksheet)
+        rows = []
+        with snapshot.lock:
+            index = snapshot.derived("mr_index", MrIndex)
+            for first_row, last_row in index.spans_for(mr_no):
+                rows.extend(
+                    list(row) for row in snapshot.rows[first_row - 1:last_row] if _key(row[MR_NO_COL]) == _key(mr_no)
+                )
+        return rows
+
+    column = mr_column_cache.get_snapshot(worksheet)
+    with column.lock:
+        spans = column.derived("mr_index", lambda snapshot: MrIndex(snapshot, col=0)).spans_for(mr_no)
+    if not spans:
+        return []
+    ranges = [f"A{first_row}:{LAST_COL}{last_row}" for first_row, last_row in spans]
+    rows = []
+    moved = False
+    for (first_row, last_row), value_range in zip(spans, worksheet.batch_get(ranges)):
+        span_rows = [_pad(list(row)) for row in value_range]
+        span_rows.extend(_pad([]) for _ in range(last_row - first_row + 1 - len(span_rows)))
+        for row in span_rows:
+            if _key(row[MR_NO_COL]) == _key(mr_no):
+                rows.append(row)
+            else:
+                moved = True
+    if moved:
+        print(f"Debug - Rows of MR No. {mr_no} moved since the MR NO column was read")
+        mr_column_cache.invalidate(worksheet)
+    return rows
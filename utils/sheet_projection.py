@@ -0,0 +1,84 @@
+"""
+Column-projected reads for list views.
+
+A view declares the MASTER columns it shows as a Projection (e.g. A:I and the
+stage date columns). Only those ranges are fetched, in one values:batchGet, and
+put back at their sheet positions, so row[2] is still MR NO and unread columns
+are ''. Each projection has its own snapshot cache, which follows the local
+writes recorded in the main snapshot cache.
+"""
+from gspread.utils import column_letter_to_index
+from utils.sheet_cache import SheetSnapshotCache, snapshot_cache
+from utils.sheet_index import HEADER_ROWS
+
+
+class Projection:
+    """Named set of column spans ("A:I", "AE") read from row HEADER_ROWS + 1 down"""
+
+    def __init__(self, name, columns):
+        self.name = name
+        self.columns = columns
+        self.spans = []
+        self.a1_ranges = []
+        for span in columns:
+            first, _, last = span.partition(":")
+            last = last or first
+            self.spans.append((column_letter_to_index(first) - 1, column_letter_to_index(last) - 1))
+            self.a1_ranges.append(f"{first}{HEADER_ROWS + 1}:{last}")
+        self.width = max(last for _, last in self.spans) + 1
+
+    def stitch(self, value_ranges):
+        """Sheet-positioned rows (headers left blank) from the batchGet value ranges"""
+        height = max((len(values) for values in value_ranges), default=0)
+        rows = [[''] * self.width for _ in range(HEADER_ROWS + height)]
+        for (first, last), values in zip(self.spans, value_ranges):
+            for offset, cells in enumerate(values):
+                row = rows[HEADER_ROWS + offset]
+                for col, value in enumerate(cells[:last - first + 1]):
+                    row[first + col] = value
+        return rows
+
+
+class ProjectionCache(SheetSnapshotCache):
+    """Snapshot cache holding only the columns of one projection"""
+
+    def __init__(self, projection, **kwargs):
+        super().__init__(**kwargs)
+        self.projection = projection
+
+    def _fetch(self, worksheet):
+        print(f"Projection cache miss for {worksheet.title}, downloading {', '.join(self.projection.columns)}")
+        return self.projection.stitch(worksheet.batch_get(self.projection.a1_ranges))
+
+
+_projection_caches = {}
+
+
+def _projection_cache(projection):
+    cache = _projection_caches.get(projection.name)
+    if cache is None:
+        cache = _projection_caches[projection.name] = ProjectionCache(projection)
+        snapshot_cache.follow(cache)
+    return cache
+
+
+def get_projected_snapshot(worksheet, projection):
+    """
+    Snapshot of worksheet restricted to the projection's columns
+    If the full sheet is already cached it is used as is (no download at all).
+    """
+    if snapshot_cache.peek(worksheet) is not None:
+        return snapshot_cache.get_snapshot(worksheet)
+    return _projection_cache(projection).get_snapshot(worksheet)
+
+
+def get_projected_derived(worksheet, projection, name, factory):
+    """Structure derived from the projected snapshot, see SheetSnapshotCache.get_derived"""
+    if snapshot_cache.peek(worksheet) is not None:
+        return snapshot_cache.get_derived(worksheet, name, factory)
+    return _projection_cache(projection).get_derived(worksheet, name, factory)
+
+
+def get_projected_values(worksheet, projection):
+    """Rows of worksheet restricted to the projection's columns, see get_projected_snapshot"""
+    return get_projected_snapshot(worksheet, projection).rows
@@ -0,0 +1,164 @@
+from gspread.utils import a1_range_to_grid_range, absolute_range_name, rowcol_to_a1
+from utils.sheet_cache import snapshot_cache
+
+BOLD = {"textFormat": {"bold": True}}
+
+# Unchanged cells allowed inside one written run before it is split in two
+MAX_GAP = 2
+
+# Cells sent in one values:batchUpdate; larger writes are split into several requests
+MAX_CELLS_PER_REQUEST = 5000
+
+
+def repeat_cell_request(worksheet, a1_range, cell_format):
+    """Build one repeatCell request applying cell_format to a1_range of worksheet"""
+    grid_range = a1_range_to_grid_range(a1_range)
+    grid_range["sheetId"] = worksheet.id
+    return {
+        "repeatCell": {
+            "range": grid_range,
+            "cell": {"userEnteredFormat": cell_format},
+            "fields": "userEnteredFormat(" + ",".join(cell_format.keys()) + ")",
+        }
+    }
+
+
+def batch_format(worksheet, formats):
+    """
+    Apply several formats in a single spreadsheets.batchUpdate call
+    Args:
+        formats: list of (a1_range, cell_format) pairs
+    """
+    requests = [repeat_cell_request(worksheet, a1_range, cell_format) for a1_range, cell_format in formats]
+    if not requests:
+        return None
+    print(f"Debug - Formatting {len(requests)} ranges of {worksheet.title} in one request")
+    revision = snapshot_cache.revision_before_write(worksheet)
+    response = worksheet.spreadsheet.batch_update({"requests": requests})
+    snapshot_cache.record_format(worksheet, revision)
+    return response
+
+
+def _cell(rows, row_index, col_index):
+    if row_index < len(rows) and col_index < len(rows[row_index]):
+        return str(rows[row_index][col_index])
+    return ''
+
+
+def _changed_runs(old_row, new_row):
+    """Return [start, end) column runs of new_row that differ from old_row"""
+    runs = []
+    for col, value in enumerate(new_row):
+        if str(value) == (str(old_row[col]) if col < len(old_row) else ''):
+            continue
+        if runs and col - runs[-1][1] <= MAX_GAP:
+            runs[-1][1] = col + 1
+        else:
+            runs.append([col, col + 1])
+    return [tuple(run) for run in runs]
+
+
+def diff_rectangles(old_grid, new_grid):
+    """
+    Return the cells of new_grid that differ from old_grid as rectangles
+    (first_row, last_row, first_col, end_col), 0-based and relative to the grid.
+    Changed runs are found per row and identical runs on consecutive rows are merged.
+    """
+    rectangles = []
+    open_rectangles = {}
+    for row_index, new_row in enumerate(new_grid):
+        old_row = old_grid[row_index] if row_index < len(old_grid) else []
+        still_open = {}
+        for run in _changed_runs(old_row, new_row):
+            rectangle = open_rectangles.pop(run, None)
+            if rectangle is not None and rectangle[1] == row_index - 1:
+                rectangle[1] = row_index
+            else:
+                rectangle = [row_index, row_index, run[0], run[1]]
+                rectangles.append(rectangle)
+            still_open[run] = rectangle
+        open_rectangles = still_open
+    return [tuple(rectangle) for rectangle in rectangles]
+
+
+def _split_rectangles(rectangles):
+    """Cut rectangles taller than MAX_CELLS_PER_REQUEST allows into row bands"""
+    for first_row, last_row, first_col, end_col in rectangles:
+        band = max(1, MAX_CELLS_PER_REQUEST // max(1, end_col - first_col))
+        for band_first in range(first_row, last_row + 1, band):
+            yield band_first, min(last_row, band_first + band - 1), first_col, end_col
+
+
+def _chunk_ranges(data):
+    """Group value ranges into requests of at most MAX_CELLS_PER_REQUEST cells"""
+    requests = [[]]
+    cells = 0
+    for value_range in data:
+        size = sum(len(row) for row in value_range["values"])
+        if requests[-1] and cells + size > MAX_CELLS_PER_REQUEST:
+            requests.append([])
+            cells = 0
+        requests[-1].append(value_range)
+        cells += size
+    return requests
+
+
+def plan_grid(worksheet, row_number, col_index, grid):
+    """
+    Return the value ranges write_grid would send for grid, without sending them
+    The cached snapshot of the worksheet is the baseline: it holds the last grid this
+    process wrote (record_update keeps it current) or what is on the sheet if someone
+    else changed it since. Without a snapshot the whole grid is planned.
+    """
+    snapshot = snapshot_cache.peek(worksheet)
+    if snapshot is None:
+        rectangles = [(0, len(grid) - 1, 0, max(len(row) for row in grid))]
+    else:
+        old_grid = [
+            [_cell(snapshot.rows, row_number - 1 + r, col_index + c) for c in range(len(new_row))]
+            for r, new_row in enumerate(grid)
+        ]
+        rectangles = diff_rectangles(old_grid, grid)
+
+    data = []
+    for first_row, last_row, first_col, end_col in _split_rectangles(rectangles):
+        a1_range = (
+            rowcol_to_a1(row_number + first_row, col_index + first_col + 1)
+            + ":"
+            + rowcol_to_a1(row_number + last_row, col_index + end_col)
+        )
+        data.append({
+            "range": absolute_range_name(worksheet.title, a1_range),
+            "values": [grid[r][first_col:end_col] for r in range(first_row, last_row + 1)],
+        })
+    return data
+
+
+def send_ranges(spreadsheet, data):
+    """
+    Send value ranges (of any worksheets of spreadsheet) as RAW values, in as few
+    values:batchUpdate calls as MAX_CELLS_PER_REQUEST allows
+    Returns the number of requests made.
+    """
+    requests = _chunk_ranges(data) if data else []
+    for chunk in requests:
+        spreadsheet.values_batch_update({"valueInputOption": "RAW", "data": chunk})
+    return len(requests)
+
+
+def write_grid(worksheet, row_number, col_index, grid):
+    """
+    Write grid at row_number / 0-based col_index, sending only the cells that changed
+    Changed cells (see plan_grid) go out as one values:batchUpdate of coalesced ranges.
+    Returns the number of ranges written.
+    """
+    data = plan_grid(worksheet, row_number, col_index, grid)
+    if not data:
+        print(f"Debug - {worksheet.title} already up to date, nothing written")
+        return 0
+
+    revision = snapshot_cache.revision_before_write(worksheet)
+    requests = send_ranges(worksheet.spreadsheet, data)
+    print(f"Debug - Wrote {len(data)} changed ranges to {worksheet.title} in {requests} request(s)")
+    snapshot_cache.record_update(worksheet, row_number, col_index, grid, revision, requests)
+    return len(data)
@@ -0,0 +1,100 @@
+"""
+Per-TC stage completion as a bitmask.
+
+Each MASTER row gets one small int: PHYSICAL, INTERNAL and TESTING are set once
+the stage's date cell (J, AE, AV; see utils.date_index) is filled, ESTIMATE once
+both estimate inputs (physical and internal) are there. MASTER has no estimate
+column, so ESTIMATE means "ready for the estimate".
+
+StageStatus keeps the mask of every row of a snapshot in a bytearray, built once
+per snapshot and updated from the snapshot hooks when the inspection forms patch
+a row, so a view reads a status with one index. Every form writes the date as
+the first cell of its stage, and only the date decides, so a projected snapshot
+(utils.sheet_projection) holding just the date columns gives the same status
+as the full one.
+"""
+from utils.date_index import DATE_COLUMNS
+from utils.sheet_cache import snapshot_cache
+from utils.sheet_index import HEADER_ROWS
+from utils.sheet_projection import get_projected_snapshot
+
+PHYSICAL = 1
+INTERNAL = 2
+TESTING = 4
+ESTIMATE = 8
+
+# MASTER date column of each stage (0-based)
+STAGE_DATE_COLUMNS = {
+    PHYSICAL: DATE_COLUMNS["PHYSICAL"],  # J
+    INTERNAL: DATE_COLUMNS["INTERNAL"],  # AE
+    TESTING: DATE_COLUMNS["TESTING"],    # AV
+}
+
+
+def row_status(row):
+    """Stage bitmask of one MASTER row"""
+    status = 0
+    for stage, col in STAGE_DATE_COLUMNS.items():
+        if len(row) > col and str(row[col]).strip():
+            status |= stage
+    if status & PHYSICAL and status & INTERNAL:
+        status |= ESTIMATE
+    return status
+
+
+def has(status, stages):
+    """True if every stage bit of stages is set in status"""
+    return status & stages == stages
+
+
+def yes_no(status, stage):
+    return "YES" if status & stage else "NO"
+
+
+class StageStatus:
+    """Stage bitmask of every row of a snapshot, indexed by sheet row number - 1"""
+
+    def __init__(self, snapshot):
+        self.status = bytearray(row_status(row) for row in snapshot.rows)
+        for index in range(min(HEADER_ROWS, len(self.status))):
+            self.status[index] = 0
+
+    def _update_rows(self, snapshot, first_row_number, count):
+        if len(self.status) < len(snapshot.rows):
+            self.status.extend(bytes(len(snapshot.rows) - len(self.status)))
+        for row_number in range(max(first_row_number, HEADER_ROWS + 1), first_row_number + count):
+            self.status[row_number - 1] = row_status(snapshot.rows[row_number - 1])
+
+    def on_rows_patched(self, snapshot, first_row_number, count):
+        self._update_rows(snapshot, first_row_number, count)
+
+    def on_rows_appended(self, snapshot, first_row_number, count):
+        self._update_rows(snapshot, first_row_number, count)
+
+    def of(self, row_number):
+        """Bitmask of a sheet row (1-based)"""
+        return self.status[row_number - 1] if row_number <= len(self.status) else 0
+
+
+def get_stage_status(snapshot):
+    return snapshot.derived("stage_status", StageStatus)
+
+
+def data_rows(snapshot):
+    """(row_number, row, status) for every data row of snapshot, in sheet order"""
+    stages = get_stage_status(snapshot)
+    for index in range(HEADER_ROWS, len(snapshot.rows)):
+        yield index + 1, snapshot.rows[index], stages.status[index]
+
+
+def get_status_snapshot(worksheet, projection=None):
+    """
+    Snapshot of worksheet (projected if projection is given) with its stage
+    statuses built, so the list views only index them on the Tk thread
+    """
+    if projection is None:
+        snapshot = snapshot_cache.get_snapshot(worksheet)
+    else:
+        snapshot = get_projected_snapshot(worksheet, projection)
+    get_stage_status(snapshot)
+    return snapshot
@@ -0,0 +1,78 @@
+"""
+Keyed contents of a flat Treeview.
+
+TableModel.sync(rows) brings the tree to the given rows by applying only the
+difference to what it shows: rows whose key disappeared are deleted, new keys
+are inserted at their place and rows whose values changed are updated in
+place. Item ids come from the row keys (sheet row number, TC NO, MR NO), so an
+unchanged row keeps its item, selection and scroll position, and refreshing
+after a save costs one Tk call per changed row. An item id is "<n>:<key>" for
+the n-th row with that key, so a blank key never becomes the root item '' and
+a repeated key never collides with another row.
+"""
+
+
+class TableModel:
+    """Rows shown in a Treeview, as item id -> values"""
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.values = {}
+        self.keys = {}
+        self.order = []
+
+    @staticmethod
+    def _item_ids(keys):
+        # Numbered by occurrence, so a key seen again (e.g. a duplicated TC NO) differs
+        seen = {}
+        item_ids = []
+        for key in keys:
+            key = str(key)
+            count = seen[key] = seen.get(key, 0) + 1
+            item_ids.append(f"{count}:{key}")
+        return item_ids
+
+    def rows(self):
+        """The (key, values) rows shown now, in display order"""
+        return [(self.keys[item_id], self.values[item_id]) for item_id in self.order]
+
+    def sync(self, rows):
+        """
+        Show rows, a list of (key, values) in display order
+        Returns:
+            tuple: (inserted, updated, deleted) item counts
+        """
+        item_ids = self._item_ids(key for key, _ in rows)
+        new_values = {item_id: tuple(values) for item_id, (_, values) in zip(item_ids, rows)}
+        new_keys = {item_id: key for item_id, (key, _) in zip(item_ids, rows)}
+
+        stale = [item_id for item_id in self.order if item_id not in new_values]
+        if stale:
+            self.tree.delete(*stale)
+        kept = [item_id for item_id in self.order if item_id in new_values]
+
+        inserted = updated = 0
+        position = 0
+        for index, item_id in enumerate(item_ids):
+            values = new_values[item_id]
+            old_values = self.values.get(item_id)
+            if old_values is None:
+                self.tree.insert('', index, iid=item_id, values=values)
+                inserted += 1
+                continue
+            if position < len(kept) and kept[position] == item_id:
+                position += 1
+            else:
+                self.tree.move(item_id, '', index)
+                kept.remove(item_id)
+            if old_values != values:
+                self.tree.item(item_id, values=values)
+                updated += 1
+
+        self.values = new_values
+        self.keys = new_keys
+        self.order = item_ids
+        return inserted, updated, len(stale)
+
+    def clear(self):
+        self.sync([])